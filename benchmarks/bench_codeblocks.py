@@ -0,0 +1,41 @@
+"""
+Compares the line-oriented codeblock parser with the regex based extraction it replaced.
+
+    $ python benchmarks/bench_codeblocks.py
+"""
+import re
+import timeit
+
+from pmemo.memo import iter_codeblocks
+
+# extraction used by pmemo <= 0.4.0
+RE_CODEBLOCK = re.compile(r"`{3}([^:\s]*):?(.*?)\n([\s\S]+?)`{3}")
+
+CASES = {
+    "1k small blocks": "\n".join(
+        f"note {i}\n```python:block{i}\nprint({i})\n```\n" for i in range(1000)
+    ),
+    "5MB pasted log": "log\n"
+    + "2024-01-01 00:00:00 INFO something happened\n" * 120_000,
+    "unterminated fences": "```python\n" + "`` not a fence\n" * 2_000,
+    # the regex backtracks cubically on unclosed fences within one line
+    "single-line fences": ("```" + "a" * 100) * 25,
+}
+
+
+def main() -> None:
+    for name, text in CASES.items():
+        regex_time = min(
+            timeit.repeat(lambda: RE_CODEBLOCK.findall(text), number=1, repeat=3)
+        )
+        parser_time = min(
+            timeit.repeat(lambda: list(iter_codeblocks(text)), number=1, repeat=3)
+        )
+        print(
+            f"{name:<22} regex: {regex_time * 1000:9.2f} ms  "
+            f"parser: {parser_time * 1000:9.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures the time from calling PmemoEditor.text to the first keystroke being handled,
+for the first prompt of an editor and for the prompts after it, which reuse its session.
+
+    $ python benchmarks/bench_editor.py
+"""
+import time
+
+from prompt_toolkit.input.ansi_escape_sequences import REVERSE_ANSI_SEQUENCES
+from prompt_toolkit.input.defaults import create_pipe_input
+from prompt_toolkit.keys import Keys
+from prompt_toolkit.output import DummyOutput
+
+from pmemo.pmemo_editor import PmemoEditor
+
+N_EDITORS = 10
+N_PROMPTS = 10
+
+
+def first_keystroke(editor: PmemoEditor, pipe_input, output) -> float:
+    first: list[float] = []
+
+    def on_first_key(buffer) -> None:
+        if not first:
+            first.append(time.perf_counter())
+
+    start = time.perf_counter()
+    # the session is built by the first prompt, and text reuses it as the arguments are the same
+    pipe_input.send_text(
+        "x" + REVERSE_ANSI_SEQUENCES[Keys.Escape] + REVERSE_ANSI_SEQUENCES[Keys.Enter]
+    )
+    session = editor._get_session(input=pipe_input, output=output)
+    session.default_buffer.on_text_changed += on_first_key
+    try:
+        editor.text("Memo", input=pipe_input, output=output)
+    finally:
+        session.default_buffer.on_text_changed -= on_first_key
+    return (first[0] - start) * 1000
+
+
+def main() -> None:
+    first_prompts, next_prompts = [], []
+    output = DummyOutput()
+    with create_pipe_input() as pipe_input:
+        for _ in range(N_EDITORS):
+            editor = PmemoEditor()
+            first, *others = (
+                first_keystroke(editor, pipe_input, output) for _ in range(N_PROMPTS)
+            )
+            first_prompts.append(first)
+            next_prompts.extend(others)
+    print(
+        f"first prompt  {sum(first_prompts) / len(first_prompts):7.2f} ms to first key"
+    )
+    print(f"next prompts  {sum(next_prompts) / len(next_prompts):7.2f} ms to first key")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Measures the per-keystroke latency of the selector's fuzzy matcher while a query is typed.
+
+    $ python benchmarks/bench_fuzzy.py
+"""
+import random
+import string
+import time
+
+from pmemo.fuzzy import FuzzyMatcher
+
+N_CHOICES = (1_000, 20_000, 200_000)
+QUERIES = ("memo", "pyth", "qz")
+
+
+def make_choices(n: int) -> list[str]:
+    rng = random.Random(0)
+    words = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        for _ in range(5_000)
+    ] + ["memo", "python", "notes", "todo"]
+    return ["_".join(rng.choices(words, k=3))[:30] for _ in range(n)]
+
+
+def main() -> None:
+    for n in N_CHOICES:
+        choices = make_choices(n)
+        for query in QUERIES:
+            matcher = FuzzyMatcher(choices)
+            timings = []
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                matcher.match_indices(query[:end])
+                timings.append((time.perf_counter() - start) * 1000)
+            print(
+                f"{n:>8} choices  {query!r:<7}"
+                + "  ".join(f"{t:7.2f}" for t in timings)
+                + " ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
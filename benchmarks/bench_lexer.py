@@ -0,0 +1,49 @@
+"""
+Measures the time the editor's lexer takes per keystroke at the end of a memo as the memo grows,
+with MarkdownCodeLexer and with the PygmentsLexer it replaced.
+
+    $ python benchmarks/bench_lexer.py
+"""
+import time
+
+from prompt_toolkit.document import Document
+from prompt_toolkit.lexers import Lexer, PygmentsLexer
+from pygments.lexers.markup import MarkdownLexer
+
+from pmemo.highlight import MarkdownCodeLexer
+
+N_LINES = (20, 2_000, 20_000)
+N_KEYSTROKES = 10
+HEIGHT = 40
+BLOCK = ["Some *text* with `code`", "```python", "def f(x):", "    return x + 1", "```"]
+
+
+def keystrokes(lexer: Lexer, lines: list[str]) -> float:
+    text = "\n".join(lines)
+    start = time.perf_counter()
+    for i in range(N_KEYSTROKES):
+        text += "x"
+        document = Document(text)
+        get_line = lexer.lex_document(document)
+        # a render gets the lines on the screen, around the cursor at the end
+        for lineno in range(max(0, len(document.lines) - HEIGHT), len(document.lines)):
+            get_line(lineno)
+    return (time.perf_counter() - start) / N_KEYSTROKES * 1000
+
+
+def main() -> None:
+    for n in N_LINES:
+        lines = [BLOCK[i % len(BLOCK)] for i in range(n)] + ["end"]
+        incremental = MarkdownCodeLexer()
+        pygments = PygmentsLexer(MarkdownLexer)
+        # the first render lexes the visible lines
+        keystrokes(incremental, lines[:-1])
+        keystrokes(pygments, lines[:-1])
+        print(
+            f"{n:>7} lines  MarkdownCodeLexer {keystrokes(incremental, lines):7.3f} ms/key  "
+            f"PygmentsLexer {keystrokes(pygments, lines):7.3f} ms/key"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures the time a bracketed paste takes as it grows, when the terminal delivers it in reads of 1 KiB:
+parsed by PasteParser and by prompt_toolkit's Vt100Parser, and pasted into the editor end to end.
+
+    $ python benchmarks/bench_paste.py
+"""
+import threading
+import time
+
+from prompt_toolkit.input.ansi_escape_sequences import REVERSE_ANSI_SEQUENCES
+from prompt_toolkit.input.defaults import create_pipe_input
+from prompt_toolkit.input.vt100_parser import Vt100Parser
+from prompt_toolkit.keys import Keys
+from prompt_toolkit.output import DummyOutput
+
+from pmemo.paste import PASTE_END, PasteParser
+from pmemo.pmemo_editor import PmemoEditor
+
+SIZES_MB = (0.5, 1, 5)
+READ_SIZE = 1024
+PASTE_START = "\x1b[200~"
+LOG_LINE = "2024-01-01 12:00:00 INFO [worker-1] request took (12 ms) {ok}\n"
+
+
+def parse(parser_class, data: str) -> float:
+    parser = parser_class(lambda key_press: None)
+    start = time.perf_counter()
+    for i in range(0, len(data), READ_SIZE):
+        parser.feed(data[i : i + READ_SIZE])
+    return time.perf_counter() - start
+
+
+def paste(pasted: str) -> float:
+    editor = PmemoEditor()
+    with create_pipe_input() as pipe_input:
+        keys = "".join(
+            (
+                PASTE_START,
+                pasted,
+                PASTE_END,
+                REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                REVERSE_ANSI_SEQUENCES[Keys.Enter],
+            )
+        )
+        # the pipe holds less than the paste until the editor reads it
+        threading.Thread(target=pipe_input.send_text, args=(keys,), daemon=True).start()
+        start = time.perf_counter()
+        editor.text("Memo", input=pipe_input, output=DummyOutput())
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    for size in SIZES_MB:
+        pasted = LOG_LINE * int(size * 1024 * 1024 / len(LOG_LINE))
+        data = f"{PASTE_START}{pasted}{PASTE_END}"
+        print(
+            f"{size:>4} MB  PasteParser {parse(PasteParser, data):6.3f} s  "
+            f"Vt100Parser {parse(Vt100Parser, data):7.3f} s  "
+            f"editor {paste(pasted):6.3f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures the latency of content search queries with rare and common terms and phrases.
+
+    $ python benchmarks/bench_search.py
+"""
+import random
+import string
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from pmemo.search import SearchIndex
+
+N_MEMOS = (1_000, 50_000)
+WORDS_PER_MEMO = 200
+# the first words are in nearly every memo
+QUERIES = ("the", "the memo", '"the memo"', "zqxv", "memo zqxv", "pyt")
+
+
+def make_documents(out_dir: Path, n: int) -> list[tuple[Path, str]]:
+    rng = random.Random(0)
+    words = ["the", "memo", "python"] + [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        for _ in range(20_000)
+    ]
+    weights = [50.0, 20.0, 5.0] + [1.0] * (len(words) - 3)
+    return [
+        (
+            out_dir / f"memo{i}.md",
+            f"memo{i}\n" + " ".join(rng.choices(words, weights, k=WORDS_PER_MEMO)),
+        )
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    for n in N_MEMOS:
+        with TemporaryDirectory() as tmp_dir:
+            out_dir = Path(tmp_dir)
+            index = SearchIndex(out_dir, documents=lambda: [])
+            index.reindex(make_documents(out_dir, n))
+            for query in QUERIES:
+                start = time.perf_counter()
+                results = index.search(query)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(
+                    f"{n:>7} memos  {query!r:<14}{elapsed:8.2f} ms"
+                    f"  {len(results)} results"
+                )
+            index.close()
+
+
+if __name__ == "__main__":
+    main()
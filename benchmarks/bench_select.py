@@ -0,0 +1,39 @@
+"""
+Measures the time and memory a render of the selector's candidate list takes as the number of choices grows.
+
+    $ python benchmarks/bench_select.py
+"""
+import time
+import tracemalloc
+
+from prompt_toolkit.application import DummyApplication
+from prompt_toolkit.application.current import set_app
+
+from pmemo.custom_select import CustomFormattedTextControl
+
+N_CHOICES = (100, 10_000, 100_000, 1_000_000)
+N_RENDERS = 100
+WIDTH = 80
+HEIGHT = 30
+
+
+def main() -> None:
+    for n in N_CHOICES:
+        choices = [f"memo_{i:07d}" for i in range(n)]
+        control = CustomFormattedTextControl(lambda: choices)
+        # outside of a running application every render would build a new dummy one
+        with set_app(DummyApplication()):
+            tracemalloc.start()
+            start = time.perf_counter()
+            for _ in range(N_RENDERS):
+                control.preferred_height(WIDTH, HEIGHT, False, None)
+                control.create_content(WIDTH, HEIGHT)
+                control.move_page_down()
+            elapsed = (time.perf_counter() - start) / N_RENDERS * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"{n:>9} choices  {elapsed:6.3f} ms/render  {peak / 1024:8.1f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Measures how long the pm command takes to start: the interpreter alone, importing pmemo.main,
+which every command does, `pm --help`, and importing what the editor, the selectors and push/pull add.
+
+    $ python benchmarks/bench_startup.py
+"""
+import subprocess
+import sys
+import time
+
+N_RUNS = 10
+CASES = {
+    "interpreter": "pass",
+    "import pmemo.main": "import pmemo.main",
+    "pm --help": (
+        "import sys; sys.argv = ['pm', '--help']; from pmemo.main import main; main()"
+    ),
+    "+ editor": (
+        "import pmemo.main, pmemo.pmemo_editor, pmemo.extensions.openai_completion"
+    ),
+    "+ selectors": "import pmemo.main, pmemo.custom_select",
+    "+ push/pull": "import pmemo.main, pmemo.api.auth, pmemo.api.client",
+}
+
+
+def startup_time(code: str) -> float:
+    times = []
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    for name, code in CASES.items():
+        print(f"{name}: {startup_time(code) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Measures the time an auto-suggestion lookup takes as the number of indexed lines grows,
+compared with scanning the lines from the most recent one.
+
+    $ python benchmarks/bench_suggest.py
+"""
+import random
+import string
+import time
+
+from pmemo.suggest import PrefixIndex
+
+N_LINES = (10_000, 100_000, 1_000_000)
+N_LOOKUPS = 1_000
+N_SCANS = 10
+
+
+def scan(lines: list[str], prefix: str):
+    return next((line for line in reversed(lines) if line.startswith(prefix)), None)
+
+
+def main() -> None:
+    rand = random.Random(0)
+    for n in N_LINES:
+        lines = [
+            " ".join(
+                "".join(rand.choices(string.ascii_lowercase, k=5)) for _ in range(6)
+            )
+            for _ in range(n)
+        ]
+        prefixes = [rand.choice(lines)[: rand.randint(1, 12)] for _ in range(N_LOOKUPS)]
+        start = time.perf_counter()
+        index = PrefixIndex(lines)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for prefix in prefixes:
+            index.find(prefix)
+        lookup = (time.perf_counter() - start) / N_LOOKUPS * 1000
+
+        # the worst case of a scan is a prefix that only the oldest line has
+        start = time.perf_counter()
+        for _ in range(N_SCANS):
+            scan(lines, lines[0])
+        scanned = (time.perf_counter() - start) / N_SCANS * 1000
+        print(
+            f"{n:>9} lines  build {build:6.2f} s  "
+            f"{lookup:6.3f} ms/lookup  {scanned:8.3f} ms/scan"
+        )
+
+
+if __name__ == "__main__":
+    main()
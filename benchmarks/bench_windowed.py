@@ -0,0 +1,52 @@
+"""
+Measures opening a large memo in the editor and typing in it, with the whole memo in the buffer
+and in the large memo mode, where the buffer holds only a window of lines around the cursor.
+
+    $ python benchmarks/bench_windowed.py
+"""
+import time
+
+from prompt_toolkit.input.ansi_escape_sequences import REVERSE_ANSI_SEQUENCES
+from prompt_toolkit.input.defaults import create_pipe_input
+from prompt_toolkit.keys import Keys
+from prompt_toolkit.output import DummyOutput
+
+from pmemo.pmemo_editor import PmemoEditor
+
+N_LINES = 200_000
+N_KEYSTROKES = 20
+
+
+def edit(editor: PmemoEditor, memo: str, keys: str) -> float:
+    with create_pipe_input() as pipe_input:
+        pipe_input.send_text(
+            keys
+            + REVERSE_ANSI_SEQUENCES[Keys.Escape]
+            + REVERSE_ANSI_SEQUENCES[Keys.Enter]
+        )
+        start = time.perf_counter()
+        editor.text("Memo", default=memo, input=pipe_input, output=DummyOutput())
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    memo = "\n".join(
+        f"line {i}: the quick brown fox jumps over the lazy dog" for i in range(N_LINES)
+    )
+    print(f"memo: {len(memo) / 1e6:.1f} MB, {N_LINES} lines")
+    for name, large_memo_chars in [
+        ("whole memo", len(memo)),
+        ("large memo mode", len(memo) - 1),
+    ]:
+        editor = PmemoEditor(large_memo_chars=large_memo_chars)
+        edit(editor, "", "")
+        opened = edit(editor, memo, "")
+        typed = edit(editor, memo, "x" * N_KEYSTROKES)
+        print(
+            f"{name}: open {opened * 1000:.0f} ms, "
+            f"{(typed - opened) / N_KEYSTROKES * 1000:.1f} ms per keystroke"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import hashlib
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional
+
+from pmemo.fileio import WriteTransaction, holds_bytes
+
+BLOBS_DIR_NAME = ".blobs"
+BLOB_PREFIX_LENGTH = 2
+# a blob is shared by every codeblock file linked to it, so it must not be edited in place
+BLOB_MODE = 0o444
+
+
+class BlobStore:
+    """
+    Content-addressed store of codeblock files under out_dir/.blobs/<first 2 hex digits>/<sha256>.
+    Memo directories hold hard links to the blobs, so a snippet shared by many memos is stored once
+    and saving a snippet that is already stored only creates a link.
+    A blob whose link count dropped to 1 is referenced by no memo and is collected by gc.
+    Blobs are read-only, and one that no longer holds its content, e.g. a codeblock file edited in place anyway,
+    is written again by the next save of the content, which links its codeblock files to the new blob.
+    """
+
+    def __init__(self, out_dir: Path) -> None:
+        self._root = out_dir / BLOBS_DIR_NAME
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def blob_path(self, data: bytes) -> Path:
+        digest = hashlib.sha256(data).hexdigest()
+        return self._root / digest[:BLOB_PREFIX_LENGTH] / digest
+
+    def put(self, data: bytes, transaction: WriteTransaction) -> Path:
+        """
+        Stages data to be stored unless a blob holds it already.
+
+        Args:
+            data (bytes): The content of the blob.
+            transaction (WriteTransaction): The transaction the write is staged in.
+
+        Returns:
+            Path: The path of the blob.
+        """
+        blob_path = self.blob_path(data)
+        if blob_path not in transaction and not holds_bytes(blob_path, data):
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            transaction.write_bytes(blob_path, data, BLOB_MODE)
+        return blob_path
+
+    @staticmethod
+    def is_linked(file_path: Path, blob_path: Path) -> bool:
+        try:
+            return file_path.samefile(blob_path)
+        except FileNotFoundError:
+            return False
+
+    def __iter__(self) -> Iterator[Path]:
+        return self._root.glob("/".join(("?" * BLOB_PREFIX_LENGTH, "*")))
+
+    def blob_of(self, file_path: Path) -> Optional[Path]:
+        """
+        Returns the blob file_path is linked to, if any.
+        """
+        try:
+            blob_path = self.blob_path(file_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        return blob_path if self.is_linked(file_path, blob_path) else None
+
+    def collect(
+        self,
+        blob_paths: Iterable[Path],
+        dry_run: bool = False,
+        released: Optional[Mapping[int, int]] = None,
+    ) -> list[Path]:
+        """
+        Removes the given blobs that no memo links to.
+
+        Args:
+            blob_paths (Iterable[Path]): The blobs to check.
+            dry_run (bool): When True, nothing is removed. Defaults to False.
+            released (Optional[Mapping[int, int]]): The number of links per inode that are about to be removed,
+                so that a dry run reports the blobs they would leave unreferenced.
+
+        Returns:
+            list[Path]: The removed blobs.
+        """
+        removed = []
+        for blob_path in blob_paths:
+            try:
+                stat = blob_path.stat()
+            except FileNotFoundError:
+                continue
+            links = stat.st_nlink - (released or {}).get(stat.st_ino, 0)
+            if links <= 1:
+                removed.append(blob_path)
+                if not dry_run:
+                    blob_path.unlink()
+        if not dry_run:
+            for shard in {blob_path.parent for blob_path in removed}:
+                if not any(shard.iterdir()):
+                    shard.rmdir()
+        return removed
+
+    def gc(
+        self, dry_run: bool = False, released: Optional[Mapping[int, int]] = None
+    ) -> list[Path]:
+        """
+        Removes the blobs no memo links to. See collect for the arguments.
+        """
+        return self.collect(list(self), dry_run, released)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from operator import attrgetter
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping, NamedTuple, Optional
+
+
+class Candidate(NamedTuple):
+    name: str
+    path: Path
+    mtime: float
+
+
+def scan_files(dir: Path, pattern: str) -> Iterator[Candidate]:
+    """
+    Yields the files in dir matching pattern, named by their stem, as they are found.
+    """
+    for file_path in dir.glob(pattern):
+        try:
+            mtime = file_path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        yield Candidate(file_path.stem, file_path, mtime)
+
+
+def _ignore() -> None:
+    pass
+
+
+class CandidateStream(Mapping[str, Path]):
+    """
+    Candidates produced by a background thread, e.g. while a slow directory is scanned.
+    The candidates received so far map their names to their paths, most recently modified first,
+    so a selector can show and match them before the scan finishes.
+    Candidates arriving later are merged in by refresh, which keeps the order without sorting everything again.
+    """
+
+    def __init__(self, source: Iterable[Candidate]) -> None:
+        self._source = source
+        self._lock = threading.Lock()
+        self._received: list[Candidate] = []
+        self._candidates: list[Candidate] = []
+        self._by_name: dict[str, Candidate] = {}
+        self._names: list[str] = []
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[Exception] = None
+
+    def start(self, on_update: Callable[[], object] = _ignore) -> None:
+        """
+        Starts taking candidates from the source in a background thread.
+
+        Args:
+            on_update (Callable[[], object]): Called from the background thread whenever candidates arrive
+                and when the source is exhausted.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._produce, args=(on_update,), daemon=True
+            )
+            self._thread.start()
+
+    def _produce(self, on_update: Callable[[], object]) -> None:
+        try:
+            for candidate in self._source:
+                if self._stop.is_set():
+                    return
+                with self._lock:
+                    self._received.append(candidate)
+                on_update()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+            on_update()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the source is exhausted, and returns whether it is.
+        """
+        return self._done.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Stops taking candidates from the source.
+        """
+        self._stop.set()
+
+    def refresh(self) -> bool:
+        """
+        Merges the candidates received since the last refresh into the ordered candidates.
+        A name that was received before keeps its first candidate.
+
+        Returns:
+            bool: True when there were new candidates.
+        """
+        with self._lock:
+            received, self._received = self._received, []
+        new = []
+        for candidate in received:
+            if candidate.name not in self._by_name:
+                self._by_name[candidate.name] = candidate
+                new.append(candidate)
+        if not new:
+            return False
+        new.sort(key=attrgetter("mtime"), reverse=True)
+        self._candidates = list(
+            heapq.merge(self._candidates, new, key=attrgetter("mtime"), reverse=True)
+        )
+        self._names = [candidate.name for candidate in self._candidates]
+        return True
+
+    def names(self) -> list[str]:
+        return self._names
+
+    def candidate(self, name: str) -> Candidate:
+        return self._by_name[name]
+
+    def __getitem__(self, name: str) -> Path:
+        return self._by_name[name].path
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from pmemo.codeblock import iter_codeblocks
+from pmemo.fileio import read_text
+from pmemo.layout import iter_memo_files
+
+CATALOG_FILE_NAME = ".catalog.sqlite3"
+
+
+class CatalogEntry(NamedTuple):
+    title: str
+    path: Path
+    mtime: float
+    size: int
+    sha256: str
+    # the JSON list of the codeblock names, parsed only by the callers that need them
+    codeblocks_json: str
+
+    @property
+    def codeblocks(self) -> list[str]:
+        return json.loads(self.codeblocks_json)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class MemoCatalog:
+    """
+    Persistent catalog of the memos stored under out_dir.
+    It keeps title, path, mtime, size, content hash and codeblock names of every memo
+    so that listing memos does not need to glob and stat the whole out_dir.
+    The catalog is rebuilt from the file system when it does not exist yet.
+    """
+
+    def __init__(self, out_dir: Path, title_max_length: int = 30) -> None:
+        """
+        Initializes a MemoCatalog instance. The database is opened lazily.
+
+        Args:
+            out_dir (Path): The output directory where memos are stored.
+            title_max_length (int): Max length of codeblock's title. Defaults to 30.
+        """
+        self._out_dir = out_dir
+        self._title_max_length = title_max_length
+        self._db_path = out_dir / CATALOG_FILE_NAME
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def out_dir(self) -> Path:
+        return self._out_dir
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._out_dir.mkdir(parents=True, exist_ok=True)
+            is_new = not self._db_path.exists()
+            self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS memos ("
+                    "title TEXT PRIMARY KEY, path TEXT NOT NULL, mtime REAL NOT NULL, "
+                    "size INTEGER NOT NULL, sha256 TEXT NOT NULL, codeblocks TEXT NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS memos_mtime ON memos (mtime DESC)"
+                )
+            if is_new:
+                self.reindex()
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _to_entry(self, row: tuple) -> CatalogEntry:
+        title, path, mtime, size, sha256, codeblocks_json = row
+        return CatalogEntry(
+            title, self._out_dir / path, mtime, size, sha256, codeblocks_json
+        )
+
+    def _select(self, columns: str, prefix: str) -> sqlite3.Cursor:
+        # the callers select only the columns they need, e.g. pm list only needs the paths
+        return self.connection.execute(
+            f"SELECT {columns} FROM memos WHERE substr(title, 1, ?) = ? "
+            "ORDER BY mtime DESC",
+            (len(prefix), prefix),
+        )
+
+    def update(self, file_path: Path, content: str, codeblocks: list[str]) -> None:
+        """
+        Adds or replaces the entry of a saved memo.
+
+        Args:
+            file_path (Path): The path of the memo file.
+            content (str): The content written to the memo file.
+            codeblocks (list[str]): The names of the codeblock files of the memo.
+        """
+        stat = file_path.stat()
+        with self.connection as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO memos VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    file_path.stem,
+                    str(file_path.relative_to(self._out_dir)),
+                    stat.st_mtime,
+                    stat.st_size,
+                    content_hash(content),
+                    json.dumps(codeblocks),
+                ),
+            )
+
+    def remove(self, title: str) -> None:
+        with self.connection as conn:
+            conn.execute("DELETE FROM memos WHERE title = ?", (title,))
+
+    def relocate(self, title: str, file_path: Path) -> None:
+        with self.connection as conn:
+            conn.execute(
+                "UPDATE memos SET path = ? WHERE title = ?",
+                (str(file_path.relative_to(self._out_dir)), title),
+            )
+
+    def get(self, title: str) -> Optional[CatalogEntry]:
+        row = self.connection.execute(
+            "SELECT * FROM memos WHERE title = ?", (title,)
+        ).fetchone()
+        return self._to_entry(row) if row is not None else None
+
+    def iter_entries(self, prefix: str = "") -> Iterator[CatalogEntry]:
+        """
+        Yields the catalog entries in descending order based on modification time, as they are read.
+
+        Args:
+            prefix (str): Only entries whose title starts with prefix are yielded.
+
+        Yields:
+            CatalogEntry: The sorted entries.
+        """
+        return map(self._to_entry, self._select("*", prefix))
+
+    def entries(self, prefix: str = "") -> list[CatalogEntry]:
+        return list(self.iter_entries(prefix))
+
+    def titles(self, prefix: str = "") -> list[str]:
+        return [title for title, in self._select("title", prefix)]
+
+    def paths(self, prefix: str = "") -> list[Path]:
+        return [self._out_dir / path for path, in self._select("path", prefix)]
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM memos").fetchone()[0]
+
+    def reindex(self) -> int:
+        """
+        Rebuilds the catalog from the memo files under out_dir.
+        This is needed after memos are changed outside of pmemo.
+
+        Returns:
+            int: The number of indexed memos.
+        """
+        rows = []
+        for file_path in iter_memo_files(self._out_dir):
+            content = read_text(file_path)
+            stat = file_path.stat()
+            rows.append(
+                (
+                    file_path.stem,
+                    str(file_path.relative_to(self._out_dir)),
+                    stat.st_mtime,
+                    stat.st_size,
+                    content_hash(content),
+                    json.dumps(
+                        [
+                            codeblock.blockname
+                            for codeblock in iter_codeblocks(
+                                content, self._title_max_length
+                            )
+                        ]
+                    ),
+                )
+            )
+        with self.connection as conn:
+            conn.execute("DELETE FROM memos")
+            conn.executemany(
+                "INSERT OR REPLACE INTO memos VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import re
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
+
+from pmemo.fileio import DEFAULT_ENCODING
+
+FENCE = "```"
+RE_FENCE_INFO = re.compile(r"([^:\s]*):?(.*)")
+LANG_EXT = {"markdown": ".md", "python": ".py", "python3": ".py"}
+
+
+class Codeblock(NamedTuple):
+    lang: str
+    blockname: str
+    code: str
+    start_line: int
+    end_line: int
+
+
+def _codeblock_name(blockname: str, raw_code: str, title_max_length: int) -> str:
+    return (
+        blockname.strip()
+        if blockname.strip()
+        else hashlib.sha256(bytes(raw_code, DEFAULT_ENCODING)).hexdigest()[
+            :title_max_length
+        ]
+    )
+
+
+def open_fence(line: str) -> Optional[tuple[int, str]]:
+    """
+    Matches a line that opens a codeblock, i.e. a fence followed by an info string without backticks.
+    As with the regex that used to find codeblocks, the fence may follow text, as in "see ```python".
+
+    Returns:
+        Optional[tuple[int, str]]: The number of backticks of the fence and the info string, or None.
+    """
+    start = line.find(FENCE)
+    if start < 0:
+        return None
+    fence = line[start:].strip()
+    length = len(fence) - len(fence.lstrip("`"))
+    if "`" in fence[length:]:
+        # inline code such as ```code```
+        return None
+    return length, fence[length:]
+
+
+def close_fence(line: str, open_length: int) -> Optional[str]:
+    """
+    Matches a line that closes a codeblock opened by a fence of open_length backticks,
+    i.e. that ends with at least as many backticks. As with the regex that used to find codeblocks,
+    the fence may follow the last code line, as in "print(1)```".
+
+    Returns:
+        Optional[str]: The code before the fence, which is empty for a fence on a line by itself, or None.
+    """
+    stripped = line.rstrip()
+    code = stripped.rstrip("`")
+    if len(stripped) - len(code) < open_length:
+        return None
+    return code if code.strip() else ""
+
+
+def iter_codeblocks(
+    source: Union[str, Iterable[str]], title_max_length: int = 30
+) -> Iterator[Codeblock]:
+    """
+    Yields the fenced code blocks of the given text line by line in linear time.
+    A block is closed by a fence of at least as many backticks without an info string,
+    so longer fences can contain shorter ones. Unterminated blocks are not yielded.
+    Fences that follow text or code on their line are accepted, see open_fence and close_fence.
+
+    Args:
+        source (Union[str, Iterable[str]]): The text, or an iterable of lines such as a file object.
+        title_max_length (int): Max length of codeblock's title. Defaults to 30.
+
+    Yields:
+        Codeblock: lang, blockname, code and the line numbers (0-based) of the opening and closing fences.
+    """
+    lines = io.StringIO(source) if isinstance(source, str) else source
+    fence_length = 0
+    info = ""
+    start_line = 0
+    code_lines: list[str] = []
+    for line_number, line in enumerate(lines):
+        if not fence_length:
+            fence = open_fence(line)
+            if fence is not None:
+                fence_length, info = fence
+                start_line = line_number
+                code_lines = []
+            continue
+        code = close_fence(line, fence_length)
+        if code is None:
+            code_lines.append(line)
+            continue
+        code_lines.append(code)
+        match = RE_FENCE_INFO.fullmatch(info)
+        lang, blockname = match.groups() if match else ("", "")
+        lang = lang.strip() if lang else "python"
+        raw_code = "".join(code_lines)
+        blockname = "".join(
+            (
+                _codeblock_name(blockname, raw_code, title_max_length),
+                LANG_EXT.get(lang, ""),
+            )
+        )
+        yield Codeblock(lang, blockname, raw_code.strip(), start_line, line_number)
+        fence_length = 0
+
+
+def extract_codeblocks(
+    text: str, title_max_length: int = 30
+) -> list[tuple[str, str, str]]:
+    """
+    Extracts code blocks from the given text and returns a list of tuples representing the code blocks.
+
+    Args:
+        text (str): The input text from which code blocks are extracted.
+        title_max_length (int): Max length of codeblock's title. Defaults to 30.
+
+    Returns:
+        list[tuple[str, str, str]]: A list of tuples representing code blocks. Each tuple contains three elements:
+                                    - lang (str): The language of the code block.
+                                    - blockname (str): The name or identifier of the code block.
+                                    - code (str): The actual code contained in the block.
+    """
+    return [
+        (codeblock.lang, codeblock.blockname, codeblock.code)
+        for codeblock in iter_codeblocks(text, title_max_length)
+    ]
@@ -1,10 +1,12 @@
-from functools import partial
+import shutil
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Union
+from typing import Any, Callable, Hashable, Mapping, Optional, Sequence, Union
 
 from prompt_toolkit.application import Application
+from prompt_toolkit.data_structures import Point
 from prompt_toolkit.filters import IsDone
-from prompt_toolkit.formatted_text import AnyFormattedText
+from prompt_toolkit.formatted_text import AnyFormattedText, StyleAndTextTuples
 from prompt_toolkit.formatted_text.utils import to_plain_text
 from prompt_toolkit.key_binding import KeyBindings, KeyBindingsBase, merge_key_bindings
 from prompt_toolkit.keys import Keys
@@ -14,42 +16,132 @@ from prompt_toolkit.layout.containers import (
     VSplit,
     Window,
 )
-from prompt_toolkit.layout.controls import FormattedTextControl
+from prompt_toolkit.layout.controls import (
+    FormattedTextControl,
+    GetLinePrefixCallable,
+    UIContent,
+)
+from prompt_toolkit.layout.dimension import Dimension
 from prompt_toolkit.layout.layout import Layout
-from prompt_toolkit.styles import Style
+from prompt_toolkit.styles import Style, merge_styles, style_from_pygments_cls
+from prompt_toolkit.utils import get_cwidth
 from prompt_toolkit.widgets import TextArea
+from pygments.styles import get_style_by_name
 
-from pmemo.utils import error_handler, sort_by_mtime
+from pmemo.candidates import Candidate, CandidateStream, scan_files
+from pmemo.fuzzy import FuzzyMatcher
+from pmemo.highlight import highlight_markdown
+from pmemo.preview import PreviewCache
+from pmemo.query_worker import QueryWorker
+from pmemo.storage.base import StorageBase
+from pmemo.utils import error_handler, read_head
 
 ITEM_CLASS = "class:item"
 SELECTED_CLASS = "class:selected"
+STATUS_CLASS = "class:status"
+MARKED_CLASS = "class:marked"
+MARK = "* "
+STATUS_SCANNING = "scanning"
+STATUS_FAILED = "scan failed"
+QUERY_PROMPT = "QUERY> "
+SEARCH_PROMPT = "SEARCH> "
+# lists up to this long are matched on the event loop, longer ones by a background worker
+MAX_SYNC_CHOICES = 20_000
+# the previews of this many choices above and below the cursor are loaded ahead
+PREFETCH_DISTANCE = 1
 
 
 class CustomFormattedTextControl(FormattedTextControl):
-    def __init__(self, text: AnyFormattedText, *args, **kwargs) -> None:
+    """
+    Displays the choices as a list with one highlighted row.
+    With multiple=True, tab marks the pointed choice and ctrl-a marks every match, and Enter returns the marks.
+    Only the rows that fit in the window are rendered, so drawing the list costs the same
+    for a hundred choices as for a million.
+    """
+
+    def __init__(
+        self,
+        get_choices: Callable[[], Sequence[str]],
+        *args,
+        multiple: bool = False,
+        **kwargs,
+    ) -> None:
         super(CustomFormattedTextControl, self).__init__(
-            self._convert_callable_text(text), *args, **kwargs
+            self._get_visible_fragments, *args, **kwargs
         )
+        self.get_cursor_position = self._get_cursor_position
+        self._get_choices = get_choices
+        self.multiple = multiple
         self.pointed_at = 0
+        # an ordered set of the marked choices
+        self.marked: dict[str, None] = {}
+        # the first visible row and the number of rows the window had at the last render
+        self._top = 0
+        self._height = 1
 
     @property
     def choice_count(self) -> int:
-        return len(self._fragments) if self._fragments is not None else 0
+        return len(self._get_choices())
+
+    @property
+    def page_size(self) -> int:
+        return self._height
+
+    def _visible_range(self, choice_count: int) -> range:
+        self.pointed_at = max(0, min(self.pointed_at, choice_count - 1))
+        if self.pointed_at < self._top:
+            self._top = self.pointed_at
+        elif self.pointed_at >= self._top + self._height:
+            self._top = self.pointed_at - self._height + 1
+        self._top = max(0, min(self._top, choice_count - self._height))
+        return range(self._top, min(self._top + self._height, choice_count))
 
-    def _convert_callable_text(self, text: AnyFormattedText) -> AnyFormattedText:
-        if callable(text):
+    def _get_visible_fragments(self) -> StyleAndTextTuples:
+        choices = self._get_choices()
+        visible = self._visible_range(len(choices))
+        fragments: StyleAndTextTuples = []
+        for i in visible:
+            if self.multiple:
+                fragments.append(
+                    (MARKED_CLASS, MARK)
+                    if choices[i] in self.marked
+                    else (ITEM_CLASS, " " * len(MARK))
+                )
+            # no newline after the last row, which would add an empty line to the window
+            fragments.append(
+                (
+                    SELECTED_CLASS if i == self.pointed_at else ITEM_CLASS,
+                    "".join((choices[i], "\n" if i < visible.stop - 1 else "")),
+                )
+            )
+        return fragments
 
-            def wrapper():
-                choices = []
-                for i, (style, item) in enumerate(text()):
-                    if i == self.pointed_at:
-                        choices.append((SELECTED_CLASS, item))
-                    else:
-                        choices.append((style, item))
-                return choices
+    def _get_cursor_position(self) -> Point:
+        # keeps the window from scrolling the rows rendered for it
+        return Point(x=0, y=self.pointed_at - self._top)
 
-            return wrapper
-        return text
+    def preferred_width(self, max_available_width: int) -> int:
+        choices = self._get_choices()
+        return max(
+            (get_cwidth(choices[i]) for i in self._visible_range(len(choices))),
+            default=0,
+        )
+
+    def preferred_height(
+        self,
+        width: int,
+        max_available_height: int,
+        wrap_lines: bool,
+        get_line_prefix: Optional[GetLinePrefixCallable],
+    ) -> Optional[int]:
+        return min(self.choice_count, max_available_height)
+
+    def create_content(self, width: int, height: Optional[int]) -> UIContent:
+        if height is not None:
+            self._height = max(height, 1)
+        # the fragments depend on the height, so they are not reused from an earlier call
+        self._fragment_cache.clear()
+        return super(CustomFormattedTextControl, self).create_content(width, height)
 
     def move_cursor_up(self) -> None:
         self.pointed_at -= 1
@@ -59,9 +151,55 @@ class CustomFormattedTextControl(FormattedTextControl):
         self.pointed_at += 1
         self.pointed_at %= self.choice_count if self.choice_count > 0 else 1
 
-    def get_pointed_at(self) -> AnyFormattedText:
-        self.pointed_at = max(0, min(self.pointed_at, self.choice_count - 1))
-        return self._fragments[self.pointed_at][1] if self._fragments else None
+    def move_page_up(self) -> None:
+        self.pointed_at = max(self.pointed_at - self.page_size, 0)
+
+    def move_page_down(self) -> None:
+        self.pointed_at = max(
+            min(self.pointed_at + self.page_size, self.choice_count - 1), 0
+        )
+
+    def move_to_first(self) -> None:
+        self.pointed_at = 0
+
+    def move_to_last(self) -> None:
+        self.pointed_at = max(self.choice_count - 1, 0)
+
+    def toggle_mark(self) -> None:
+        pointed_at = self.get_pointed_at()
+        if pointed_at is None:
+            return
+        if pointed_at in self.marked:
+            del self.marked[pointed_at]
+        else:
+            self.marked[pointed_at] = None
+        if self.pointed_at < self.choice_count - 1:
+            self.pointed_at += 1
+
+    def toggle_mark_all(self) -> None:
+        """
+        Marks every matching choice, or unmarks them when all of them are marked.
+        """
+        choices = self._get_choices()
+        if all(choice in self.marked for choice in choices):
+            for choice in choices:
+                self.marked.pop(choice, None)
+        else:
+            self.marked.update(dict.fromkeys(choices))
+
+    def get_selection(self) -> list[str]:
+        """
+        Returns the marked choices in the order they were marked, or the pointed choice when none is marked.
+        """
+        if self.marked:
+            return list(self.marked)
+        pointed_at = self.get_pointed_at()
+        return [pointed_at] if pointed_at is not None else []
+
+    def get_pointed_at(self) -> Optional[str]:
+        choices = self._get_choices()
+        self.pointed_at = max(0, min(self.pointed_at, len(choices) - 1))
+        return choices[self.pointed_at] if choices else None
 
     def get_key_bindings(self) -> KeyBindingsBase:
         bindings = KeyBindings()
@@ -78,10 +216,36 @@ class CustomFormattedTextControl(FormattedTextControl):
         def _(event):
             self.move_cursor_down()
 
+        @bindings.add(Keys.PageUp)
+        def _(event):
+            self.move_page_up()
+
+        @bindings.add(Keys.PageDown)
+        def _(event):
+            self.move_page_down()
+
+        @bindings.add(Keys.Home)
+        def _(event):
+            self.move_to_first()
+
+        @bindings.add(Keys.End)
+        def _(event):
+            self.move_to_last()
+
+        @bindings.add(Keys.Tab, filter=self.multiple)
+        def _(event):
+            self.toggle_mark()
+
+        @bindings.add(Keys.ControlA, filter=self.multiple)
+        def _(event):
+            self.toggle_mark_all()
+
         @bindings.add(Keys.Enter)
         def _(event):
-            content = self.get_pointed_at()
-            event.app.exit(content)
+            if self.multiple:
+                event.app.exit(self.get_selection())
+            else:
+                event.app.exit(self.get_pointed_at())
 
         return (
             bindings
@@ -90,66 +254,375 @@ class CustomFormattedTextControl(FormattedTextControl):
         )
 
 
-@error_handler
-def custom_select(
-    choices: Union[list[str], dict[str, Path]], max_preview_height: int = 10, **kwargs
-) -> str:
-    """Choose one option from a list of choices while searching with a specified query, similar to using the "peco"
-    If the execution is interrupted by a "KeyboardInterrupt" (typically triggered by pressing Ctrl+C), the program will be terminated.
+class _Selection(Sequence[str]):
+    """
+    The choices at the given indices, looked up when they are displayed rather than copied.
+    """
 
-    Args:
-        choices (Union[list[str], dict[str, Path]]): list or dict of choices displayed on the terminal.
+    def __init__(self, choices: Sequence[str], indices: Sequence[int]) -> None:
+        self._choices = choices
+        self._indices = indices
 
-    Returns:
-        str: string of the selected choice.
-    """
-    text_area = TextArea(prompt="QUERY> ", multiline=False)
+    def __len__(self) -> int:
+        return len(self._indices)
 
-    def filter_candidates(choices):
-        input_text = text_area.text
-        return [
-            (ITEM_CLASS, "".join((item, "\n")))
-            for item in choices
-            if input_text in item
-        ]
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._choices[j] for j in self._indices[i]]
+        return self._choices[self._indices[i]]
+
+
+def _preview_size() -> tuple[int, int]:
+    # the preview can not show more lines, or characters, than the terminal has
+    size = shutil.get_terminal_size()
+    return size.lines, size.lines * size.columns
+
+
+def _read_file_preview(files: Mapping[str, Path], choice: str) -> str:
+    return "".join(read_head(files[choice], *_preview_size()))
+
+
+def _preview_cache_key(
+    preview_key: Optional[Callable[[str], Hashable]], choice: str
+) -> Hashable:
+    # previews are cut to the size of the terminal, so they are cached per size
+    return (
+        choice if preview_key is None else preview_key(choice),
+        _preview_size(),
+    )
+
+
+def _highlighted_preview(
+    preview: Callable[[str], str], choice: str
+) -> StyleAndTextTuples:
+    return highlight_markdown(preview(choice))
+
+
+def _choice_set(matcher: FuzzyMatcher) -> frozenset[str]:
+    return frozenset(matcher.choices)
+
+
+def _file_preview_key(files: Mapping[str, Path], choice: str) -> tuple[Path, int]:
+    return files[choice], files[choice].stat().st_mtime_ns
+
+
+def _select(
+    choices: Union[list[str], dict[str, Path], CandidateStream],
+    max_preview_height: int,
+    search: Optional[Callable[[str], list[str]]],
+    preview: Optional[Callable[[str], str]],
+    preview_key: Optional[Callable[[str], Hashable]],
+    highlight_style: Optional[str],
+    multiple: bool,
+    **kwargs,
+) -> list[str]:
+    content_search = False
+    text_area = TextArea(
+        prompt=lambda: SEARCH_PROMPT if content_search else QUERY_PROMPT,
+        multiline=False,
+    )
+
+    matcher = FuzzyMatcher(list(choices))
+    choice_set = lru_cache(maxsize=1)(_choice_set)
+
+    def match(
+        input_text: str, content_search: bool, matcher: FuzzyMatcher
+    ) -> Sequence[str]:
+        if search is not None and content_search and input_text:
+            names = choice_set(matcher)
+            return [item for item in search(input_text) if item in names]
+        return _Selection(matcher.choices, matcher.match_indices(input_text))
+
+    filter_candidates = lru_cache(maxsize=1)(match)
+    # large lists are matched off the event loop, so typing stays responsive
+    worker: QueryWorker[tuple[str, bool, FuzzyMatcher], Sequence[str]] = QueryWorker(
+        lambda query: match(*query), lambda: app.invalidate()
+    )
+    shown_query = ("", False)
+    shown = filter_candidates("", False, matcher)
+
+    def get_candidates() -> Sequence[str]:
+        nonlocal matcher, shown_query, shown
+        if isinstance(choices, CandidateStream) and choices.refresh():
+            matcher = FuzzyMatcher(choices.names())
+        query = (text_area.text, content_search)
+        # content search queries the search index, which takes a while whatever the number of choices
+        if not query[0] or (len(matcher) <= MAX_SYNC_CHOICES and not query[1]):
+            candidates = filter_candidates(*query, matcher)
+        else:
+            worker.submit((*query, matcher))
+            result = worker.result()
+            # the previous candidates stay shown until the query is matched
+            candidates = result[1] if result is not None else shown
+        if candidates is not shown and query == shown_query:
+            # the cursor stays on the choice it points at while new choices are merged in
+            if 0 < control.pointed_at < len(shown):
+                pointed_at = shown[control.pointed_at]
+                control.pointed_at = next(
+                    (i for i, item in enumerate(candidates) if item == pointed_at), 0
+                )
+        shown_query, shown = query, candidates
+        return candidates
 
     control = CustomFormattedTextControl(
-        partial(filter_candidates, choices), focusable=True
+        get_candidates, multiple=multiple, focusable=True
     )
 
     candidates_display = ConditionalContainer(Window(control), ~IsDone())
 
-    def get_memo_content() -> str:
+    def get_status() -> str:
+        assert isinstance(choices, CandidateStream)
+        status = f"{len(get_candidates())}/{len(choices)}"
+        if choices.error is not None:
+            return f"{status} ({STATUS_FAILED}: {choices.error})"
+        return status if choices.done else f"{status} ({STATUS_SCANNING})"
+
+    status_display = ConditionalContainer(
+        Window(FormattedTextControl(get_status), height=1, style=STATUS_CLASS),
+        ~IsDone(),
+    )
+
+    if preview is None and isinstance(choices, Mapping):
+        preview = partial(_read_file_preview, choices)
+        if preview_key is None:
+            preview_key = partial(_file_preview_key, choices)
+    previews: Optional[PreviewCache[AnyFormattedText]] = None
+    if preview is not None:
+        previews = PreviewCache(
+            (
+                partial(_highlighted_preview, preview)
+                if highlight_style is not None
+                else preview
+            ),
+            partial(_preview_cache_key, preview_key),
+        )
+
+    def get_memo_content() -> AnyFormattedText:
         selected = to_plain_text(control.get_pointed_at()).strip()
-        return (
-            choices[selected].read_text()
-            if isinstance(choices, dict) and selected
-            else ""
+        if previews is None or not selected:
+            return ""
+        candidates = get_candidates()
+        previews.prefetch(
+            candidates[i]
+            for i in range(
+                max(control.pointed_at - PREFETCH_DISTANCE, 0),
+                min(control.pointed_at + PREFETCH_DISTANCE + 1, len(candidates)),
+            )
+            if i != control.pointed_at
         )
+        return previews.get(selected)
 
     preview_control = FormattedTextControl(get_memo_content, focusable=False)
     preview_display = ConditionalContainer(
         Window(
             preview_control,
-            height=max(len(choices), max_preview_height),
+            # grows with the candidate list, which is as high as the screen allows
+            height=Dimension(min=max_preview_height),
             wrap_lines=True,
             ignore_content_width=True,
         ),
         ~IsDone(),
     )
-    app: Application[AnyFormattedText] = Application(
+    bindings = KeyBindings()
+
+    @bindings.add(Keys.ControlF, filter=search is not None)
+    def toggle_content_search(event):
+        nonlocal content_search
+        content_search = not content_search
+        control.pointed_at = 0
+
+    is_stream = isinstance(choices, CandidateStream)
+    app: Application[Any] = Application(
         layout=Layout(
-            HSplit([text_area, VSplit([candidates_display, preview_display])])
+            HSplit(
+                [text_area]
+                + ([status_display] if is_stream else [])
+                + [VSplit([candidates_display, preview_display])]
+            )
+        ),
+        key_bindings=merge_key_bindings([control.get_key_bindings(), bindings]),
+        style=merge_styles(
+            [
+                Style(
+                    [
+                        ("item", ""),
+                        ("selected", "underline bg:#d980ff #ffffff"),
+                        ("status", "#888888"),
+                        ("marked", "bold #d980ff"),
+                    ]
+                ),
+                (
+                    style_from_pygments_cls(get_style_by_name(highlight_style))
+                    if highlight_style is not None
+                    else Style([])
+                ),
+            ]
         ),
-        key_bindings=control.get_key_bindings(),
-        style=Style([("item", ""), ("selected", "underline bg:#d980ff #ffffff")]),
         erase_when_done=True,
         **kwargs,
     )
-    return to_plain_text(app.run()).strip()
+    try:
+        result = app.run(
+            pre_run=partial(choices.start, app.invalidate)
+            if isinstance(choices, CandidateStream)
+            else None
+        )
+    finally:
+        worker.close()
+        if isinstance(choices, CandidateStream):
+            choices.close()
+        if previews is not None:
+            previews.close()
+    if multiple:
+        return list(result or [])
+    selected = to_plain_text(result).strip()
+    return [selected] if selected else []
+
+
+@error_handler
+def custom_select(
+    choices: Union[list[str], dict[str, Path], CandidateStream],
+    max_preview_height: int = 10,
+    search: Optional[Callable[[str], list[str]]] = None,
+    preview: Optional[Callable[[str], str]] = None,
+    preview_key: Optional[Callable[[str], Hashable]] = None,
+    highlight_style: Optional[str] = None,
+    **kwargs,
+) -> str:
+    """Choose one option from a list of choices while searching with a specified query, similar to using the "peco"
+    Choices are fuzzy matched and ranked, so they should be given most recent first.
+    If the execution is interrupted by a "KeyboardInterrupt" (typically triggered by pressing Ctrl+C), the program will be terminated.
+
+    Args:
+        choices (Union[list[str], dict[str, Path], CandidateStream]): list or dict of choices displayed on the terminal.
+            A CandidateStream is started when the selector opens, which shows its choices as they arrive.
+        search (Optional[Callable[[str], list[str]]]): returns the choices whose content matches the query.
+            When given, `ctrl-f` toggles between matching the choices and searching their content.
+        preview (Optional[Callable[[str], str]]): returns the preview of a choice.
+            Defaults to the head of the file of a dict choice.
+        preview_key (Optional[Callable[[str], Hashable]]): returns the key the preview of a choice is cached under,
+            which should change when the preview does. Defaults to the path and mtime of the file of a dict choice,
+            or the choice itself.
+        highlight_style (Optional[str]): the name of a Pygments style. When given, previews are shown as Markdown
+            with the fenced codeblocks highlighted in their language.
+
+    Returns:
+        str: string of the selected choice.
+    """
+    selected = _select(
+        choices,
+        max_preview_height,
+        search,
+        preview,
+        preview_key,
+        highlight_style,
+        False,
+        **kwargs,
+    )
+    return selected[0] if selected else ""
+
+
+@error_handler
+def custom_select_many(
+    choices: Union[list[str], dict[str, Path], CandidateStream],
+    max_preview_height: int = 10,
+    search: Optional[Callable[[str], list[str]]] = None,
+    preview: Optional[Callable[[str], str]] = None,
+    preview_key: Optional[Callable[[str], Hashable]] = None,
+    highlight_style: Optional[str] = None,
+    **kwargs,
+) -> list[str]:
+    """Choose any number of options from a list of choices, like custom_select.
+    Tab marks the pointed choice and ctrl-a marks every matching choice, or unmarks them when all are marked.
+    Choices are fuzzy matched and ranked, so they should be given most recent first.
+    If the execution is interrupted by a "KeyboardInterrupt" (typically triggered by pressing Ctrl+C), the program will be terminated.
+
+    Args:
+        choices (Union[list[str], dict[str, Path], CandidateStream]): list or dict of choices displayed on the terminal.
+            A CandidateStream is started when the selector opens, which shows its choices as they arrive.
+        search (Optional[Callable[[str], list[str]]]): returns the choices whose content matches the query.
+            When given, `ctrl-f` toggles between matching the choices and searching their content.
+        preview (Optional[Callable[[str], str]]): returns the preview of a choice.
+            Defaults to the head of the file of a dict choice.
+        preview_key (Optional[Callable[[str], Hashable]]): returns the key the preview of a choice is cached under,
+            which should change when the preview does. Defaults to the path and mtime of the file of a dict choice,
+            or the choice itself.
+        highlight_style (Optional[str]): the name of a Pygments style. When given, previews are shown as Markdown
+            with the fenced codeblocks highlighted in their language.
+
+    Returns:
+        list[str]: the marked choices in the order they were marked, or the pointed choice when none is marked.
+    """
+    return _select(
+        choices,
+        max_preview_height,
+        search,
+        preview,
+        preview_key,
+        highlight_style,
+        True,
+        **kwargs,
+    )
 
 
 def select_file(dir: Path, pattern: str) -> Path:
-    candidates = {p.stem: p for p in sort_by_mtime(dir, pattern)}
+    # the selector opens while dir is scanned, which may take a while on a slow or network mounted store
+    candidates = CandidateStream(scan_files(dir, pattern))
     selected = custom_select(choices=candidates)
     return candidates[selected]
+
+
+def _memo_choices(storage: StorageBase, style_name: Optional[str]) -> dict[str, Any]:
+    @lru_cache(maxsize=32)
+    def search_titles(query: str) -> list[str]:
+        return [
+            result.title for result in storage.search_index.search(query, limit=100)
+        ]
+
+    # the selector opens while the memos are listed, which takes a while for a large store
+    entries = CandidateStream(
+        Candidate(entry.title, entry.path, entry.mtime)
+        for entry in storage.iter_entries()
+    )
+
+    def preview_key(title: str) -> tuple[Path, float]:
+        candidate = entries.candidate(title)
+        return candidate.path, candidate.mtime
+
+    return dict(
+        choices=entries,
+        search=search_titles,
+        preview=lambda title: storage.load_head(title, *_preview_size()),
+        preview_key=preview_key,
+        highlight_style=style_name,
+    )
+
+
+def select_memo(storage: StorageBase, style_name: Optional[str] = None) -> str:
+    """
+    Chooses a stored memo, most recently modified first. `ctrl-f` searches the memo contents.
+
+    Args:
+        storage (StorageBase): Where the memos are stored.
+        style_name (Optional[str]): The Pygments style the previews are highlighted with.
+            Defaults to None, which shows them as plain text.
+
+    Returns:
+        str: The title of the selected memo.
+    """
+    return custom_select(**_memo_choices(storage, style_name))
+
+
+def select_memos(storage: StorageBase, style_name: Optional[str] = None) -> list[str]:
+    """
+    Chooses any number of stored memos, like select_memo. Tab marks a memo and ctrl-a marks every match.
+
+    Args:
+        storage (StorageBase): Where the memos are stored.
+        style_name (Optional[str]): The Pygments style the previews are highlighted with.
+            Defaults to None, which shows them as plain text.
+
+    Returns:
+        list[str]: The titles of the selected memos.
+    """
+    return custom_select_many(**_memo_choices(storage, style_name))
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Optional, Union
+from urllib.parse import quote
+
+from pmemo.fileio import atomic_write_text, read_text
+from pmemo.query_worker import QueryWorker
+
+DRAFTS_DIR_NAME = ".drafts"
+# not ".md", so drafts are not taken for memos by the layouts' "*/*.md" patterns
+DRAFT_SUFFIX = ".draft"
+# the editor's text is saved once it was not changed for this long
+AUTOSAVE_SECONDS = 1.0
+NEW_MEMO_DRAFT = "new"
+
+# the text, or a function that returns it, so a large memo is joined in the background thread
+DraftText = Union[str, Callable[[], str]]
+
+
+def edit_draft_name(title: str) -> str:
+    return f"edit-{title}"
+
+
+class DraftJournal:
+    """
+    Recovery journal of the editor. The text being edited is kept in a file per draft under out_dir,
+    so it survives Ctrl-C and crashes until the memo is saved.
+    """
+
+    def __init__(self, out_dir: Path) -> None:
+        self._dir = out_dir / DRAFTS_DIR_NAME
+
+    def draft_file(self, name: str) -> Path:
+        return self._dir / "".join((quote(name, safe=""), DRAFT_SUFFIX))
+
+    def load(self, name: str) -> Optional[str]:
+        """
+        Returns the text of a draft, or None when there is none.
+        """
+        try:
+            return read_text(self.draft_file(name))
+        except FileNotFoundError:
+            return None
+
+    def save(self, name: str, text: str) -> None:
+        self._dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.draft_file(name), text)
+
+    def discard(self, name: str) -> None:
+        self.draft_file(name).unlink(missing_ok=True)
+
+
+class Autosave:
+    """
+    Saves the text of a draft in a background thread, once the text was not changed for a while,
+    so typing is never blocked by a write. Nothing is saved until the text changes.
+    """
+
+    def __init__(
+        self, journal: DraftJournal, name: str, debounce: float = AUTOSAVE_SECONDS
+    ) -> None:
+        """
+        Initializes an Autosave instance.
+
+        Args:
+            journal (DraftJournal): The journal the draft is saved in.
+            name (str): The name of the draft.
+            debounce (float): How long in seconds the text must be unchanged before it is saved. Defaults to 1.0.
+        """
+        self._journal = journal
+        self._name = name
+        self._worker: QueryWorker[DraftText, None] = QueryWorker(
+            self._save, debounce=debounce
+        )
+        self._changed = False
+
+    def _save(self, text: DraftText) -> None:
+        self._journal.save(self._name, text() if callable(text) else text)
+
+    def update(self, text: DraftText) -> None:
+        """
+        Schedules saving text, superseding the text scheduled before.
+        """
+        self._changed = True
+        self._worker.submit(text)
+
+    def flush(self, text: DraftText) -> None:
+        """
+        Stops saving in the background, and saves text right away if the text was changed,
+        e.g. when the editor exits or is interrupted.
+        """
+        self._worker.close(wait=True)
+        if self._changed:
+            self._save(text)
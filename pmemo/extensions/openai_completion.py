@@ -1,7 +1,6 @@
 from functools import lru_cache
-from typing import Optional
+from typing import Optional, Union
 
-import openai
 from prompt_toolkit.auto_suggest import Suggestion
 from prompt_toolkit.key_binding import KeyBindings, KeyBindingsBase
 from prompt_toolkit.keys import Keys
@@ -18,7 +17,7 @@ class OpenAiCompletion(ExtensionBase):
         self,
         api_key: Optional[str] = None,
         model: str = "gpt-3.5-turbo",
-        key_binding: Keys = Keys.ControlO,
+        key_binding: Union[Keys, str] = Keys.ControlO,
         **kwargs,
     ) -> None:
         """
@@ -47,6 +46,9 @@ class OpenAiCompletion(ExtensionBase):
         """
         if not prompt:
             return ""
+        # openai is imported only when a completion is requested, as it takes long to import
+        import openai
+
         if openai.api_key is None and self._api_key is None:
             raise RuntimeError("OpenAI API key is missing or not provided")
         openai.api_key = openai.api_key or self._api_key
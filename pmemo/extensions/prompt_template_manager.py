@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Union
 
 from prompt_toolkit.completion.base import CompleteEvent, Completer, Completion
 from prompt_toolkit.document import Document
@@ -7,6 +7,7 @@ from prompt_toolkit.key_binding import KeyBindings, KeyBindingsBase
 from prompt_toolkit.keys import Keys
 
 from pmemo.extensions.base import ExtensionBase
+from pmemo.fileio import atomic_write_text
 from pmemo.utils import confirm_overwrite, sort_by_mtime
 
 
@@ -15,7 +16,9 @@ class PromptTemplateCompleter(Completer, ExtensionBase):
     A completer that provides prompt template suggestions based on existing template files.
     """
 
-    def __init__(self, out_dir: Path, key_binding: Keys = Keys.ControlT) -> None:
+    def __init__(
+        self, out_dir: Path, key_binding: Union[Keys, str] = Keys.ControlT
+    ) -> None:
         self._templates = {file.stem: file for file in sort_by_mtime(out_dir, "*.txt")}
         self._key_binding = key_binding
 
@@ -57,4 +60,4 @@ def register_prompt_template(templates_dir: Path, title: str, prompt: str) -> No
     template_file = templates_dir / title
     template_file = template_file.with_suffix(".txt")
     if confirm_overwrite(template_file):
-        template_file.write_text(prompt)
+        atomic_write_text(template_file, prompt)
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import gzip
+import os
+import secrets
+import shutil
+import stat
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Callable, Optional
+
+DEFAULT_ENCODING = "utf-8"
+TMP_SUFFIX = ".tmp"
+GZIP_MAGIC = b"\x1f\x8b"
+# gzip stores the uncompressed size modulo 2**32 in its last 4 bytes
+GZIP_ISIZE_LENGTH = 4
+
+
+@lru_cache(maxsize=1)
+def _default_mode() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _fsync_dir(dir: Path) -> None:
+    # directories can not be opened on Windows
+    if os.name != "posix":
+        return
+    fd = os.open(dir, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _replace_with_link(file_path: Path, source: Path) -> None:
+    tmp_path = file_path.with_name(
+        f".{file_path.name}.{secrets.token_hex(8)}{TMP_SUFFIX}"
+    )
+    try:
+        os.link(source, tmp_path)
+    except FileExistsError:
+        raise
+    except OSError:
+        # e.g. file systems without hard links
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, file_path)
+
+
+class WriteTransaction:
+    """
+    Groups file writes so that they become visible together.
+    Every write goes to a temporary file next to its target, which is renamed into place on commit,
+    so a crash or Ctrl-C never leaves a truncated file behind.
+    The directories of a commit are fsynced once per commit, which lets callers batch many files.
+    Used as a context manager, it commits on success and rolls back on any exception.
+    """
+
+    def __init__(self, durable: bool = True) -> None:
+        """
+        Initializes a WriteTransaction instance.
+
+        Args:
+            durable (bool): When True, staged files and the directories of a commit are fsynced. Defaults to True.
+        """
+        self._durable = durable
+        self._staged: dict[Path, Path] = {}
+        self._links: dict[Path, Path] = {}
+        self._removed: list[Path] = []
+        self._callbacks: list[Callable[[], object]] = []
+
+    def __enter__(self) -> WriteTransaction:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def __len__(self) -> int:
+        return len(self._staged) + len(self._links) + len(self._removed)
+
+    def __contains__(self, file_path: Path) -> bool:
+        return file_path in self._staged
+
+    def write_bytes(
+        self, file_path: Path, data: bytes, mode: Optional[int] = None
+    ) -> None:
+        """
+        Stages data to be written to file_path on commit.
+
+        Args:
+            file_path (Path): The target file. Its directory must exist.
+            data (bytes): The content of the file.
+            mode (Optional[int]): The permissions of the file. Defaults to those of the file it replaces,
+                or to the default permissions for a new file.
+        """
+        fd, tmp_name = tempfile.mkstemp(
+            dir=file_path.parent, prefix=f".{file_path.name}.", suffix=TMP_SUFFIX
+        )
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                if self._durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if mode is None:
+                mode = (
+                    stat.S_IMODE(file_path.stat().st_mode)
+                    if file_path.exists()
+                    else _default_mode()
+                )
+            os.chmod(tmp_path, mode)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        previous = self._staged.pop(file_path, None)
+        if previous is not None:
+            previous.unlink(missing_ok=True)
+        self._staged[file_path] = tmp_path
+
+    def write_text(self, file_path: Path, text: str) -> None:
+        self.write_bytes(file_path, text.encode(DEFAULT_ENCODING))
+
+    def link(self, file_path: Path, source: Path) -> None:
+        """
+        Stages file_path to become a hard link to source on commit.
+        source may be written by the same transaction. It is copied where hard links are not supported.
+
+        Args:
+            file_path (Path): The target file. Its directory must exist.
+            source (Path): The file to link to.
+        """
+        self._links[file_path] = source
+
+    def unlink(self, file_path: Path) -> None:
+        """
+        Stages file_path to be removed on commit.
+        """
+        self._removed.append(file_path)
+
+    def on_commit(self, callback: Callable[[], object]) -> None:
+        """
+        Registers a callback that runs after the files of this transaction are in place.
+        """
+        self._callbacks.append(callback)
+
+    def commit(self) -> None:
+        dirs = set()
+        for file_path, tmp_path in self._staged.items():
+            os.replace(tmp_path, file_path)
+            dirs.add(file_path.parent)
+        for file_path, source in self._links.items():
+            _replace_with_link(file_path, source)
+            dirs.add(file_path.parent)
+        for file_path in self._removed:
+            file_path.unlink(missing_ok=True)
+            dirs.add(file_path.parent)
+        if self._durable:
+            for dir in dirs:
+                if dir.exists():
+                    _fsync_dir(dir)
+        callbacks = self._callbacks
+        self._staged, self._links, self._removed, self._callbacks = {}, {}, [], []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self) -> None:
+        for tmp_path in self._staged.values():
+            tmp_path.unlink(missing_ok=True)
+        self._staged, self._links, self._removed, self._callbacks = {}, {}, [], []
+
+
+def holds_bytes(file_path: Path, data: bytes) -> bool:
+    """
+    Returns True when file_path already holds data. The file is only read when sizes match.
+    """
+    try:
+        if file_path.stat().st_size != len(data):
+            return False
+    except FileNotFoundError:
+        return False
+    return file_path.read_bytes() == data
+
+
+def atomic_write_text(file_path: Path, text: str) -> None:
+    """
+    Writes text to file_path through a temporary file and a rename.
+    """
+    with WriteTransaction() as transaction:
+        transaction.write_text(file_path, text)
+
+
+def encode_text(text: str, compress_threshold: Optional[int] = None) -> bytes:
+    """
+    Encodes text, gzip-compressed when it is larger than compress_threshold bytes.
+    Text never starts with the gzip magic number, so decode_text tells both apart.
+
+    Args:
+        text (str): The text to encode.
+        compress_threshold (Optional[int]): The size in bytes above which text is compressed.
+            Defaults to None, which never compresses.
+
+    Returns:
+        bytes: The encoded text.
+    """
+    data = text.encode(DEFAULT_ENCODING)
+    if compress_threshold is not None and len(data) > compress_threshold:
+        # mtime=0 makes the output depend on the text only, so unchanged memos compare equal
+        return gzip.compress(data, mtime=0)
+    return data
+
+
+def is_compressed(data: bytes) -> bool:
+    return data[: len(GZIP_MAGIC)] == GZIP_MAGIC
+
+
+def decode_text(data: bytes) -> str:
+    """
+    Decodes data written by encode_text, decompressing it when needed.
+    """
+    if is_compressed(data):
+        data = gzip.decompress(data)
+    return data.decode(DEFAULT_ENCODING)
+
+
+def read_text(file_path: Path) -> str:
+    return decode_text(file_path.read_bytes())
+
+
+def open_text(file_path: Path) -> IO[str]:
+    """
+    Opens file_path to read text, decompressing it while it is read when it was written compressed,
+    so reading the first lines of a large memo does not decompress all of it.
+    """
+    with file_path.open("rb") as f:
+        compressed = is_compressed(f.read(len(GZIP_MAGIC)))
+    if compressed:
+        return gzip.open(file_path, "rt", encoding=DEFAULT_ENCODING)
+    return file_path.open("r", encoding=DEFAULT_ENCODING)
+
+
+def uncompressed_size(file_path: Path) -> int:
+    """
+    Returns the size of the content of file_path after decompression, without decompressing it.
+    """
+    with file_path.open("rb") as f:
+        if f.read(len(GZIP_MAGIC)) != GZIP_MAGIC:
+            return os.fstat(f.fileno()).st_size
+        f.seek(-GZIP_ISIZE_LENGTH, os.SEEK_END)
+        return int.from_bytes(f.read(GZIP_ISIZE_LENGTH), "little")
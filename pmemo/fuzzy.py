@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import operator
+import re
+from collections import OrderedDict
+from itertools import compress, repeat
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_BOUNDARY = 8
+BONUS_CONSECUTIVE = 8
+BONUS_FIRST_CHAR = 8
+# at most this much is added for the most recent choice, so recency breaks ties between similar matches
+BONUS_RECENCY = 2
+WORD_SEPARATORS = frozenset(" _-./:\\#")
+# larger result sets are ranked by match kind and recency only, which needs no per-choice Python work
+MAX_SCORED = 1000
+# even larger ones, typically from the first keystroke, keep the recency order
+MAX_RANKED_BY_KIND = 10_000
+CACHE_SIZE = 64
+
+
+def _is_boundary(text: str, idx: int) -> bool:
+    if idx == 0:
+        return True
+    prev = text[idx - 1]
+    return prev in WORD_SEPARATORS or (prev.islower() and text[idx].isupper())
+
+
+def _score_from(query: str, text: str, original: str, start: int) -> Optional[int]:
+    score = SCORE_MATCH + (BONUS_FIRST_CHAR if start == 0 else 0)
+    if _is_boundary(original, start):
+        score += BONUS_BOUNDARY
+    prev = start
+    for ch in query[1:]:
+        idx = text.find(ch, prev + 1)
+        if idx == -1:
+            return None
+        score += SCORE_MATCH
+        if idx == prev + 1:
+            score += BONUS_CONSECUTIVE
+        else:
+            score += SCORE_GAP_START + SCORE_GAP_EXTENSION * (idx - prev - 2)
+        if _is_boundary(original, idx):
+            score += BONUS_BOUNDARY
+        prev = idx
+    return score
+
+
+def fuzzy_score(query: str, choice: str) -> Optional[int]:
+    """
+    Scores how well query matches choice as a subsequence. Consecutive characters and characters
+    at the start of a word score higher, gaps score lower.
+    Matching ignores case unless query has upper case characters.
+
+    Args:
+        query (str): The query. It must not be empty.
+        choice (str): The choice to match.
+
+    Returns:
+        Optional[int]: The score of the best alignment, or None when query does not match.
+    """
+    text = choice if _is_case_sensitive(query) else choice.lower()
+    # lowercasing may change the length, e.g. of "İ", and then the indices into text are not those of choice
+    original = choice if len(text) == len(choice) else text
+    best = None
+    start = text.find(query[0])
+    while start != -1:
+        score = _score_from(query, text, original, start)
+        if score is None:
+            # a later start can not match either
+            break
+        if best is None or score > best:
+            best = score
+        start = text.find(query[0], start + 1)
+    return best
+
+
+def _is_case_sensitive(query: str) -> bool:
+    return query != query.lower()
+
+
+class _Match(NamedTuple):
+    ranked: list[int]
+    # the matched indices in recency order, which is the search space of longer queries
+    matched: list[int]
+
+
+def _subsequence_pattern(query: str) -> re.Pattern:
+    # "a[^b]*b[^c]*c" can not backtrack, so a choice is checked in linear time
+    parts = [re.escape(query[0])]
+    for ch in query[1:]:
+        escaped = re.escape(ch)
+        parts.append("".join(("[^", escaped, "]*", escaped)))
+    return re.compile("".join(parts))
+
+
+class FuzzyMatcher:
+    """
+    Ranks choices by how well they fuzzy match a query.
+    Choices are expected in recency order (most recently modified first), which breaks ties.
+
+    Candidates are found by a regular expression that the itertools machinery runs over the choices,
+    so no Python code runs per choice unless the matches are few enough to be scored.
+    When a query extends a query matched before, only the previous matches are searched,
+    so typing narrows the search space keystroke by keystroke.
+    """
+
+    def __init__(self, choices: Sequence[str]) -> None:
+        self._choices = list(choices)
+        self._keys: dict[bool, list[str]] = {}
+        self._cache: OrderedDict[str, _Match] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._choices)
+
+    @property
+    def choices(self) -> list[str]:
+        return self._choices
+
+    def _get_keys(self, case_sensitive: bool) -> list[str]:
+        keys = self._keys.get(case_sensitive)
+        if keys is None:
+            keys = self._keys[case_sensitive] = (
+                self._choices if case_sensitive else _lower(self._choices)
+            )
+        return keys
+
+    def _search_space(self, query: str) -> Optional[list[int]]:
+        # the longest cached prefix of the query matched a superset of the choices the query matches
+        for end in range(len(query) - 1, 0, -1):
+            cached = self._cache.get(query[:end])
+            if cached is not None:
+                return cached.matched
+        return None
+
+    def match(self, query: str) -> list[str]:
+        """
+        Returns the choices matching query, best first.
+        Matching ignores case unless query has upper case characters.
+
+        Args:
+            query (str): The query. An empty query matches every choice in the original order.
+
+        Returns:
+            list[str]: The matching choices.
+        """
+        return [self._choices[i] for i in self.match_indices(query)]
+
+    def match_indices(self, query: str) -> Sequence[int]:
+        if not query:
+            return range(len(self._choices))
+        cached = self._cache.get(query)
+        if cached is not None:
+            self._cache.move_to_end(query)
+            return cached.ranked
+
+        keys = self._get_keys(_is_case_sensitive(query))
+        space = self._search_space(query)
+        if space is None:
+            indices: Sequence[int] = range(len(keys))
+            candidates: Iterable[str] = keys
+        else:
+            indices = space
+            candidates = map(keys.__getitem__, space)
+        matched = list(
+            compress(indices, map(_subsequence_pattern(query).search, candidates))
+        )
+
+        if len(matched) <= MAX_SCORED:
+            ranked = self._rank(query, matched)
+        elif len(matched) <= MAX_RANKED_BY_KIND:
+            ranked = _rank_by_kind(query, matched, keys)
+        else:
+            ranked = matched
+
+        self._cache[query] = _Match(ranked, matched)
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return ranked
+
+    def _rank(self, query: str, matched: list[int]) -> list[int]:
+        n = max(len(self._choices), 1)
+        scores = {}
+        for i in matched:
+            score = fuzzy_score(query, self._choices[i])
+            if score is not None:
+                scores[i] = score + BONUS_RECENCY * (n - i) / n
+        return sorted(scores, key=lambda i: (-scores[i], len(self._choices[i]), i))
+
+
+def _lower(choices: list[str]) -> list[str]:
+    # lowering the choices as one string is much faster than one by one
+    keys = "\0".join(choices).lower().split("\0")
+    return keys if len(keys) == len(choices) else [c.lower() for c in choices]
+
+
+def _rank_by_kind(query: str, matched: list[int], keys: list[str]) -> list[int]:
+    # choices where the query starts a word, then other substring matches, then the rest,
+    # each in recency order
+    candidates = list(map(keys.__getitem__, matched))
+    boundary_pattern = re.compile("".join((r"(?<![^ _\-./:\\#])", re.escape(query))))
+    is_boundary = list(map(bool, map(boundary_pattern.search, candidates)))
+    is_substring = list(map(str.__contains__, candidates, repeat(query)))
+    ranked = list(compress(matched, is_boundary))
+    ranked.extend(compress(matched, map(operator.gt, is_substring, is_boundary)))
+    ranked.extend(compress(matched, map(operator.not_, is_substring)))
+    return ranked
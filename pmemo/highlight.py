@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from itertools import compress, count
+from operator import ne
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Sequence
+
+from prompt_toolkit.document import Document
+from prompt_toolkit.formatted_text import (
+    PygmentsTokens,
+    StyleAndTextTuples,
+    to_formatted_text,
+)
+from prompt_toolkit.formatted_text.utils import split_lines
+from prompt_toolkit.lexers import Lexer as DocumentLexer
+from pygments.lexer import Lexer
+from pygments.lexers import get_lexer_by_name
+from pygments.lexers.markup import MarkdownLexer
+from pygments.lexers.special import TextLexer
+from pygments.util import ClassNotFound
+
+from pmemo.codeblock import FENCE, RE_FENCE_INFO, close_fence, open_fence
+
+FENCE_CLASS = "class:pygments.literal.string.backtick"
+# a fence without a language is a python codeblock, as in iter_codeblocks
+DEFAULT_LANG = "python"
+
+
+class Segment(NamedTuple):
+    # None for Markdown
+    lang: Optional[str]
+    text: str
+    fence: bool = False
+
+
+def match_fence(open_length: int, line: str) -> Optional[tuple[int, Optional[str]]]:
+    """
+    Matches line against the fence rules of iter_codeblocks.
+
+    Args:
+        open_length (int): The number of backticks of the fence that opened the current codeblock,
+            or 0 outside of codeblocks.
+        line (str): The line.
+
+    Returns:
+        Optional[tuple[int, Optional[str]]]: None when line is not a fence. Otherwise the number of backticks
+            of the open fence and the language of the codeblock after line, which are 0 and None when it closes.
+    """
+    if not open_length:
+        fence = open_fence(line)
+        if fence is None:
+            return None
+        length, info = fence
+        match = RE_FENCE_INFO.fullmatch(info)
+        return length, (match.group(1).strip() if match else "") or DEFAULT_LANG
+    if close_fence(line, open_length) is not None:
+        return 0, None
+    return None
+
+
+def iter_segments(text: str) -> Iterator[Segment]:
+    """
+    Splits Markdown into the text between codeblocks, the fences and the code of the codeblocks.
+    Fences follow the same rules as iter_codeblocks, including "lang:blockname" info strings.
+    An unterminated codeblock, e.g. at the end of a preview that was cut off, runs to the end of text.
+
+    Args:
+        text (str): The Markdown text.
+
+    Yields:
+        Segment: The segments, which concatenate to text.
+    """
+    fence_length = 0
+    lang: Optional[str] = None
+    lines: list[str] = []
+    for line in text.splitlines(keepends=True):
+        fence = match_fence(fence_length, line)
+        if fence is None:
+            lines.append(line)
+            continue
+        if lines:
+            yield Segment(lang, "".join(lines))
+        yield Segment(None, line, fence=True)
+        fence_length, lang = fence
+        lines = []
+    if lines:
+        yield Segment(lang, "".join(lines))
+
+
+@lru_cache(maxsize=None)
+def get_lexer(lang: Optional[str]) -> Lexer:
+    """
+    Returns the lexer of a codeblock language, or the Markdown lexer for None.
+    Unknown languages are not highlighted.
+    """
+    # the lexers must not strip or add newlines, so the fragments keep the text as it is
+    options = dict(stripnl=False, ensurenl=False)
+    if lang is None:
+        return MarkdownLexer(handlecodeblocks=False, **options)
+    try:
+        return get_lexer_by_name(lang, **options)
+    except ClassNotFound:
+        return TextLexer(**options)
+
+
+def highlight_markdown(text: str) -> StyleAndTextTuples:
+    """
+    Highlights Markdown, and the code of its fenced codeblocks in their language, as formatted text
+    styled with "class:pygments.*" classes, like a PygmentsLexer.
+
+    Args:
+        text (str): The Markdown text.
+
+    Returns:
+        StyleAndTextTuples: The highlighted text.
+    """
+    fragments: StyleAndTextTuples = []
+    for segment in iter_segments(text):
+        if segment.fence:
+            fragments.append((FENCE_CLASS, segment.text))
+        else:
+            tokens = get_lexer(segment.lang).get_tokens(segment.text)
+            fragments.extend(to_formatted_text(PygmentsTokens(list(tokens))))
+    return fragments
+
+
+class LineState(NamedTuple):
+    """
+    The state of the editor lexer at the start of a line.
+    """
+
+    # the number of backticks of the open fence, 0 outside of codeblocks
+    fence_length: int = 0
+    lang: Optional[str] = None
+    # the number of code lines of the codeblock before this line
+    offset: int = 0
+
+
+OUTSIDE = LineState()
+
+
+def _next_state(state: LineState, line: str) -> LineState:
+    fence = match_fence(state.fence_length, line)
+    if fence is not None:
+        return LineState(*fence)
+    if state.fence_length:
+        return state._replace(offset=state.offset + 1)
+    return state
+
+
+def state_after(lines: Iterable[str], state: LineState = OUTSIDE) -> LineState:
+    """
+    Returns the state of the editor lexer after lines, which start in state.
+    Only the lines with a fence in them are matched, found with str.find in the joined lines,
+    and the others are only counted, so the state at the start of a window into a long memo is found quickly.
+    """
+    lines = list(lines)
+    text = "\n".join(lines)
+    # the lines before lineno are lexed, and pos is the start of line lineno
+    lineno = pos = 0
+    found = text.find(FENCE)
+    while found >= 0:
+        fence_lineno = lineno + text.count("\n", pos, found)
+        if state.fence_length:
+            state = state._replace(offset=state.offset + fence_lineno - lineno)
+        state = _next_state(state, lines[fence_lineno])
+        lineno, pos = fence_lineno + 1, text.find("\n", found) + 1
+        if not pos:
+            break
+        found = text.find(FENCE, pos)
+    if state.fence_length:
+        state = state._replace(offset=state.offset + len(lines) - lineno)
+    return state
+
+
+def _first_difference(old: Sequence[str], new: Sequence[str]) -> int:
+    # map and compress keep the loop in C, so an edit at the end of a long memo is found quickly
+    return next(compress(count(), map(ne, old, new)), min(len(old), len(new)))
+
+
+class MarkdownCodeLexer(DocumentLexer):
+    """
+    Lexer of the editor, which highlights Markdown like highlight_markdown, with fenced codeblocks
+    in their own language.
+    The state at the start of every line, i.e. whether it is in a codeblock, and the fragments of the lines
+    are kept between documents. After an edit only the edited lines are lexed again, and the states after them
+    until one matches its state before the edit, so typing in a long memo costs as much as in a short one.
+    Markdown is lexed line by line, and the code of a codeblock in chunks of CHUNK_LINES lines, so multi-line
+    tokens like docstrings are highlighted without lexing a long codeblock on every keystroke.
+    """
+
+    CHUNK_LINES = 100
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+        # the state at the start of every line, and after the last one
+        self._states: list[LineState] = [OUTSIDE]
+        self._fragments: list[Optional[StyleAndTextTuples]] = []
+
+    def start_at(self, state: LineState) -> None:
+        """
+        Makes the documents start in state, e.g. when they are a window into a longer memo.
+        The lines lexed before are forgotten when the state changes.
+        """
+        if state != self._states[0]:
+            self._lines, self._states, self._fragments = [], [state], []
+
+    def _update(self, lines: list[str]) -> None:
+        old_lines, old_states = self._lines, self._states
+        start = _first_difference(old_lines, lines)
+        if start == len(old_lines) == len(lines):
+            return
+        # the lines after the edit, which are the same in both
+        common = _first_difference(
+            old_lines[: start - 1 : -1] if start else old_lines[::-1],
+            lines[: start - 1 : -1] if start else lines[::-1],
+        )
+        shift = len(lines) - len(old_lines)
+        edit_end = len(lines) - common
+
+        states = old_states[: start + 1]
+        state = states[-1]
+        for i in range(start, len(lines)):
+            state = _next_state(state, lines[i])
+            # past the edit the states are the old ones, once one of them is the same again
+            if i + 1 >= edit_end and old_states[i + 1 - shift] == state:
+                end = i + 1
+                states.extend(old_states[end - shift :])
+                break
+            states.append(state)
+        else:
+            end = len(lines)
+
+        fragments = self._fragments[:start]
+        fragments.extend([None] * (end - start))
+        fragments.extend(self._fragments[end - shift :])
+        # the chunks of code the lexed lines are in are lexed again as a whole,
+        # also when the edit removed the last lines of a codeblock at the end, i.e. start == len(lines)
+        if states[start].fence_length:
+            first = max(0, start - states[start].offset % self.CHUNK_LINES)
+            fragments[first:start] = [None] * (start - first)
+        i = end
+        while (
+            0 < i < len(lines)
+            and states[i].fence_length
+            and states[i].offset % self.CHUNK_LINES
+            and match_fence(states[i].fence_length, lines[i]) is None
+        ):
+            fragments[i] = None
+            i += 1
+
+        self._lines, self._states, self._fragments = lines, states, fragments
+
+    def _lex_code(
+        self,
+        lines: list[str],
+        states: list[LineState],
+        fragments: list[Optional[StyleAndTextTuples]],
+        lineno: int,
+    ) -> None:
+        state = states[lineno]
+        # a window into a longer memo may start in the middle of a chunk
+        first = max(0, lineno - state.offset % self.CHUNK_LINES)
+        last = first
+        while (
+            last < len(lines)
+            and last - first < self.CHUNK_LINES
+            and match_fence(state.fence_length, lines[last]) is None
+        ):
+            last += 1
+        tokens = get_lexer(state.lang).get_tokens("\n".join(lines[first:last]) + "\n")
+        chunk = list(split_lines(to_formatted_text(PygmentsTokens(list(tokens)))))
+        fragments[first:last] = chunk[: last - first]
+
+    def lex_document(self, document: Document) -> Callable[[int], StyleAndTextTuples]:
+        self._update(document.lines)
+        lines, states, fragments = self._lines, self._states, self._fragments
+
+        def get_line(lineno: int) -> StyleAndTextTuples:
+            if not 0 <= lineno < len(lines):
+                return []
+            cached = fragments[lineno]
+            if cached is not None:
+                return cached
+            line, state = lines[lineno], states[lineno]
+            if match_fence(state.fence_length, line) is not None:
+                fragments[lineno] = [(FENCE_CLASS, line)]
+            elif state.fence_length:
+                self._lex_code(lines, states, fragments, lineno)
+            else:
+                tokens = get_lexer(None).get_tokens(line + "\n")
+                fragments[lineno] = next(
+                    iter(split_lines(to_formatted_text(PygmentsTokens(list(tokens)))))
+                )
+            return fragments[lineno] or []
+
+        return get_line
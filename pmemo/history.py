@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import datetime
+import io
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from pmemo.fileio import DEFAULT_ENCODING, atomic_write_text
+from pmemo.suggest import IndexedHistory, PrefixIndex
+
+HISTORY_FILE_NAME = ".history"
+DEFAULT_MAX_HISTORY_BYTES = 1024 * 1024
+# longer entries are kept in the history of the session only
+MAX_ENTRY_BYTES = 1024
+
+
+def _format_entry(string: str) -> str:
+    # the format of prompt_toolkit's FileHistory
+    lines = "".join(f"+{line}\n" for line in string.split("\n"))
+    return f"\n# {datetime.datetime.now()}\n{lines}"
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    # unlike str.splitlines, only "\n" ends a line, as it is the only separator of the stored strings
+    return iter(io.StringIO(text, newline="\n"))
+
+
+def _split_entries(text: str) -> list[str]:
+    entries: list[str] = []
+    lines: list[str] = []
+    for line in _iter_lines(text):
+        # an entry is its header, i.e. an empty line and a timestamp comment, and its "+" lines
+        if lines and lines[-1].startswith("+") and not line.startswith("+"):
+            entries.append("".join(lines))
+            lines = []
+        lines.append(line)
+    if lines:
+        entries.append("".join(lines))
+    return entries
+
+
+def is_persisted(string: str) -> bool:
+    """
+    Returns whether a history string is written to the history file. Only single-line strings, e.g. titles,
+    are: a multi-line string is the body of a memo, which must not outlive the memo in the history file.
+    """
+    return (
+        "\n" not in string and len(string.encode(DEFAULT_ENCODING)) <= MAX_ENTRY_BYTES
+    )
+
+
+def parse_history(text: str) -> list[str]:
+    """
+    Returns the strings of a history file, oldest first.
+    """
+    strings = []
+    for entry in _split_entries(text):
+        lines = [line[1:] for line in _iter_lines(entry) if line[:1] == "+"]
+        if lines:
+            # the last line ends with a newline that is not part of the string
+            strings.append("".join(lines)[:-1])
+    return strings
+
+
+class PersistentHistory(IndexedHistory):
+    """
+    Editor history kept in a file under out_dir, so suggestions and accepted completions outlive the process.
+    Only the strings that is_persisted accepts are written to the file, the others are kept for the session.
+    The file is read once, when the history is first loaded, which the editor does in a background thread.
+    Its size is bounded: when it grows over max_bytes it is compacted to the most recent entries
+    that fit in half of max_bytes, so compaction happens once in a while rather than on every entry.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        index: PrefixIndex,
+        max_bytes: int = DEFAULT_MAX_HISTORY_BYTES,
+    ) -> None:
+        """
+        Initializes a PersistentHistory instance.
+
+        Args:
+            file_path (Path): The history file.
+            index (PrefixIndex): The index the loaded and stored strings are added to.
+            max_bytes (int): The size the history file is compacted at. Defaults to 1 MiB.
+        """
+        super().__init__(index)
+        self.file_path = file_path
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _read(self) -> str:
+        try:
+            return self.file_path.read_bytes().decode(
+                DEFAULT_ENCODING, errors="replace"
+            )
+        except FileNotFoundError:
+            return ""
+
+    def load_history_strings(self) -> Iterable[str]:
+        with self._lock:
+            strings = parse_history(self._read())
+        self.index.extend(strings)
+        return reversed(strings)
+
+    def store_string(self, string: str) -> None:
+        if is_persisted(string):
+            with self._lock:
+                self.file_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.file_path.open("ab") as f:
+                    f.write(_format_entry(string).encode(DEFAULT_ENCODING))
+                    size = f.tell()
+                if size > self._max_bytes:
+                    self._compact()
+        self.index.add(string)
+
+    def _compact(self) -> None:
+        entries = _split_entries(self._read())
+        kept: list[str] = []
+        size = 0
+        # the most recent entries that fit, skipping those that do not, so a large entry does not empty the file
+        for entry in reversed(entries):
+            entry_size = len(entry.encode(DEFAULT_ENCODING))
+            if size + entry_size <= self._max_bytes // 2:
+                kept.append(entry)
+                size += entry_size
+        if not kept:
+            kept = entries[-1:]
+        atomic_write_text(self.file_path, "".join(reversed(kept)))
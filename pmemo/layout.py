@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from pydantic import BaseModel
+
+from pmemo.fileio import atomic_write_text
+
+LAYOUT_FILE_NAME = ".layout"
+SHARDS_DIR_NAME = ".shards"
+SHARD_PREFIX_LENGTH = 2
+
+
+class MemoLayout(str, Enum):
+    """
+    flat: out_dir/<title>/<title>.md
+    sharded: out_dir/.shards/<first 2 hex digits of sha256(title)>/<title>/<title>.md
+    """
+
+    flat = "flat"
+    sharded = "sharded"
+
+
+class LayoutState(BaseModel, frozen=True):
+    layout: MemoLayout = MemoLayout.flat
+    migrating_to: Optional[MemoLayout] = None
+
+
+@lru_cache(maxsize=16)
+def _load_layout_state(layout_file: Path, mtime_ns: int, inode: int) -> LayoutState:
+    return LayoutState.model_validate(json.loads(layout_file.read_text()))
+
+
+def read_layout_state(out_dir: Path) -> LayoutState:
+    layout_file = out_dir / LAYOUT_FILE_NAME
+    try:
+        stat = layout_file.stat()
+    except FileNotFoundError:
+        return LayoutState()
+    # the file is replaced on write, so the cached state is keyed by its identity
+    return _load_layout_state(layout_file, stat.st_mtime_ns, stat.st_ino)
+
+
+def write_layout_state(out_dir: Path, state: LayoutState) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(out_dir / LAYOUT_FILE_NAME, state.model_dump_json())
+
+
+def shard_of(title: str) -> str:
+    return hashlib.sha256(title.encode("utf-8")).hexdigest()[:SHARD_PREFIX_LENGTH]
+
+
+def layout_memo_dir(out_dir: Path, title: str, layout: MemoLayout) -> Path:
+    if layout == MemoLayout.sharded:
+        return out_dir / SHARDS_DIR_NAME / shard_of(title) / title
+    return out_dir / title
+
+
+def memo_dir(out_dir: Path, title: str) -> Path:
+    """
+    Returns the directory of a memo in the layout of out_dir.
+    While a migration is in progress, memos that have not been moved yet are found at their old place.
+
+    Args:
+        out_dir (Path): The output directory where memos are stored.
+        title (str): The title of the memo.
+
+    Returns:
+        Path: The directory of the memo.
+    """
+    state = read_layout_state(out_dir)
+    target = layout_memo_dir(out_dir, title, state.migrating_to or state.layout)
+    if state.migrating_to is not None and not target.exists():
+        source = layout_memo_dir(out_dir, title, state.layout)
+        if source.exists():
+            return source
+    return target
+
+
+def memo_pattern(layout: MemoLayout) -> str:
+    if layout == MemoLayout.sharded:
+        return "/".join((SHARDS_DIR_NAME, "*", "*", "*.md"))
+    return "*/*.md"
+
+
+def _glob_memo_files(out_dir: Path, layout: MemoLayout) -> Iterator[Path]:
+    # the directory of a memo also holds its codeblocks, e.g. doc.md of a "markdown:doc" codeblock,
+    # so only <title>/<title>.md is a memo file
+    return (
+        memo_file
+        for memo_file in out_dir.glob(memo_pattern(layout))
+        if memo_file.stem == memo_file.parent.name
+    )
+
+
+def iter_memo_files(out_dir: Path) -> Iterator[Path]:
+    """
+    Yields the memo files stored under out_dir.
+    """
+    state = read_layout_state(out_dir)
+    yield from _glob_memo_files(out_dir, state.layout)
+    if state.migrating_to is not None:
+        yield from _glob_memo_files(out_dir, state.migrating_to)
+
+
+def out_dir_of(memo_file: Path) -> Path:
+    """
+    Returns the output directory a memo file is stored in.
+    """
+    if len(memo_file.parents) > 3 and memo_file.parents[2].name == SHARDS_DIR_NAME:
+        return memo_file.parents[3]
+    return memo_file.parents[1]
+
+
+def migrate_layout(
+    out_dir: Path,
+    layout: MemoLayout,
+    on_move: Optional[Callable[[str, Path], None]] = None,
+) -> int:
+    """
+    Moves the memos of out_dir into the given layout, one memo directory at a time.
+    The migration is recorded in out_dir, so an interrupted migration resumes when called again
+    and memos can be read in the meantime.
+
+    Args:
+        out_dir (Path): The output directory where memos are stored.
+        layout (MemoLayout): The new layout.
+        on_move (Optional[Callable[[str, Path], None]]): Called with the title and the new file path of every moved memo.
+
+    Returns:
+        int: The number of moved memos.
+    """
+    state = read_layout_state(out_dir)
+    if state.migrating_to is not None and state.migrating_to != layout:
+        raise ValueError(
+            f"Migration to {state.migrating_to.value} is in progress. Finish it first."
+        )
+    if state.layout == layout:
+        return 0
+    if (out_dir / SHARDS_DIR_NAME / f"{SHARDS_DIR_NAME}.md").exists():
+        raise ValueError(f"A memo titled {SHARDS_DIR_NAME} conflicts with the layout")
+
+    if state.migrating_to is None:
+        write_layout_state(
+            out_dir, LayoutState(layout=state.layout, migrating_to=layout)
+        )
+    elif on_move is not None:
+        # memos moved before the interruption may not have been reported
+        for memo_file in _glob_memo_files(out_dir, layout):
+            on_move(memo_file.stem, memo_file)
+    moved = 0
+    for memo_file in list(_glob_memo_files(out_dir, state.layout)):
+        title = memo_file.stem
+        target = layout_memo_dir(out_dir, title, layout)
+        # a memo may have been moved or removed since the directory was listed
+        if target.exists() or not memo_file.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(memo_file.parent, target)
+        moved += 1
+        if on_move is not None:
+            on_move(title, target / memo_file.name)
+
+    if state.layout == MemoLayout.sharded:
+        shards_dir = out_dir / SHARDS_DIR_NAME
+        for shard in list(shards_dir.glob("*")):
+            if shard.is_dir() and not any(shard.iterdir()):
+                shard.rmdir()
+        if shards_dir.exists() and not any(shards_dir.iterdir()):
+            shards_dir.rmdir()
+    write_layout_state(out_dir, LayoutState(layout=layout))
+    return moved
@@ -1,28 +1,37 @@
+from __future__ import annotations
+
 import argparse
 import copy
 import subprocess
+from logging import Logger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pmemo.drafts import NEW_MEMO_DRAFT, DraftJournal, edit_draft_name
+from pmemo.fileio import WriteTransaction
+from pmemo.layout import MemoLayout, migrate_layout
+from pmemo.memo import Memo, SaveReport
+from pmemo.preferences import PREF_FILE_PATH, PmemoPref, StorageBackend
+from pmemo.storage.base import StorageBase
+from pmemo.storage.filesystem import FileSystemStorage
+from pmemo.storage.sqlite import SQLiteStorage
+from pmemo.utils import confirm_remove_many, confirm_restore, error_handler, format_size
+
+if TYPE_CHECKING:
+    from pmemo.api.config import Tokens
+    from pmemo.pmemo_editor import PmemoEditor
 
-from logzero import logger
-from rich.console import Console
-from rich.markdown import Markdown
-
-from pmemo.api.auth import APIAuthenticator
-from pmemo.api.client import APIClient
-from pmemo.api.config import Tokens
-from pmemo.custom_select import custom_select, select_file
-from pmemo.extensions.openai_completion import OpenAiCompletion
-from pmemo.extensions.prompt_template_manager import (
-    PromptTemplateCompleter,
-    register_prompt_template,
-)
-from pmemo.memo import Memo
-from pmemo.pmemo_editor import PmemoEditor
-from pmemo.preferences import PREF_FILE_PATH, PmemoPref
-from pmemo.utils import error_handler, sort_by_mtime
+# The editor, the selectors, rich, the API client and logzero are imported by the commands that use them,
+# so that e.g. `pm list` does not wait for them to load.
+
+# number of files written per fsync while pulling
+PULL_BATCH_SIZE = 256
 
 
 @error_handler
 def update_pref(editor: PmemoEditor, pref: dict) -> dict:
+    from pmemo.custom_select import custom_select
+
     selected = custom_select(list(pref))
     if isinstance(pref[selected], dict):
         update_pref(editor, pref[selected])
@@ -37,6 +46,74 @@ def update_pref(editor: PmemoEditor, pref: dict) -> dict:
     return pref
 
 
+def get_logger() -> Logger:
+    from logzero import logger
+
+    return logger
+
+
+def log_save_report(title: str, report: SaveReport) -> None:
+    get_logger().info(
+        "%s: %d written, %d skipped, %d removed",
+        title,
+        len(report.written),
+        len(report.skipped),
+        len(report.removed),
+    )
+
+
+def restore_draft(drafts: DraftJournal, name: str, default: str = "") -> str:
+    """
+    Returns the unsaved draft of name when the user restores it, and default otherwise.
+    A draft that is not restored is discarded.
+    """
+    draft = drafts.load(name)
+    if draft is None:
+        return default
+    if confirm_restore(name):
+        return draft
+    drafts.discard(name)
+    return default
+
+
+def create_storage(pref: PmemoPref) -> StorageBase:
+    if pref.memo_pref.storage == StorageBackend.sqlite:
+        return SQLiteStorage(
+            pref.out_dir,
+            pref.memo_pref.max_title_length,
+            pref.memo_pref.compress_threshold,
+            pref.memo_pref.auto_gc,
+        )
+    return FileSystemStorage(
+        pref.out_dir,
+        pref.memo_pref.max_title_length,
+        compress_threshold=pref.memo_pref.compress_threshold,
+        auto_gc=pref.memo_pref.auto_gc,
+    )
+
+
+def create_editor(
+    pref: PmemoPref, storage: StorageBase, drafts: DraftJournal
+) -> PmemoEditor:
+    from pmemo.extensions.openai_completion import OpenAiCompletion
+    from pmemo.extensions.prompt_template_manager import PromptTemplateCompleter
+    from pmemo.history import HISTORY_FILE_NAME
+    from pmemo.pmemo_editor import PmemoEditor
+    from pmemo.suggest import iter_memo_lines
+
+    extensions = [
+        PromptTemplateCompleter(pref.extensions_pref.template_pref.template_dir),
+        OpenAiCompletion(**pref.extensions_pref.openai_pref.dict()),
+    ]
+    return PmemoEditor(
+        **pref.editor_pref.dict(),
+        extensions=extensions,
+        suggestion_lines=lambda: iter_memo_lines(storage),
+        history_path=pref.out_dir / HISTORY_FILE_NAME,
+        drafts=drafts,
+    )
+
+
 def update_tokens(pref: PmemoPref, tokens: Tokens) -> None:
     new_pref_dict = pref.model_dump()
     new_pref_dict["api_pref"]["user_token"] = tokens.token
@@ -56,13 +133,13 @@ def main():
     )
     parser_remove = subparsers.add_parser(
         "remove",
-        help="remove memo",
+        help="remove memos (tab marks several)",
     )
     parser_list = subparsers.add_parser("list", help="list all memos")
     parser_list.add_argument("-p", "--prefix", type=str, default="")
     parser_preview = subparsers.add_parser(
         "preview",
-        help="preview memo(markdown) on terminal",
+        help="preview memos(markdown) on terminal (tab marks several)",
     )
     parser_pref = subparsers.add_parser("pref", help="set pref")
     parser_pref.add_argument("--init", action="store_true")
@@ -70,13 +147,43 @@ def main():
         "template", help="register/edit prompt templates"
     )
     parser_templates.add_argument("-e", "--edit", action="store_true")
-    parser_run = subparsers.add_parser("run", help="run codeblock")
+    parser_run = subparsers.add_parser("run", help="run codeblocks (tab marks several)")
     parser_signup = subparsers.add_parser("signup", help="signup to pmemo")
     parser_login = subparsers.add_parser("login", help="login to pmemo")
     parser_push = subparsers.add_parser("push", help="push memo to db with encryption")
+    parser_push.add_argument(
+        "-s",
+        "--select",
+        action="store_true",
+        help="choose the memos to push instead of pushing all",
+    )
     parser_pull = subparsers.add_parser(
         "pull", help="pull memo from db with decryption"
     )
+    parser_search = subparsers.add_parser("search", help="search memo contents")
+    parser_search.add_argument("query", type=str)
+    parser_search.add_argument("-n", "--limit", type=int, default=20)
+    parser_stats = subparsers.add_parser(
+        "stats", help="show the number of memos and the space saved by compression"
+    )
+    parser_gc = subparsers.add_parser(
+        "gc",
+        help="remove orphaned codeblock files and stored codeblocks that no memo refers to",
+    )
+    parser_gc.add_argument(
+        "-n", "--dry-run", action="store_true", help="only report what would be removed"
+    )
+    parser_reindex = subparsers.add_parser(
+        "reindex",
+        help="rebuild the memo catalog and search index after external changes",
+    )
+    parser_migrate_layout = subparsers.add_parser(
+        "migrate-layout",
+        help="move memos into another directory layout (resumes when interrupted)",
+    )
+    parser_migrate_layout.add_argument(
+        "layout", type=str, choices=[layout.value for layout in MemoLayout]
+    )
     parser.set_defaults(cmd="new")
     args = parser.parse_args()
 
@@ -84,56 +191,93 @@ def main():
         PmemoPref.parse_file(PREF_FILE_PATH) if PREF_FILE_PATH.exists() else PmemoPref()
     )
 
-    extensions = [
-        PromptTemplateCompleter(pref.extensions_pref.template_pref.template_dir),
-        OpenAiCompletion(**pref.extensions_pref.openai_pref.dict()),
-    ]
+    storage = create_storage(pref)
+    drafts = DraftJournal(pref.out_dir)
 
-    editor = PmemoEditor(
-        **pref.editor_pref.dict(),
-        extensions=extensions,
-    )
     if args.cmd == "new":
-        content = editor.text("Memo")
+        editor = create_editor(pref, storage, drafts)
+        content = editor.text(
+            "Memo",
+            default=restore_draft(drafts, NEW_MEMO_DRAFT),
+            draft=NEW_MEMO_DRAFT,
+        )
         memo = Memo(
             pref.out_dir,
             content,
             title_max_length=pref.memo_pref.max_title_length,
+            storage=storage,
         )
-        memo.save()
+        log_save_report(memo.title, memo.save())
+        drafts.discard(NEW_MEMO_DRAFT)
 
     elif args.cmd == "edit":
-        file_path = select_file(pref.out_dir, "*/*.md")
-        memo = Memo.from_file(file_path, pref.memo_pref.max_title_length)
-        content = editor.text(f"Edit: {file_path.name}", default=memo.content)
+        from pmemo.custom_select import select_memo
+
+        title = select_memo(storage, pref.editor_pref.style_name.value)
+        if not title:
+            return
+        memo = Memo.load(storage, title, pref.memo_pref.max_title_length)
+        draft = edit_draft_name(title)
+        editor = create_editor(pref, storage, drafts)
+        content = editor.text(
+            f"Edit: {memo.file_path.name}",
+            default=restore_draft(drafts, draft, memo.content),
+            draft=draft,
+        )
         memo.edit_content(content)
-        memo.save()
+        log_save_report(memo.title, memo.save())
+        drafts.discard(draft)
 
     elif args.cmd == "remove":
-        file_path = select_file(pref.out_dir, "*/*.md")
-        memo = Memo.from_file(file_path, pref.memo_pref.max_title_length)
-        memo.remove()
+        from pmemo.custom_select import select_memos
+
+        titles = [
+            title
+            for title in select_memos(storage, pref.editor_pref.style_name.value)
+            if storage.exists(title)
+        ]
+        if titles and confirm_remove_many(titles):
+            for title in titles:
+                storage.remove(title)
+            get_logger().info("%d memos removed", len(titles))
 
     elif args.cmd == "list":
-        candidates = sort_by_mtime(pref.out_dir, "*/*.md")
-        candidates = [p.name for p in candidates if p.name.startswith(args.prefix)]
+        from pmemo.codeblock import LANG_EXT
+
+        # the memo files are named after their titles, so only the titles are read
+        candidates = [
+            "".join((title, LANG_EXT["markdown"]))
+            for title in storage.titles(args.prefix)
+        ]
         print("\n".join(candidates))
 
     elif args.cmd == "preview":
-        file_path = select_file(pref.out_dir, "*/*.md")
+        from rich.console import Console
+        from rich.markdown import Markdown
+
+        from pmemo.custom_select import select_memos
+
+        titles = select_memos(storage, pref.editor_pref.style_name.value)
         console = Console()
-        memo_content = Markdown(file_path.read_text())
-        console.print(memo_content)
+        for title in titles:
+            if len(titles) > 1:
+                console.rule(title)
+            console.print(Markdown(storage.load(title)))
 
     elif args.cmd == "pref":
         if args.init:
             new_pref = PmemoPref()
         else:
+            editor = create_editor(pref, storage, drafts)
             new_pref_dict = update_pref(editor, copy.deepcopy(pref.model_dump()))
             new_pref = PmemoPref.model_validate(new_pref_dict)
         new_pref.write()
 
     elif args.cmd == "template":
+        from pmemo.custom_select import select_file
+        from pmemo.extensions.prompt_template_manager import register_prompt_template
+
+        editor = create_editor(pref, storage, drafts)
         if args.edit:
             file_path = select_file(
                 pref.extensions_pref.template_pref.template_dir, "*.txt"
@@ -149,43 +293,83 @@ def main():
         )
 
     elif args.cmd == "run":
-        memo_title_candidates = [
-            p.parent.stem for p in sort_by_mtime(pref.out_dir, "*/*.py")
-        ]
-        memo_title = custom_select(memo_title_candidates)
-        codeblock_candidates = {
-            p.stem: p for p in sort_by_mtime(pref.out_dir / memo_title, "*.py")
+        from pmemo.custom_select import custom_select, custom_select_many
+
+        runnable_entries = {
+            entry.title: entry
+            for entry in storage.entries()
+            if any(blockname.endswith(".py") for blockname in entry.codeblocks)
         }
-        if not codeblock_candidates:
+        memo_title = custom_select(list(runnable_entries))
+        if not memo_title:
             return
-        target_file = custom_select(codeblock_candidates)
-        subprocess.run(["python3", pref.out_dir / memo_title / target_file])
+        codeblock_candidates = {
+            Path(blockname).stem: blockname
+            for blockname in runnable_entries[memo_title].codeblocks
+            if blockname.endswith(".py")
+        }
+        target_files = custom_select_many(
+            list(codeblock_candidates),
+            preview=lambda stem: storage.export_codeblock(
+                memo_title, codeblock_candidates[stem]
+            ).read_text(),
+        )
+        for target_file in target_files:
+            completed = subprocess.run(
+                [
+                    "python3",
+                    storage.export_codeblock(
+                        memo_title, codeblock_candidates[target_file]
+                    ),
+                ]
+            )
+            if completed.returncode != 0:
+                get_logger().error(
+                    "%s exited with %d", target_file, completed.returncode
+                )
 
     elif args.cmd == "signup":
+        from pmemo.api.auth import APIAuthenticator
+
         tokens = APIAuthenticator().signup()
         update_tokens(pref, tokens)
 
     elif args.cmd == "login":
+        from pmemo.api.auth import APIAuthenticator
+
         tokens = APIAuthenticator().login(pref.api_pref.user_refresh_token)
         update_tokens(pref, tokens)
 
     elif args.cmd == "push":
+        from pmemo.api.client import APIClient
+        from pmemo.api.config import Tokens
+        from pmemo.custom_select import select_memos
+
         if pref.api_pref.user_token is None:
-            logger.error("You need to signup/login first")
+            get_logger().error("You need to signup/login first")
             return
 
-        memos = sort_by_mtime(pref.out_dir, "*/*.md")
+        if args.select:
+            titles = select_memos(storage, pref.editor_pref.style_name.value)
+            entries = [entry for entry in map(storage.get, titles) if entry is not None]
+        else:
+            entries = storage.entries()
         tokens = Tokens(
             token=pref.api_pref.user_token,
             refresh_token=pref.api_pref.user_refresh_token,
         )
         client = APIClient(tokens, pref.api_pref.encryption_key)
-        for memo in memos:
-            client.store_memo(memo.name.encode(), memo.read_bytes())
+        for entry in entries:
+            client.store_memo(
+                entry.path.name.encode(), storage.load(entry.title).encode()
+            )
 
     elif args.cmd == "pull":
+        from pmemo.api.client import APIClient
+        from pmemo.api.config import Tokens
+
         if pref.api_pref.user_token is None:
-            logger.error("You need to signup/login first")
+            get_logger().error("You need to signup/login first")
             return
 
         tokens = Tokens(
@@ -193,14 +377,68 @@ def main():
             refresh_token=pref.api_pref.user_refresh_token,
         )
         client = APIClient(tokens, pref.api_pref.encryption_key)
+        transaction = WriteTransaction()
         try:
             for memo_content in client.get_memos():
-                pulled_memo = Memo(pref.out_dir, memo_content)
-                pulled_memo.save(show_diff=True)
+                pulled_memo = Memo(
+                    pref.out_dir,
+                    memo_content,
+                    title_max_length=pref.memo_pref.max_title_length,
+                    storage=storage,
+                )
+                log_save_report(
+                    pulled_memo.title,
+                    pulled_memo.save(show_diff=True, transaction=transaction),
+                )
+                if len(transaction) >= PULL_BATCH_SIZE:
+                    transaction.commit()
+            transaction.commit()
         except KeyboardInterrupt:
-            logger.error("Pulling canceled")
+            transaction.rollback()
+            get_logger().error("Pulling canceled")
             pass
 
+    elif args.cmd == "search":
+        results = storage.search_index.search(args.query, args.limit)
+        print("\n".join(result.path.name for result in results))
+
+    elif args.cmd == "migrate-layout":
+        if not isinstance(storage, FileSystemStorage):
+            get_logger().error("Layouts only apply to the filesystem storage")
+            return
+
+        def relocate(title: str, file_path: Path) -> None:
+            storage.catalog.relocate(title, file_path)
+            storage.search_index.relocate(title, file_path)
+
+        moved = migrate_layout(pref.out_dir, MemoLayout(args.layout), relocate)
+        get_logger().info("Moved %d memos to the %s layout", moved, args.layout)
+
+    elif args.cmd == "stats":
+        stats = storage.stats()
+        print(f"memos: {stats.memos}")
+        print(f"size: {format_size(stats.size)}")
+        print(f"stored: {format_size(stats.stored_size)}")
+        print(
+            f"saved: {format_size(stats.saved)}"
+            f" ({stats.saved / stats.size if stats.size else 0:.1%})"
+        )
+
+    elif args.cmd == "gc":
+        report = storage.gc(args.dry_run)
+        print("\n".join(str(orphan) for orphan in report.orphans))
+        get_logger().info(
+            "%s %d orphaned files and %d unreferenced codeblocks",
+            "Would remove" if args.dry_run else "Removed",
+            len(report.orphans),
+            report.blobs,
+        )
+        for path in report.unknown:
+            get_logger().info("Kept %s, which was not written by pmemo", path)
+
+    elif args.cmd == "reindex":
+        get_logger().info("Indexed %d memos", storage.reindex())
+
     else:
         raise NotImplementedError(f"Unknown command: {args.cmd}")
 
@@ -1,48 +1,17 @@
 from __future__ import annotations
 
-import hashlib
-import re
 import sys
 from difflib import context_diff
 from pathlib import Path
+from typing import Optional
 
+from pmemo.codeblock import LANG_EXT, Codeblock, extract_codeblocks, iter_codeblocks
+from pmemo.fileio import WriteTransaction, read_text
+from pmemo.layout import out_dir_of
+from pmemo.storage.base import SaveReport, StorageBase
+from pmemo.storage.filesystem import FileSystemStorage
 from pmemo.utils import confirm_overwrite, confirm_remove
 
-RE_CODEBLOCK = re.compile(r"`{3}([^:\s]*):?(.*?)\n([\s\S]+?)`{3}")
-LANG_EXT = {"markdown": ".md", "python": ".py", "python3": ".py"}
-DEFAULT_ENCODING = "utf-8"
-
-
-def extract_codeblocks(
-    text: str, title_max_length: int = 30
-) -> list[tuple[str, str, str]]:
-    """
-    Extracts code blocks from the given text and returns a list of tuples representing the code blocks.
-
-    Args:
-        text (str): The input text from which code blocks are extracted.
-        title_max_length (int): Max length of codeblock's title. Defaults to 30.
-
-    Returns:
-        list[tuple[str, str, str]]: A list of tuples representing code blocks. Each tuple contains three elements:
-                                    - lang (str): The language of the code block.
-                                    - blockname (str): The name or identifier of the code block.
-                                    - code (str): The actual code contained in the block.
-    """
-    codeblocks = []
-    for lang, blockname, code in RE_CODEBLOCK.findall(text):
-        lang = lang.strip() if lang else "python"
-        blockname = (
-            blockname.strip()
-            if blockname.strip()
-            else hashlib.sha256(bytes(code, DEFAULT_ENCODING)).hexdigest()[
-                :title_max_length
-            ]
-        )
-        blockname = "".join((blockname, LANG_EXT.get(lang, "")))
-        codeblocks.append((lang, blockname, code.strip()))
-    return codeblocks
-
 
 class Memo:
     """
@@ -51,7 +20,12 @@ class Memo:
     """
 
     def __init__(
-        self, out_dir: Path, content: str, title: str = "", title_max_length: int = 30
+        self,
+        out_dir: Path,
+        content: str,
+        title: str = "",
+        title_max_length: int = 30,
+        storage: Optional[StorageBase] = None,
     ):
         """
         Initializes a Memo instance.
@@ -61,30 +35,63 @@ class Memo:
             content (str): The content of the memo.
             title (str, optional): The title of the memo. Defaults to an empty string.
             title_max_length (int): Max length of codeblock's title. Defaults to 30.
+            storage (Optional[StorageBase]): Where the memo is stored. Defaults to the file system under out_dir.
         """
-        self._out_dir = out_dir
         self._content = content
         self._title = title
         self._title_max_length = title_max_length
+        self._storage = (
+            storage
+            if storage is not None
+            else FileSystemStorage(out_dir, title_max_length)
+        )
         self._is_edited: bool = False
 
     @classmethod
-    def from_file(cls, file_path: Path, title_max_length: int = 30) -> Memo:
+    def from_file(
+        cls,
+        file_path: Path,
+        title_max_length: int = 30,
+        storage: Optional[StorageBase] = None,
+    ) -> Memo:
         """
         Creates a Memo instance from a file.
 
         Args:
             file_path (Path): The path to the file.
             title_max_length (int): Max length of codeblock's title. Defaults to 30.
+            storage (Optional[StorageBase]): Where the memo is stored. Defaults to the file system.
 
         Returns:
             Memo: A Memo instance created from the file.
         """
         return cls(
-            file_path.parents[1],
-            file_path.read_text(),
+            out_dir_of(file_path),
+            read_text(file_path),
             file_path.stem,
             title_max_length,
+            storage,
+        )
+
+    @classmethod
+    def load(cls, storage: StorageBase, title: str, title_max_length: int = 30) -> Memo:
+        """
+        Creates a Memo instance from a stored memo.
+
+        Args:
+            storage (StorageBase): Where the memo is stored.
+            title (str): The title of the memo.
+            title_max_length (int): Max length of codeblock's title. Defaults to 30.
+
+        Returns:
+            Memo: A Memo instance of the stored memo.
+        """
+        return cls(
+            storage.out_dir,
+            storage.load(title),
+            title,
+            title_max_length,
+            storage,
         )
 
     def edit_content(self, content: str) -> None:
@@ -129,45 +136,50 @@ class Memo:
         Returns:
             Path: The file path of the memo.
         """
-        basename = "".join((self.title, LANG_EXT["markdown"]))
-        memo_dir = self._out_dir / self.title
-        memo_dir.mkdir(parents=True, exist_ok=True)
-        return memo_dir / basename
+        return self._storage.memo_file(self.title)
 
     def remove(self) -> None:
         """
         Removes the memo.
         """
-        if confirm_remove(self.file_path.parent):
-            for file in self.file_path.parent.iterdir():
-                if file.is_file():
-                    file.unlink()
-            self.file_path.parent.rmdir()
-
-    def save(self, show_diff: bool = False) -> None:
-        """
-        Saves the memo to the file system, including associated code blocks.
-        """
-        if show_diff and self.file_path.exists():
-            existing_content = self.file_path.read_text().splitlines()
-            new_content = self._content.splitlines()
-            sys.stderr.writelines(
-                "\n".join(
-                    context_diff(
-                        existing_content,
-                        new_content,
-                        fromfile=self.file_path.name,
-                        tofile="pulled content",
+        if self._storage.exists(self.title) and confirm_remove(self.title):
+            self._storage.remove(self.title)
+
+    def save(
+        self, show_diff: bool = False, transaction: Optional[WriteTransaction] = None
+    ) -> SaveReport:
+        """
+        Saves the memo to the storage, including associated code blocks.
+        Files whose content is unchanged are not rewritten, and codeblock files written by the
+        previous save that are no longer in the memo are removed.
+
+        Args:
+            show_diff (bool): When True, the diff against the existing memo is shown before confirming.
+            transaction (Optional[WriteTransaction]): The transaction the writes are staged in.
+                When given, the caller commits it, so that many memos can share one commit.
+                Defaults to a transaction committed before returning.
+
+        Returns:
+            SaveReport: The files written, skipped and removed.
+        """
+        if self._storage.exists(self.title) and not self._storage.is_unchanged(
+            self.title, self._content
+        ):
+            if show_diff:
+                existing_content = self._storage.load(self.title).splitlines()
+                new_content = self._content.splitlines()
+                sys.stderr.writelines(
+                    "\n".join(
+                        context_diff(
+                            existing_content,
+                            new_content,
+                            fromfile=self.file_path.name,
+                            tofile="pulled content",
+                        )
                     )
                 )
-            )
-            sys.stderr.flush()
-
-        if confirm_overwrite(self.file_path):
-            self.file_path.write_text(self._content)
+                sys.stderr.flush()
 
-            for _, blockname, code in extract_codeblocks(
-                self._content, self._title_max_length
-            ):
-                codeblock_path = self.file_path.parent / blockname
-                codeblock_path.write_text(code)
+            if not confirm_overwrite(self.file_path.name):
+                return SaveReport([], [], [])
+        return self._storage.save(self.title, self._content, transaction)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.input import Input
+from prompt_toolkit.input.vt100 import Vt100Input
+from prompt_toolkit.input.vt100_parser import Vt100Parser
+from prompt_toolkit.key_binding.key_processor import KeyPress
+from prompt_toolkit.keys import Keys
+
+PASTE_END = "\x1b[201~"
+
+
+class PasteParser(Vt100Parser):
+    """
+    Vt100Parser that looks for the end of a bracketed paste in the newly read input only.
+    Vt100Parser appends every read to the pasted text and searches all of it again, so a paste
+    that arrives in many reads takes quadratic time, minutes for a few MB.
+    """
+
+    def reset(self, request: bool = False) -> None:
+        super().reset(request)
+        self._paste_chunks: list[str] = []
+        # the end of the pasted text that may hold the beginning of PASTE_END
+        self._paste_tail = ""
+
+    def feed(self, data: str) -> None:
+        if not self._in_bracketed_paste:
+            super().feed(data)
+            return
+        searched = self._paste_tail + data
+        found = searched.find(PASTE_END)
+        if found < 0:
+            self._paste_chunks.append(data)
+            self._paste_tail = searched[-(len(PASTE_END) - 1) :]
+            return
+        pasted = "".join(self._paste_chunks) + data
+        end = len(pasted) - len(searched) + found
+        self._paste_chunks, self._paste_tail = [], ""
+        self._in_bracketed_paste = False
+        self.feed_key_callback(KeyPress(Keys.BracketedPaste, pasted[:end]))
+        self.feed(pasted[end + len(PASTE_END) :])
+
+
+def use_paste_parser(input: Input) -> None:
+    """
+    Makes a terminal input parse bracketed pastes with PasteParser.
+    """
+    if isinstance(input, Vt100Input) and not isinstance(
+        input.vt100_parser, PasteParser
+    ):
+        input.vt100_parser = PasteParser(input.vt100_parser.feed_key_callback)
+
+
+def paste_text(buffer: Buffer, data: str) -> None:
+    """
+    Inserts pasted text in one edit, replacing the selection if any.
+    Unlike typed text, it does not trigger auto-suggestion or completion.
+    """
+    # some terminals paste "\r\n" line endings
+    data = data.replace("\r\n", "\n").replace("\r", "\n")
+    if buffer.selection_state is not None:
+        buffer.cut_selection()
+    buffer.insert_text(data, fire_event=False)
@@ -1,4 +1,7 @@
-from typing import Optional
+import threading
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Optional
 
 from prompt_toolkit import PromptSession
 from prompt_toolkit.auto_suggest import AutoSuggest, Suggestion
@@ -6,25 +9,56 @@ from prompt_toolkit.buffer import Buffer
 from prompt_toolkit.clipboard.pyperclip import PyperclipClipboard
 from prompt_toolkit.completion import Completer, merge_completers
 from prompt_toolkit.document import Document
-from prompt_toolkit.filters import has_selection
+from prompt_toolkit.filters import has_arg, has_selection
 from prompt_toolkit.formatted_text.utils import to_plain_text
+from prompt_toolkit.history import History, ThreadedHistory
 from prompt_toolkit.key_binding import KeyBindings, KeyBindingsBase, merge_key_bindings
+from prompt_toolkit.key_binding.key_processor import KeyProcessor
 from prompt_toolkit.keys import Keys
 from prompt_toolkit.layout.screen import Char
-from prompt_toolkit.lexers import PygmentsLexer
 from prompt_toolkit.styles import style_from_pygments_cls
-from pygments.lexers.markup import MarkdownLexer
 from pygments.styles import get_style_by_name
 
+from pmemo.drafts import Autosave, DraftJournal, DraftText
 from pmemo.extensions.base import ExtensionBase
+from pmemo.highlight import OUTSIDE, MarkdownCodeLexer
+from pmemo.history import DEFAULT_MAX_HISTORY_BYTES, PersistentHistory
+from pmemo.paste import paste_text, use_paste_parser
+from pmemo.suggest import IndexedHistory, PrefixIndex
 from pmemo.utils import error_handler
+from pmemo.windowed import LARGE_MEMO_CHARS, LineWindow
 
 
 class AutoSuggestFromHistoryForMultiline(AutoSuggest):
     """
     Auto-suggests based on the lines in the input history for multiline input.
+    The suggestion is found in a PrefixIndex, which may also hold other lines, e.g. those of the stored memos.
     """
 
+    def __init__(self, index: Optional[PrefixIndex] = None) -> None:
+        """
+        Initializes an AutoSuggestFromHistoryForMultiline instance.
+
+        Args:
+            index (Optional[PrefixIndex]): The index of the lines to suggest, which the history is added to.
+                Defaults to None, which creates an empty one.
+        """
+        self.index = index if index is not None else PrefixIndex()
+        self._history: Optional[History] = None
+        self._indexed = 0
+
+    def _index_history(self, history: History) -> None:
+        stored = history.history if isinstance(history, ThreadedHistory) else history
+        if isinstance(stored, IndexedHistory) and stored.index is self.index:
+            # the history adds its strings as they are stored
+            return
+        if history is not self._history:
+            self._history = history
+            self._indexed = 0
+        strings = list(history.get_strings())
+        self.index.extend(strings[self._indexed :])
+        self._indexed = len(strings)
+
     def get_suggestion(
         self, buffer: Buffer, document: Document
     ) -> Optional[Suggestion]:
@@ -33,10 +67,11 @@ class AutoSuggestFromHistoryForMultiline(AutoSuggest):
 
         # Only create a suggestion when this is not an empty line.
         if text.strip():
-            # Find first matching line in history.
-            for string in reversed(list(buffer.history.get_strings())):
-                if string.startswith(text):
-                    return Suggestion(string[len(text) :])
+            self._index_history(buffer.history)
+            # Find the most recent matching line.
+            string = self.index.find(text)
+            if string is not None:
+                return Suggestion(string[len(text) :])
 
         return None
 
@@ -53,6 +88,11 @@ class PmemoEditor:
         style_name: str = "github-dark",
         indentation_spaces: int = 4,
         extensions: Optional[list[ExtensionBase]] = None,
+        suggestion_lines: Optional[Callable[[], Iterable[str]]] = None,
+        history_path: Optional[Path] = None,
+        max_history_bytes: int = DEFAULT_MAX_HISTORY_BYTES,
+        drafts: Optional[DraftJournal] = None,
+        large_memo_chars: int = LARGE_MEMO_CHARS,
     ) -> None:
         """
         Initializes a PmemoEditor instance.
@@ -61,6 +101,16 @@ class PmemoEditor:
             prompt_spaces (int, optional): The number of spaces for the prompt width. Defaults to 4.
             style_name (str, optional): The name of the style for syntax highlighting. Defaults to "github-dark".
             indentation_spaces (int, optional): The number of spaces for indentation. Defaults to 4.
+            suggestion_lines (Optional[Callable[[], Iterable[str]]], optional): Returns the lines to auto-suggest
+                besides the input history, oldest first. They are indexed in a background thread when the editor
+                first opens. Defaults to None.
+            history_path (Optional[Path], optional): The file the input history is kept in across sessions.
+                Defaults to None, which keeps it in memory.
+            max_history_bytes (int, optional): The size the history file is compacted at. Defaults to 1 MiB.
+            drafts (Optional[DraftJournal], optional): The journal prompts with a draft name autosave to.
+                Defaults to None.
+            large_memo_chars (int, optional): Texts longer than this are edited in the large memo mode,
+                where the buffer holds only the lines around the cursor. Defaults to 1000000.
         """
         self._prompt_spaces = prompt_spaces
         self._style = style_from_pygments_cls(get_style_by_name(style_name))
@@ -68,9 +118,26 @@ class PmemoEditor:
         Char.display_mappings["\n"] = " "
 
         self._extensions = extensions
+        self._suggestion_lines = suggestion_lines
+        self._lexer = MarkdownCodeLexer()
+        self._drafts = drafts
+        self._large_memo_chars = large_memo_chars
+        # the lines of a large memo, of which the buffer holds a window
+        self._window: Optional[LineWindow] = None
+        # the line of the memo the first line of the buffer is
+        self._line_offset = 0
+        self._session: Optional[PromptSession[str]] = None
+        self._session_kwargs: dict = {}
+        self._index = PrefixIndex()
+        # the history file is read in a background thread when the first prompt opens
+        self._history = ThreadedHistory(
+            IndexedHistory(self._index)
+            if history_path is None
+            else PersistentHistory(history_path, self._index, max_history_bytes)
+        )
 
     def _ljust_line_number(self, line_number: int) -> str:
-        line_number_str = str(line_number + 1)
+        line_number_str = str(self._line_offset + line_number + 1)
         return line_number_str.ljust(self._prompt_spaces, " ")
 
     def _prompt_continuation(self, width, line_number, wrap_count) -> str:
@@ -82,9 +149,22 @@ class PmemoEditor:
         instruction = "\n".join((self.INSTRUCTION, self._ljust_line_number(0)))
         return " ".join((message, instruction)) if message else instruction
 
+    def _index_suggestion_lines(self) -> None:
+        if self._suggestion_lines is None:
+            return
+        lines, self._suggestion_lines = self._suggestion_lines, None
+        threading.Thread(
+            target=lambda: self._index.extend(lines()), daemon=True
+        ).start()
+
     @error_handler
     def text(
-        self, message: str, default: str = "", multiline: bool = True, **kwargs
+        self,
+        message: str,
+        default: str = "",
+        multiline: bool = True,
+        draft: Optional[str] = None,
+        **kwargs,
     ) -> str:
         """
         Displays a prompt for text input with customizable message and default value.
@@ -93,11 +173,99 @@ class PmemoEditor:
             message (str): The prompt message.
             default (str, optional): The default value to display and return. Defaults to "".
             multiline (bool): When True, prefer a layout that is more adapted for multiline input.
+            draft (Optional[str], optional): The name of the draft the text is autosaved to, so it can be
+                restored after Ctrl-C or a crash. The draft is left for the caller to discard. Defaults to None.
             **kwargs: Additional keyword arguments for PromptSession.
 
         Returns:
             str: The text input provided by the user.
         """
+        self._index_suggestion_lines()
+        session = self._get_session(**kwargs)
+        buffer = session.default_buffer
+        self._window = window = (
+            LineWindow(default) if len(default) > self._large_memo_chars else None
+        )
+        self._line_offset = 0 if window is None else window.start
+        self._lexer.start_at(OUTSIDE if window is None else window.start_state())
+        # the first line number changes when the window moves
+        session.message = partial(self._build_prompt_message, message, multiline)
+        session.multiline = multiline
+        buffer.reset(Document(default if window is None else window.text()))
+
+        def get_text(buffer_text: str) -> DraftText:
+            # a large memo is joined only when the text is used
+            return buffer_text if window is None else window.full_text(buffer_text)
+
+        def slide_window(key_processor: KeyProcessor) -> None:
+            document = buffer.document
+            row, col = document.cursor_position_row, document.cursor_position_col
+            if window is not None and window.needs_move(row, document.line_count):
+                self._move_window(buffer, window.start + row, col)
+
+        autosave = (
+            None
+            if draft is None or self._drafts is None
+            else Autosave(self._drafts, draft)
+        )
+
+        def on_text_changed(buffer: Buffer) -> None:
+            if autosave is not None:
+                autosave.update(get_text(buffer.text))
+
+        buffer.on_text_changed += on_text_changed
+        session.app.key_processor.after_key_press += slide_window
+        try:
+            text = get_text(to_plain_text(session.app.run()))
+            return (text() if callable(text) else text).strip()
+        finally:
+            buffer.on_text_changed -= on_text_changed
+            session.app.key_processor.after_key_press -= slide_window
+            if autosave is not None:
+                autosave.flush(get_text(buffer.text))
+            self._window = None
+            self._line_offset = 0
+
+    def _move_window(self, buffer: Buffer, line: int, col: int = 0) -> None:
+        # the buffer is reset with the new window, so undo does not reach back before the move
+        window = self._window
+        assert window is not None
+        document = Document(window.move(buffer.text, line))
+        self._line_offset = window.start
+        self._lexer.start_at(window.start_state())
+        buffer.reset(
+            Document(
+                document.text,
+                document.translate_row_col_to_index(line - window.start, col),
+            )
+        )
+
+    def go_to_line(self, buffer: Buffer, line: int) -> None:
+        """
+        Moves the cursor to the start of a line of the memo, moving the window in the large memo mode.
+
+        Args:
+            buffer (Buffer): The editor's buffer.
+            line (int): The line, from 0.
+        """
+        window = self._window
+        document = buffer.document
+        if window is None:
+            buffer.cursor_position = document.translate_row_col_to_index(line, 0)
+        elif window.needs_move(line - window.start, document.line_count) or not (
+            0 <= line - window.start < document.line_count
+        ):
+            self._move_window(buffer, line)
+        else:
+            buffer.cursor_position = document.translate_row_col_to_index(
+                line - window.start, 0
+            )
+
+    def _get_session(self, **kwargs) -> PromptSession[str]:
+        # the session, its key bindings and its completer are built once and reused by the next prompts,
+        # unless they pass other arguments for PromptSession
+        if self._session is not None and kwargs == self._session_kwargs:
+            return self._session
         key_bindings = self.get_key_bindings()
         completer = None
         if self._extensions is not None:
@@ -107,24 +275,24 @@ class PmemoEditor:
             completer = merge_completers(
                 [e for e in self._extensions if isinstance(e, Completer)]
             )
-        session: PromptSession[str] = PromptSession(
-            self._build_prompt_message(message, multiline),
-            multiline=multiline,
+        self._session = PromptSession(
             wrap_lines=True,
             mouse_support=True,
             key_bindings=key_bindings,
             prompt_continuation=self._prompt_continuation,
-            lexer=PygmentsLexer(MarkdownLexer),
+            lexer=self._lexer,
             style=self._style,
             erase_when_done=True,
-            auto_suggest=AutoSuggestFromHistoryForMultiline(),
+            history=self._history,
+            auto_suggest=AutoSuggestFromHistoryForMultiline(self._index),
             clipboard=PyperclipClipboard(),
             complete_while_typing=False,
             completer=completer,
             **kwargs,
         )
-        session.default_buffer.reset(Document(default))
-        return to_plain_text(session.app.run()).strip()
+        use_paste_parser(self._session.input)
+        self._session_kwargs = kwargs
+        return self._session
 
     def get_key_bindings(self) -> KeyBindingsBase:
         bindings = KeyBindings()
@@ -141,6 +309,11 @@ class PmemoEditor:
         def undo(event):
             event.app.current_buffer.undo()
 
+        # e.g. "Esc 1 2 Ctrl-G" goes to line 12
+        @bindings.add(Keys.ControlG, filter=has_arg)
+        def go_to_line(event):
+            self.go_to_line(event.current_buffer, event.arg - 1)
+
         for bracket_start in self.BRACKETS:
 
             @bindings.add(bracket_start)
@@ -233,6 +406,10 @@ class PmemoEditor:
             data = event.app.current_buffer.copy_selection()
             event.app.clipboard.set_data(data)
 
+        @bindings.add(Keys.BracketedPaste)
+        def paste(event):
+            paste_text(event.current_buffer, event.data)
+
         @bindings.add(Keys.ControlV)
         def paste_selection(event):
             data = event.app.clipboard.get_data()
@@ -1,12 +1,14 @@
+import base64
 import json
+import secrets
 from enum import Enum
 from pathlib import Path
 from typing import Optional
 
-from cryptography.fernet import Fernet
-from prompt_toolkit.keys import Keys
 from pydantic import BaseModel, Field, PositiveInt
 
+from pmemo.fileio import atomic_write_text
+
 PREF_FILE_PATH = Path(__file__).parent / ".preference"
 DEFAULT_PMEMO_DIR = Path.home() / ".pmemo"
 
@@ -67,10 +69,20 @@ class EditorPref(BaseModel, frozen=True):
     prompt_spaces: PositiveInt = 4
     style_name: PygmentsStyles = PygmentsStyles.github_dark
     indentation_spaces: PositiveInt = 4
+    max_history_bytes: PositiveInt = 1024 * 1024
+    large_memo_chars: PositiveInt = 1_000_000
+
+
+class StorageBackend(str, Enum):
+    filesystem = "filesystem"
+    sqlite = "sqlite"
 
 
 class MemoPref(BaseModel, frozen=True):
     max_title_length: PositiveInt = 30
+    storage: StorageBackend = StorageBackend.filesystem
+    compress_threshold: Optional[PositiveInt] = None
+    auto_gc: bool = False
 
 
 # ref: https://platform.openai.com/docs/api-reference/completions/create
@@ -80,12 +92,14 @@ class OpenAiPref(BaseModel, frozen=True):
     max_tokens: int = 16
     temperature: int = 0
     n: int = 1
-    key_binding: Keys = Keys.ControlO
+    # a prompt_toolkit key name, which is checked when the editor binds it,
+    # so preferences load without importing prompt_toolkit
+    key_binding: str = "c-o"
 
 
 class TemplateManagerPref(BaseModel, frozen=True):
     template_dir: Path = DEFAULT_PMEMO_DIR / ".templates"
-    key_binding: Keys = Keys.ControlT
+    key_binding: str = "c-t"
 
 
 class ExtensionsPref(BaseModel, frozen=True):
@@ -93,8 +107,16 @@ class ExtensionsPref(BaseModel, frozen=True):
     template_pref: TemplateManagerPref = TemplateManagerPref()
 
 
+def generate_encryption_key() -> bytes:
+    """
+    Generates a key in the format of cryptography's Fernet.generate_key, without importing cryptography,
+    which only push and pull need.
+    """
+    return base64.urlsafe_b64encode(secrets.token_bytes(32))
+
+
 class ApiPref(BaseModel, frozen=True):
-    encryption_key: bytes = Field(default_factory=Fernet.generate_key)
+    encryption_key: bytes = Field(default_factory=generate_encryption_key)
     user_token: Optional[str] = None
     user_refresh_token: Optional[str] = None
 
@@ -107,7 +129,7 @@ class PmemoPref(BaseModel, frozen=True):
     api_pref: ApiPref = ApiPref()
 
     def write(self) -> None:
-        PREF_FILE_PATH.write_text(self.model_dump_json())
+        atomic_write_text(PREF_FILE_PATH, self.model_dump_json())
 
     @classmethod
     def read(cls) -> "PmemoPref":
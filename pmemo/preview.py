@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+from pmemo.fileio import DEFAULT_ENCODING
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+
+P = TypeVar("P")
+
+
+def text_size(preview: Any) -> int:
+    """
+    Returns the size of a preview in bytes, which is either text or formatted text.
+    """
+    if isinstance(preview, str):
+        return len(preview.encode(DEFAULT_ENCODING))
+    return sum(len(fragment[1].encode(DEFAULT_ENCODING)) for fragment in preview)
+
+
+class PreviewCache(Generic[P]):
+    """
+    LRU cache of the previews shown next to the selector's choices, bounded by the total size of the
+    cached previews. A preview is cached under the key of its choice, typically (path, mtime),
+    so moving the cursor back and forth does not read the same files again while an edited file is.
+    Previews of the choices next to the cursor can be loaded ahead in a background thread.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], P],
+        key: Optional[Callable[[str], Hashable]] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        size: Callable[[P], int] = text_size,
+    ) -> None:
+        """
+        Initializes a PreviewCache instance.
+
+        Args:
+            load (Callable[[str], P]): Returns the preview of a choice, e.g. text or formatted text.
+            key (Optional[Callable[[str], Hashable]]): Returns the key a choice's preview is cached under.
+                Defaults to None, which uses the choice itself.
+            max_bytes (int): The total size of the cached previews in bytes. Defaults to 4 MiB.
+            size (Callable[[P], int]): Returns the size of a preview in bytes. Defaults to text_size.
+        """
+        self._load = load
+        self._key = key
+        self._max_bytes = max_bytes
+        self._sizeof = size
+        self._cache: OrderedDict[Hashable, tuple[P, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: dict[Hashable, Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _key_of(self, choice: str) -> Hashable:
+        return choice if self._key is None else self._key(choice)
+
+    def _lookup(self, key: Hashable) -> Optional[P]:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                return None
+            self._cache.move_to_end(key)
+            return cached[0]
+
+    def _put(self, key: Hashable, preview: P) -> None:
+        size = self._sizeof(preview)
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = (preview, size)
+            self._size += size
+            while self._size > self._max_bytes:
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._size -= evicted
+
+    def get(self, choice: str) -> P:
+        """
+        Returns the preview of choice, loading it unless it is cached.
+        """
+        key = self._key_of(choice)
+        preview = self._lookup(key)
+        if preview is None:
+            pending = self._pending.get(key)
+            # waiting for a prefetch that already started is cheaper than loading again
+            if (
+                pending is not None
+                and pending.running()
+                and pending.exception() is None
+            ):
+                return pending.result()
+            preview = self._load(choice)
+            self._put(key, preview)
+        return preview
+
+    def _prefetch(self, key: Hashable, choice: str) -> P:
+        # the choice may have been shown while the prefetch was queued
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        preview = self._load(choice)
+        self._put(key, preview)
+        return preview
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        self._pending.pop(key, None)
+
+    def prefetch(self, choices: Iterable[str]) -> None:
+        """
+        Loads the previews of choices in a background thread unless they are cached.
+        A preview that fails to load is loaded again, and fails visibly, when it is shown.
+        """
+        for choice in choices:
+            key = self._key_of(choice)
+            if self._lookup(key) is not None or key in self._pending:
+                continue
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="preview"
+                )
+            future = self._executor.submit(self._prefetch, key, choice)
+            self._pending[key] = future
+            future.add_done_callback(partial(self._forget, key))
+
+    def close(self) -> None:
+        """
+        Stops loading previews in the background.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
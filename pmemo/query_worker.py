@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+# a query is computed once no newer one was submitted for this long
+DEBOUNCE_SECONDS = 0.03
+
+Q = TypeVar("Q", bound=Hashable)
+R = TypeVar("R")
+
+
+def _ignore() -> None:
+    pass
+
+
+class QueryWorker(Generic[Q, R]):
+    """
+    Computes the results of queries on a background thread, so typing is not blocked by a slow query.
+    Only the latest query is computed: queries submitted in quick succession are debounced,
+    and a result is dropped when a newer query was submitted while it was computed.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[Q], R],
+        on_result: Callable[[], object] = _ignore,
+        debounce: float = DEBOUNCE_SECONDS,
+    ) -> None:
+        """
+        Initializes a QueryWorker instance. The thread is started by the first query.
+
+        Args:
+            compute (Callable[[Q], R]): Computes the result of a query.
+            on_result (Callable[[], object]): Called from the background thread when a result is published.
+            debounce (float): How long in seconds a query waits for a newer one. Defaults to 0.03.
+        """
+        self._compute = compute
+        self._on_result = on_result
+        self._debounce = debounce
+        self._condition = threading.Condition()
+        self._requested: Optional[Q] = None
+        self._requested_at = 0.0
+        self._pending = False
+        self._result: Optional[tuple[Q, R]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.error: Optional[Exception] = None
+
+    def submit(self, query: Q) -> None:
+        """
+        Requests the result of query, superseding the queries submitted before.
+        """
+        with self._condition:
+            if query == self._requested:
+                return
+            self._requested = query
+            self._requested_at = time.monotonic()
+            self._pending = True
+            self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def result(self) -> Optional[tuple[Q, R]]:
+        """
+        Returns the latest published query and its result, which may be for an older query than
+        the last one submitted, or None when no result was published yet.
+        """
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+    def _next_query(self) -> Optional[Q]:
+        with self._condition:
+            while not self._closed:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                remaining = self._requested_at + self._debounce - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self._pending = False
+                return self._requested
+            return None
+
+    def _run(self) -> None:
+        while True:
+            query = self._next_query()
+            if query is None:
+                return
+            try:
+                result = self._compute(query)
+            except Exception as e:
+                self.error = e
+                self._on_result()
+                return
+            with self._condition:
+                if self._pending or self._closed:
+                    # superseded while it was computed
+                    continue
+                self._result = (query, result)
+            self._on_result()
+
+    def close(self, wait: bool = False) -> None:
+        """
+        Stops the background thread once the query being computed, if any, is done.
+        Queries that are still debounced are dropped.
+
+        Args:
+            wait (bool): When True, waits for the query being computed. Defaults to False.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if wait and self._thread is not None:
+            self._thread.join()
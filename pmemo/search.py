@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import math
+import re
+import shlex
+import sqlite3
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from pmemo.fileio import read_text
+from pmemo.layout import iter_memo_files
+
+INDEX_FILE_NAME = ".search.sqlite3"
+RE_TOKEN = re.compile(r"\w+")
+# ref: https://en.wikipedia.org/wiki/Okapi_BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSION = 16
+# the memos a query scores, taken from the postings of its rarest term, so a query of common terms
+# costs as much as a query of rare ones
+MAX_CANDIDATES = 1000
+
+
+def tokenize(text: str) -> list[str]:
+    return RE_TOKEN.findall(text.lower())
+
+
+def _has_phrase(positions: dict[str, set[int]], phrase: list[str]) -> bool:
+    if not all(token in positions for token in phrase):
+        return False
+    return any(
+        all(start + i in positions[token] for i, token in enumerate(phrase))
+        for start in positions[phrase[0]]
+    )
+
+
+class SearchResult(NamedTuple):
+    title: str
+    path: Path
+    score: float
+
+
+class SearchIndex:
+    """
+    Incrementally maintained inverted index (token -> memos with positions) over memo contents.
+    Queries are ranked with BM25. Every term has to match, the last term also matches as a prefix
+    and quoted terms have to appear as a phrase.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        db_path: Optional[Path] = None,
+        documents: Optional[Callable[[], Iterable[tuple[Path, str]]]] = None,
+    ) -> None:
+        """
+        Initializes a SearchIndex instance. The database is opened lazily.
+
+        Args:
+            out_dir (Path): The output directory where memos are stored.
+            db_path (Optional[Path]): The database the index is kept in. Defaults to a file in out_dir.
+            documents (Optional[Callable[[], Iterable[tuple[Path, str]]]]): Returns the (path, content) of every memo.
+                It is used to build the index the first time. Defaults to the memo files in out_dir.
+        """
+        self._out_dir = out_dir
+        self._db_path = db_path if db_path is not None else out_dir / INDEX_FILE_NAME
+        self._documents = documents if documents is not None else self._memo_files
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _memo_files(self) -> Iterator[tuple[Path, str]]:
+        for file_path in iter_memo_files(self._out_dir):
+            yield file_path, read_text(file_path)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
+            is_new = (
+                self._conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'docs'"
+                ).fetchone()
+                is None
+            )
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS docs ("
+                    "id INTEGER PRIMARY KEY, title TEXT UNIQUE NOT NULL, "
+                    "path TEXT NOT NULL, length INTEGER NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS postings ("
+                    "token TEXT NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL, "
+                    "positions TEXT NOT NULL, PRIMARY KEY (token, doc_id)) WITHOUT ROWID"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id)"
+                )
+                # the candidates of a query, the memos with the most occurrences of a term, are read
+                # from this index without sorting the postings of the term
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS postings_tf "
+                    "ON postings (token, tf DESC, doc_id)"
+                )
+                # document count and total length kept up to date for BM25
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS stats ("
+                    "id INTEGER PRIMARY KEY CHECK (id = 0), "
+                    "n_docs INTEGER NOT NULL, total_length INTEGER NOT NULL)"
+                )
+                self._conn.execute("INSERT OR IGNORE INTO stats VALUES (0, 0, 0)")
+            if is_new:
+                self.reindex(self._documents())
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _remove(self, conn: sqlite3.Connection, title: str) -> None:
+        row = conn.execute(
+            "SELECT id, length FROM docs WHERE title = ?", (title,)
+        ).fetchone()
+        if row is not None:
+            doc_id, length = row
+            conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+            conn.execute(
+                "UPDATE stats SET n_docs = n_docs - 1, total_length = total_length - ?",
+                (length,),
+            )
+
+    def _add(self, conn: sqlite3.Connection, file_path: Path, content: str) -> None:
+        tokens = tokenize(content)
+        cursor = conn.execute(
+            "INSERT INTO docs (title, path, length) VALUES (?, ?, ?)",
+            (
+                file_path.stem,
+                str(file_path.relative_to(self._out_dir)),
+                len(tokens),
+            ),
+        )
+        conn.execute(
+            "UPDATE stats SET n_docs = n_docs + 1, total_length = total_length + ?",
+            (len(tokens),),
+        )
+        positions: dict[str, list[str]] = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(str(position))
+        conn.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?, ?)",
+            (
+                (token, cursor.lastrowid, len(pos), ",".join(pos))
+                for token, pos in positions.items()
+            ),
+        )
+
+    def update(self, file_path: Path, content: str) -> None:
+        """
+        Adds or replaces the postings of a saved memo.
+
+        Args:
+            file_path (Path): The path of the memo file.
+            content (str): The content written to the memo file.
+        """
+        with self.connection as conn:
+            self._remove(conn, file_path.stem)
+            self._add(conn, file_path, content)
+
+    def remove(self, title: str) -> None:
+        with self.connection as conn:
+            self._remove(conn, title)
+
+    def relocate(self, title: str, file_path: Path) -> None:
+        with self.connection as conn:
+            conn.execute(
+                "UPDATE docs SET path = ? WHERE title = ?",
+                (str(file_path.relative_to(self._out_dir)), title),
+            )
+
+    def reindex(self, documents: Iterable[tuple[Path, str]]) -> int:
+        """
+        Rebuilds the index from the given memos.
+
+        Args:
+            documents (Iterable[tuple[Path, str]]): The path and content of the memos to index.
+
+        Returns:
+            int: The number of indexed memos.
+        """
+        count = 0
+        with self.connection as conn:
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM docs")
+            conn.execute("UPDATE stats SET n_docs = 0, total_length = 0")
+            for file_path, content in documents:
+                self._add(conn, file_path, content)
+                count += 1
+        return count
+
+    def _expand_prefix(self, prefix: str) -> list[str]:
+        return [
+            token
+            for token, in self.connection.execute(
+                "SELECT DISTINCT token FROM postings WHERE token >= ? AND token < ? "
+                "LIMIT ?",
+                (prefix, "".join((prefix, "\U0010ffff")), MAX_PREFIX_EXPANSION),
+            )
+        ]
+
+    def _phrase_matches(
+        self, candidates: str, parameters: tuple, phrases: list[list[str]]
+    ) -> tuple[set[int], int]:
+        # the positions of the phrase tokens in every candidate, fetched with one query
+        tokens = list({token for phrase in phrases for token in phrase})
+        positions: dict[int, dict[str, set[int]]] = {}
+        for doc_id, token, doc_positions in self.connection.execute(
+            "WITH c(id) AS ({}) SELECT p.doc_id, p.token, p.positions "
+            "FROM c JOIN postings p ON p.token IN ({}) AND p.doc_id = c.id".format(
+                candidates, ", ".join(["?"] * len(tokens))
+            ),
+            (*parameters, *tokens),
+        ):
+            positions.setdefault(doc_id, {})[token] = {
+                int(p) for p in doc_positions.split(",")
+            }
+        # every candidate has the tokens of the phrases, so positions has one item per candidate
+        return {
+            doc_id
+            for doc_id, token_positions in positions.items()
+            if all(_has_phrase(token_positions, phrase) for phrase in phrases)
+        }, len(positions)
+
+    def search(self, query: str, limit: int = 20) -> list[SearchResult]:
+        """
+        Searches memos whose content matches the query.
+
+        Args:
+            query (str): Space separated terms. Quoted terms are matched as a phrase.
+            limit (int): Max number of results. Defaults to 20.
+
+        Returns:
+            list[SearchResult]: Matched memos in descending order of the score.
+        """
+        try:
+            terms = shlex.split(query)
+        except ValueError:
+            terms = query.split()
+        phrases = [tokenize(term) for term in terms]
+        phrases = [phrase for phrase in phrases if phrase]
+        if not phrases:
+            return []
+
+        conn = self.connection
+        n_docs, total_length = conn.execute(
+            "SELECT n_docs, total_length FROM stats"
+        ).fetchone()
+        if not n_docs:
+            return []
+        avg_length = total_length / n_docs
+
+        # (term index, token, idf)
+        query_tokens: list[tuple[int, str, float]] = []
+        # the document frequency of every term, the sum of its expansions for a prefix
+        term_dfs: list[int] = []
+        for i, phrase in enumerate(phrases):
+            for token in phrase:
+                is_prefix = i == len(phrases) - 1 and len(phrase) == 1
+                tokens = self._expand_prefix(token) if is_prefix else [token]
+                if not tokens:
+                    return []
+                term_dfs.append(0)
+                for expanded in tokens:
+                    df = conn.execute(
+                        "SELECT COUNT(*) FROM postings WHERE token = ?", (expanded,)
+                    ).fetchone()[0]
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    query_tokens.append((len(term_dfs) - 1, expanded, idf))
+                    term_dfs[-1] += df
+
+        # the candidates are the memos with every term, read from the postings of the rarest term,
+        # and only those with the most occurrences of it are scored
+        term_tokens = [
+            [token for term, token, _ in query_tokens if term == i]
+            for i in range(len(term_dfs))
+        ]
+        rarest = min(range(len(term_dfs)), key=term_dfs.__getitem__)
+        others = term_tokens[:rarest] + term_tokens[rarest + 1 :]
+        candidates = (
+            "SELECT p0.doc_id FROM postings p0 WHERE p0.token IN ({}){} {} LIMIT ?"
+        ).format(
+            ", ".join(["?"] * len(term_tokens[rarest])),
+            "".join(
+                " AND EXISTS (SELECT 1 FROM postings pt WHERE pt.token IN ({}) "
+                "AND pt.doc_id = p0.doc_id)".format(", ".join(["?"] * len(tokens)))
+                for tokens in others
+            ),
+            # a memo may have several expansions of a prefix
+            "ORDER BY p0.tf DESC"
+            if len(term_tokens[rarest]) == 1
+            else "GROUP BY p0.doc_id ORDER BY MAX(p0.tf) DESC",
+        )
+        term_parameters = (
+            *term_tokens[rarest],
+            *(token for tokens in others for token in tokens),
+        )
+        candidate_parameters = (*term_parameters, MAX_CANDIDATES)
+        phrase_matches: Optional[set[int]] = None
+        multi_token_phrases = [phrase for phrase in phrases if len(phrase) > 1]
+        if multi_token_phrases:
+            phrase_matches, n_candidates = self._phrase_matches(
+                candidates, candidate_parameters, multi_token_phrases
+            )
+            if n_candidates == MAX_CANDIDATES and len(phrase_matches) < limit:
+                # the phrases may be in memos past the cap, so every memo with the terms is checked
+                candidate_parameters = (*term_parameters, -1)
+                phrase_matches, _ = self._phrase_matches(
+                    candidates, candidate_parameters, multi_token_phrases
+                )
+            if not phrase_matches:
+                return []
+
+        rows = conn.execute(
+            "WITH q(term, token, idf) AS (VALUES {}), c(id) AS ({}) "
+            "SELECT d.id, d.title, d.path, SUM(q.idf * p.tf * ? / "
+            "(p.tf + ? * (1 - ? + ? * d.length / ?))) AS score "
+            "FROM c CROSS JOIN q "
+            "JOIN postings p ON p.token = q.token AND p.doc_id = c.id "
+            "JOIN docs d ON d.id = c.id "
+            "GROUP BY d.id HAVING COUNT(DISTINCT q.term) = ? "
+            "ORDER BY score DESC{}".format(
+                ", ".join(["(?, ?, ?)"] * len(query_tokens)),
+                candidates,
+                # the phrases are checked on the scored memos
+                "" if phrase_matches is not None else " LIMIT ?",
+            ),
+            (
+                *[value for query_token in query_tokens for value in query_token],
+                *candidate_parameters,
+                BM25_K1 + 1,
+                BM25_K1,
+                BM25_B,
+                BM25_B,
+                avg_length or 1,
+                len(term_dfs),
+                *(() if phrase_matches is not None else (limit,)),
+            ),
+        )
+        results = []
+        for doc_id, title, path, score in rows:
+            if phrase_matches is not None and doc_id not in phrase_matches:
+                continue
+            results.append(SearchResult(title, self._out_dir / path, score))
+            if len(results) == limit:
+                break
+        return results
@@ -0,0 +1,176 @@
+from abc import ABCMeta, abstractmethod
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from pmemo.catalog import CatalogEntry
+from pmemo.fileio import WriteTransaction
+from pmemo.search import SearchIndex
+
+
+class SaveReport(NamedTuple):
+    written: list[Path]
+    skipped: list[Path]
+    removed: list[Path]
+
+
+class StorageStats(NamedTuple):
+    memos: int
+    size: int
+    stored_size: int
+
+    @property
+    def saved(self) -> int:
+        return self.size - self.stored_size
+
+
+class GcReport(NamedTuple):
+    orphans: list[Path]
+    blobs: int
+    # the files in memo directories that pmemo did not write, which gc leaves alone
+    unknown: list[Path]
+
+
+class StorageBase(metaclass=ABCMeta):
+    """
+    Where memos and their codeblocks are kept. Memos are addressed by title.
+    """
+
+    @property
+    @abstractmethod
+    def out_dir(self) -> Path:
+        pass
+
+    @property
+    @abstractmethod
+    def search_index(self) -> SearchIndex:
+        pass
+
+    @abstractmethod
+    def memo_file(self, title: str) -> Path:
+        """
+        Returns the path a memo is stored at, or exported to when it is not kept as a file.
+        """
+        pass
+
+    @abstractmethod
+    def exists(self, title: str) -> bool:
+        pass
+
+    @abstractmethod
+    def is_unchanged(self, title: str, content: str) -> bool:
+        """
+        Returns True when the stored memo already has the given content.
+        """
+        pass
+
+    @abstractmethod
+    def load(self, title: str) -> str:
+        pass
+
+    def load_head(self, title: str, n: int, max_chars: Optional[int] = None) -> str:
+        """
+        Returns the first lines of a memo, e.g. for a preview.
+        Backends that can read part of a memo override this to avoid loading all of it.
+
+        Args:
+            title (str): The title of the memo.
+            n (int): The number of lines to return.
+            max_chars (Optional[int]): The number of characters to return at most. Defaults to None.
+
+        Returns:
+            str: The first lines of the memo.
+        """
+        head = "".join(self.load(title).splitlines(keepends=True)[:n])
+        return head if max_chars is None else head[:max_chars]
+
+    @abstractmethod
+    def save(
+        self, title: str, content: str, transaction: Optional[WriteTransaction] = None
+    ) -> SaveReport:
+        """
+        Stores a memo and its codeblocks. Unchanged parts are skipped.
+
+        Args:
+            title (str): The title of the memo.
+            content (str): The content of the memo.
+            transaction (Optional[WriteTransaction]): The transaction the writes are staged in.
+                When given, the caller commits it. Defaults to a transaction committed before returning.
+
+        Returns:
+            SaveReport: The files written, skipped and removed.
+        """
+        pass
+
+    @abstractmethod
+    def remove(self, title: str) -> None:
+        pass
+
+    @abstractmethod
+    def get(self, title: str) -> Optional[CatalogEntry]:
+        pass
+
+    @abstractmethod
+    def iter_entries(self, prefix: str = "") -> Iterator[CatalogEntry]:
+        """
+        Yields the stored memos in descending order based on modification time, as they are read,
+        so a selector can show the first ones before every memo is listed.
+        """
+        pass
+
+    def entries(self, prefix: str = "") -> list[CatalogEntry]:
+        """
+        Returns the stored memos sorted in descending order based on modification time.
+        """
+        return list(self.iter_entries(prefix))
+
+    @abstractmethod
+    def titles(self, prefix: str = "") -> list[str]:
+        """
+        Returns the titles of the stored memos in the order of entries, without reading the other columns.
+        """
+        pass
+
+    def paths(self, prefix: str = "") -> list[Path]:
+        """
+        Returns the memo files of the stored memos in the order of entries.
+        """
+        return [self.memo_file(title) for title in self.titles(prefix)]
+
+    @abstractmethod
+    def export_codeblock(self, title: str, blockname: str) -> Path:
+        """
+        Returns a real file holding the codeblock, e.g. to run it.
+        """
+        pass
+
+    @abstractmethod
+    def gc(self, dry_run: bool = False) -> GcReport:
+        """
+        Removes the codeblock files that are not produced by the current content of their memo,
+        and the stored codeblocks no memo refers to. Only the files pmemo wrote are removed.
+
+        Args:
+            dry_run (bool): When True, only reports what would be removed. Defaults to False.
+
+        Returns:
+            GcReport: The orphaned codeblock files, the number of unreferenced stored codeblocks
+                and the unknown files that were kept.
+        """
+        pass
+
+    @abstractmethod
+    def stats(self) -> StorageStats:
+        """
+        Returns the number of memos with their total size before and after compression.
+        """
+        pass
+
+    @abstractmethod
+    def reindex(self) -> int:
+        """
+        Rebuilds the listing and the search index from the stored memos.
+
+        Returns:
+            int: The number of memos.
+        """
+        pass
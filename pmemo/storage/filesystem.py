@@ -0,0 +1,286 @@
+import os
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from pmemo.blobstore import BlobStore
+from pmemo.catalog import CatalogEntry, MemoCatalog, content_hash
+from pmemo.codeblock import LANG_EXT, iter_codeblocks
+from pmemo.fileio import (
+    DEFAULT_ENCODING,
+    WriteTransaction,
+    encode_text,
+    holds_bytes,
+    read_text,
+    uncompressed_size,
+)
+from pmemo.layout import memo_dir
+from pmemo.search import SearchIndex
+from pmemo.storage.base import GcReport, SaveReport, StorageBase, StorageStats
+from pmemo.utils import read_head
+
+# the extensions of the codeblock files, see iter_codeblocks
+CODEBLOCK_SUFFIXES = frozenset(LANG_EXT.values())
+
+
+def _is_catalog_current(file_path: Path, mtime: float, size: int) -> bool:
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        return False
+    return stat.st_mtime == mtime and stat.st_size == size
+
+
+def _orphans(
+    file_path: Path,
+    blocknames: Iterable[str],
+    blobs: BlobStore,
+    recorded: Iterable[str] = (),
+) -> tuple[list[Path], list[Path]]:
+    """
+    Returns the files in the directory of the memo file_path that are neither the memo nor one of its codeblocks,
+    split into the codeblock files pmemo wrote and the unknown files, e.g. images put there by hand,
+    which are left alone. The codeblock files are those recorded by a previous save, linked to a blob,
+    or with a codeblock extension, which older versions wrote without recording them.
+    """
+    expected = {file_path.name, *blocknames}
+    recorded = set(recorded)
+    orphans: list[Path] = []
+    unknown: list[Path] = []
+    try:
+        with os.scandir(file_path.parent) as it:
+            for entry in it:
+                if entry.name in expected or not entry.is_file(follow_symlinks=False):
+                    continue
+                path = Path(entry.path)
+                # only files with other links are read to find their blob
+                if (
+                    entry.name in recorded
+                    or path.suffix in CODEBLOCK_SUFFIXES
+                    or (
+                        entry.stat(follow_symlinks=False).st_nlink > 1
+                        and blobs.blob_of(path) is not None
+                    )
+                ):
+                    orphans.append(path)
+                else:
+                    unknown.append(path)
+    except FileNotFoundError:
+        pass
+    return orphans, unknown
+
+
+class FileSystemStorage(StorageBase):
+    """
+    Stores every memo as a markdown file with its codeblocks next to it, in a directory per memo under out_dir.
+    Codeblock files are hard links into a content-addressed BlobStore, so they should be changed
+    through their memo rather than edited in place.
+    The catalog and the search index are kept current on save/remove.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        title_max_length: int = 30,
+        catalog: Optional[MemoCatalog] = None,
+        search_index: Optional[SearchIndex] = None,
+        compress_threshold: Optional[int] = None,
+        auto_gc: bool = False,
+    ) -> None:
+        """
+        Initializes a FileSystemStorage instance.
+
+        Args:
+            out_dir (Path): The output directory where memos are stored.
+            title_max_length (int): Max length of codeblock's title. Defaults to 30.
+            catalog (Optional[MemoCatalog]): The catalog of out_dir. Defaults to a new one.
+            search_index (Optional[SearchIndex]): The full-text index of out_dir. Defaults to a new one.
+            compress_threshold (Optional[int]): Memo files larger than this many bytes are gzip-compressed.
+                Defaults to None, which never compresses.
+            auto_gc (bool): When True, every save and remove also prunes the orphaned files of its memo
+                and the codeblocks it leaves unreferenced. Defaults to False.
+        """
+        self._out_dir = out_dir
+        self._title_max_length = title_max_length
+        self._compress_threshold = compress_threshold
+        self._auto_gc = auto_gc
+        self._blobs = BlobStore(out_dir)
+        self._catalog = (
+            catalog if catalog is not None else MemoCatalog(out_dir, title_max_length)
+        )
+        self._search_index = (
+            search_index if search_index is not None else SearchIndex(out_dir)
+        )
+
+    @property
+    def out_dir(self) -> Path:
+        return self._out_dir
+
+    @property
+    def catalog(self) -> MemoCatalog:
+        return self._catalog
+
+    @property
+    def search_index(self) -> SearchIndex:
+        return self._search_index
+
+    def memo_file(self, title: str) -> Path:
+        return memo_dir(self._out_dir, title) / "".join((title, LANG_EXT["markdown"]))
+
+    def exists(self, title: str) -> bool:
+        return self.memo_file(title).exists()
+
+    def is_unchanged(self, title: str, content: str) -> bool:
+        entry = self._catalog.get(title)
+        if (
+            entry is not None
+            and entry.sha256 == content_hash(content)
+            and _is_catalog_current(entry.path, entry.mtime, entry.size)
+        ):
+            return True
+        return holds_bytes(
+            self.memo_file(title), encode_text(content, self._compress_threshold)
+        )
+
+    def load(self, title: str) -> str:
+        return read_text(self.memo_file(title))
+
+    def load_head(self, title: str, n: int, max_chars: Optional[int] = None) -> str:
+        return "".join(read_head(self.memo_file(title), n, max_chars))
+
+    def save(
+        self, title: str, content: str, transaction: Optional[WriteTransaction] = None
+    ) -> SaveReport:
+        if transaction is None:
+            with WriteTransaction() as transaction:
+                return self.save(title, content, transaction)
+
+        report = SaveReport([], [], [])
+        entry = self._catalog.get(title)
+        file_path = self.memo_file(title)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        codeblocks = list(iter_codeblocks(content, self._title_max_length))
+        blocknames = [codeblock.blockname for codeblock in codeblocks]
+        # scanned before anything is staged, so the temporary files of this save are not orphans
+        orphans = (
+            _orphans(file_path, blocknames, self._blobs)[0] if self._auto_gc else []
+        )
+        released = []
+        if self.is_unchanged(title, content):
+            report.skipped.append(file_path)
+        else:
+            transaction.write_bytes(
+                file_path, encode_text(content, self._compress_threshold)
+            )
+            report.written.append(file_path)
+
+        for codeblock in codeblocks:
+            codeblock_path = file_path.parent / codeblock.blockname
+            blob_path = self._blobs.put(
+                codeblock.code.encode(DEFAULT_ENCODING), transaction
+            )
+            # a blob staged by this save is new, or replaces one that no longer holds its content
+            if blob_path not in transaction and self._blobs.is_linked(
+                codeblock_path, blob_path
+            ):
+                report.skipped.append(codeblock_path)
+            else:
+                if self._auto_gc:
+                    released.append(self._blobs.blob_of(codeblock_path))
+                transaction.link(codeblock_path, blob_path)
+                report.written.append(codeblock_path)
+
+        if entry is not None:
+            for stale_blockname in set(entry.codeblocks) - set(blocknames):
+                stale_path = file_path.parent / stale_blockname
+                if stale_path.is_file() and stale_path not in orphans:
+                    orphans.append(stale_path)
+        for orphan in orphans:
+            if self._auto_gc:
+                released.append(self._blobs.blob_of(orphan))
+            transaction.unlink(orphan)
+            report.removed.append(orphan)
+        if any(released):
+            transaction.on_commit(partial(self._blobs.collect, filter(None, released)))
+
+        if report.written or report.removed or entry is None:
+            transaction.on_commit(
+                partial(self._catalog.update, file_path, content, blocknames)
+            )
+            transaction.on_commit(
+                partial(self._search_index.update, file_path, content)
+            )
+        return report
+
+    def remove(self, title: str) -> None:
+        dir = self.memo_file(title).parent
+        released = []
+        for file in dir.iterdir():
+            if file.is_file():
+                if self._auto_gc:
+                    released.append(self._blobs.blob_of(file))
+                file.unlink()
+        dir.rmdir()
+        self._blobs.collect(filter(None, released))
+        self._catalog.remove(title)
+        self._search_index.remove(title)
+
+    def get(self, title: str) -> Optional[CatalogEntry]:
+        return self._catalog.get(title)
+
+    def iter_entries(self, prefix: str = "") -> Iterator[CatalogEntry]:
+        return self._catalog.iter_entries(prefix)
+
+    def titles(self, prefix: str = "") -> list[str]:
+        return self._catalog.titles(prefix)
+
+    def paths(self, prefix: str = "") -> list[Path]:
+        return self._catalog.paths(prefix)
+
+    def export_codeblock(self, title: str, blockname: str) -> Path:
+        return self.memo_file(title).parent / blockname
+
+    def gc(self, dry_run: bool = False) -> GcReport:
+        orphans = []
+        unknown = []
+        for entry in self._catalog.entries():
+            if not _is_catalog_current(entry.path, entry.mtime, entry.size):
+                if not entry.path.exists():
+                    continue
+                # changed outside of pmemo since it was cataloged
+                blocknames = [
+                    codeblock.blockname
+                    for codeblock in iter_codeblocks(
+                        read_text(entry.path), self._title_max_length
+                    )
+                ]
+            else:
+                blocknames = entry.codeblocks
+            memo_orphans, memo_unknown = _orphans(
+                entry.path, blocknames, self._blobs, entry.codeblocks
+            )
+            orphans.extend(memo_orphans)
+            unknown.extend(memo_unknown)
+
+        if dry_run:
+            released = Counter(orphan.stat().st_ino for orphan in orphans)
+            return GcReport(orphans, len(self._blobs.gc(True, released)), unknown)
+        for orphan in orphans:
+            orphan.unlink()
+        return GcReport(orphans, len(self._blobs.gc()), unknown)
+
+    def stats(self) -> StorageStats:
+        paths = self._catalog.paths()
+        return StorageStats(
+            len(paths),
+            sum(uncompressed_size(path) for path in paths),
+            sum(path.stat().st_size for path in paths),
+        )
+
+    def reindex(self) -> int:
+        count = self._catalog.reindex()
+        self._search_index.reindex(
+            (path, read_text(path)) for path in self._catalog.paths()
+        )
+        return count
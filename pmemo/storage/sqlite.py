@@ -0,0 +1,352 @@
+import json
+import shutil
+import sqlite3
+import time
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+from pmemo.catalog import CatalogEntry, content_hash
+from pmemo.codeblock import LANG_EXT, iter_codeblocks
+from pmemo.fileio import (
+    DEFAULT_ENCODING,
+    WriteTransaction,
+    atomic_write_text,
+    decode_text,
+    encode_text,
+    is_compressed,
+)
+from pmemo.search import SearchIndex
+from pmemo.storage.base import GcReport, SaveReport, StorageBase, StorageStats
+
+DB_FILE_NAME = "memos.sqlite3"
+EXPORT_DIR_NAME = ".export"
+
+
+def _load(content: Union[str, bytes]) -> str:
+    return content if isinstance(content, str) else decode_text(content)
+
+
+class SQLiteStorage(StorageBase):
+    """
+    Stores memos, codeblocks and the search index in a single SQLite database in WAL mode.
+    Codeblocks are exported to real files under out_dir/.export when they are needed as files.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        title_max_length: int = 30,
+        compress_threshold: Optional[int] = None,
+        auto_gc: bool = False,
+    ) -> None:
+        """
+        Initializes a SQLiteStorage instance. The database is opened lazily.
+
+        Args:
+            out_dir (Path): The directory the database is stored in.
+            title_max_length (int): Max length of codeblock's title. Defaults to 30.
+            compress_threshold (Optional[int]): Memos larger than this many bytes are stored gzip-compressed.
+                Defaults to None, which never compresses.
+            auto_gc (bool): When True, every save and remove also deletes the codeblocks it leaves unreferenced.
+                Defaults to False.
+        """
+        self._out_dir = out_dir
+        self._compress_threshold = compress_threshold
+        self._auto_gc = auto_gc
+        self._db_path = out_dir / DB_FILE_NAME
+        self._title_max_length = title_max_length
+        self._conn: Optional[sqlite3.Connection] = None
+        self._search_index = SearchIndex(out_dir, self._db_path, self._documents)
+
+    @property
+    def out_dir(self) -> Path:
+        return self._out_dir
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._out_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            # WAL keeps the database consistent without a sync on every commit
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS memos ("
+                    "title TEXT PRIMARY KEY, content TEXT NOT NULL, mtime REAL NOT NULL, "
+                    "size INTEGER NOT NULL, sha256 TEXT NOT NULL, codeblocks TEXT NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS memos_mtime ON memos (mtime DESC)"
+                )
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS codeblocks ("
+                    "title TEXT NOT NULL, blockname TEXT NOT NULL, sha256 TEXT NOT NULL, "
+                    "PRIMARY KEY (title, blockname)) WITHOUT ROWID"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS codeblocks_sha256 ON codeblocks (sha256)"
+                )
+                # codeblocks are stored once per content and shared between memos
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS blobs ("
+                    "sha256 TEXT PRIMARY KEY, code TEXT NOT NULL) WITHOUT ROWID"
+                )
+        return self._conn
+
+    def close(self) -> None:
+        self._search_index.close()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def search_index(self) -> SearchIndex:
+        # the schema of the shared database is created before the index touches it
+        self.connection
+        return self._search_index
+
+    def _documents(self) -> Iterator[tuple[Path, str]]:
+        rows = self.connection.execute("SELECT title, content FROM memos")
+        return ((self.memo_file(title), _load(content)) for title, content in rows)
+
+    def _dump(self, content: str) -> Union[str, bytes]:
+        # compressed memos are stored as BLOBs, the others stay readable TEXT
+        data = encode_text(content, self._compress_threshold)
+        return data if is_compressed(data) else content
+
+    def _to_entry(self, row: tuple) -> CatalogEntry:
+        title, mtime, size, sha256, codeblocks_json = row
+        return CatalogEntry(
+            title, self.memo_file(title), mtime, size, sha256, codeblocks_json
+        )
+
+    def memo_file(self, title: str) -> Path:
+        return (
+            self._out_dir
+            / EXPORT_DIR_NAME
+            / title
+            / "".join((title, LANG_EXT["markdown"]))
+        )
+
+    def exists(self, title: str) -> bool:
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM memos WHERE title = ?", (title,)
+            ).fetchone()
+            is not None
+        )
+
+    def is_unchanged(self, title: str, content: str) -> bool:
+        row = self.connection.execute(
+            "SELECT sha256 FROM memos WHERE title = ?", (title,)
+        ).fetchone()
+        return row is not None and row[0] == content_hash(content)
+
+    def load(self, title: str) -> str:
+        row = self.connection.execute(
+            "SELECT content FROM memos WHERE title = ?", (title,)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No memo titled {title}")
+        return _load(row[0])
+
+    def _release(self, conn: sqlite3.Connection, released: Iterable[str]) -> None:
+        conn.executemany(
+            "DELETE FROM blobs WHERE sha256 = ? "
+            "AND NOT EXISTS (SELECT 1 FROM codeblocks WHERE sha256 = ?)",
+            ((sha256, sha256) for sha256 in released),
+        )
+
+    def _write(
+        self,
+        title: str,
+        content: str,
+        codeblocks: dict[str, str],
+        stale: list[str],
+        released: list[str],
+    ) -> None:
+        with self.connection as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO memos VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    title,
+                    self._dump(content),
+                    time.time(),
+                    len(content.encode(DEFAULT_ENCODING)),
+                    content_hash(content),
+                    json.dumps(list(codeblocks)),
+                ),
+            )
+            conn.executemany(
+                "DELETE FROM codeblocks WHERE title = ? AND blockname = ?",
+                ((title, blockname) for blockname in stale),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO blobs VALUES (?, ?)",
+                ((content_hash(code), code) for code in codeblocks.values()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO codeblocks VALUES (?, ?, ?)",
+                (
+                    (title, blockname, content_hash(code))
+                    for blockname, code in codeblocks.items()
+                ),
+            )
+            self._release(conn, released)
+        self.search_index.update(self.memo_file(title), content)
+
+    def save(
+        self, title: str, content: str, transaction: Optional[WriteTransaction] = None
+    ) -> SaveReport:
+        report = SaveReport([], [], [])
+        file_path = self.memo_file(title)
+        stored = dict(
+            self.connection.execute(
+                "SELECT blockname, sha256 FROM codeblocks WHERE title = ?", (title,)
+            ).fetchall()
+        )
+        is_new = not self.exists(title)
+        if self.is_unchanged(title, content):
+            report.skipped.append(file_path)
+        else:
+            report.written.append(file_path)
+
+        codeblocks = {}
+        for codeblock in iter_codeblocks(content, self._title_max_length):
+            codeblock_path = file_path.parent / codeblock.blockname
+            if stored.get(codeblock.blockname) == content_hash(codeblock.code):
+                report.skipped.append(codeblock_path)
+            else:
+                report.written.append(codeblock_path)
+            codeblocks[codeblock.blockname] = codeblock.code
+        stale = [blockname for blockname in stored if blockname not in codeblocks]
+        report.removed.extend(file_path.parent / blockname for blockname in stale)
+        released = list(stored.values()) if self._auto_gc else []
+
+        if report.written or report.removed or is_new:
+            if transaction is None:
+                self._write(title, content, codeblocks, stale, released)
+            else:
+                transaction.on_commit(
+                    partial(self._write, title, content, codeblocks, stale, released)
+                )
+        return report
+
+    def remove(self, title: str) -> None:
+        with self.connection as conn:
+            released = [
+                sha256
+                for sha256, in conn.execute(
+                    "SELECT sha256 FROM codeblocks WHERE title = ?", (title,)
+                )
+            ]
+            conn.execute("DELETE FROM memos WHERE title = ?", (title,))
+            conn.execute("DELETE FROM codeblocks WHERE title = ?", (title,))
+            if self._auto_gc:
+                self._release(conn, released)
+        self.search_index.remove(title)
+        export_dir = self.memo_file(title).parent
+        if export_dir.exists():
+            shutil.rmtree(export_dir)
+
+    def get(self, title: str) -> Optional[CatalogEntry]:
+        row = self.connection.execute(
+            "SELECT title, mtime, size, sha256, codeblocks FROM memos WHERE title = ?",
+            (title,),
+        ).fetchone()
+        return self._to_entry(row) if row is not None else None
+
+    def iter_entries(self, prefix: str = "") -> Iterator[CatalogEntry]:
+        rows = self.connection.execute(
+            "SELECT title, mtime, size, sha256, codeblocks FROM memos "
+            "WHERE substr(title, 1, ?) = ? ORDER BY mtime DESC, rowid DESC",
+            (len(prefix), prefix),
+        )
+        return map(self._to_entry, rows)
+
+    def titles(self, prefix: str = "") -> list[str]:
+        return [
+            title
+            for title, in self.connection.execute(
+                "SELECT title FROM memos "
+                "WHERE substr(title, 1, ?) = ? ORDER BY mtime DESC, rowid DESC",
+                (len(prefix), prefix),
+            )
+        ]
+
+    def export_codeblock(self, title: str, blockname: str) -> Path:
+        row = self.connection.execute(
+            "SELECT code FROM codeblocks JOIN blobs USING (sha256) "
+            "WHERE title = ? AND blockname = ?",
+            (title, blockname),
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No codeblock {blockname} in {title}")
+        export_path = self.memo_file(title).parent / blockname
+        if not export_path.exists() or export_path.read_text() != row[0]:
+            export_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(export_path, row[0])
+        return export_path
+
+    def gc(self, dry_run: bool = False) -> GcReport:
+        # codeblock rows the memo does not list anymore, e.g. written by an older version
+        orphan_rows = set(
+            self.connection.execute(
+                "SELECT title, blockname FROM codeblocks "
+                "EXCEPT SELECT memos.title, json_each.value "
+                "FROM memos, json_each(memos.codeblocks)"
+            )
+        )
+        referenced = set()
+        live = set()
+        for title, blockname, sha256 in self.connection.execute(
+            "SELECT title, blockname, sha256 FROM codeblocks"
+        ):
+            if (title, blockname) not in orphan_rows:
+                referenced.add(sha256)
+                live.add((title, blockname))
+        unreferenced = [
+            sha256
+            for sha256, in self.connection.execute("SELECT sha256 FROM blobs")
+            if sha256 not in referenced
+        ]
+        # exported files are copies, so those of removed codeblocks are orphans too
+        orphans = sorted(
+            {
+                self.memo_file(title).parent / blockname
+                for title, blockname in orphan_rows
+            }
+            | {
+                export_path
+                for export_path in (self._out_dir / EXPORT_DIR_NAME).glob("*/*")
+                if (export_path.parent.name, export_path.name) not in live
+            }
+        )
+
+        if not dry_run:
+            with self.connection as conn:
+                conn.executemany(
+                    "DELETE FROM codeblocks WHERE title = ? AND blockname = ?",
+                    orphan_rows,
+                )
+                conn.executemany(
+                    "DELETE FROM blobs WHERE sha256 = ?",
+                    ((sha256,) for sha256 in unreferenced),
+                )
+            for orphan in orphans:
+                orphan.unlink(missing_ok=True)
+        # the export directories only hold files pmemo exported
+        return GcReport(orphans, len(unreferenced), [])
+
+    def stats(self) -> StorageStats:
+        return StorageStats(
+            *self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), "
+                "COALESCE(SUM(length(CAST(content AS BLOB))), 0) FROM memos"
+            ).fetchone()
+        )
+
+    def reindex(self) -> int:
+        return self.search_index.reindex(self._documents())
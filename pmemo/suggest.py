@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import count, islice
+from typing import Iterable, Iterator, Optional
+
+from prompt_toolkit.history import InMemoryHistory
+
+from pmemo.storage.base import StorageBase
+
+# lines added one by one are searched linearly until this many are merged into the sorted lines
+MAX_RECENT = 1024
+# sorts after every character, so prefix + MAX_CHAR bounds the lines starting with prefix
+MAX_CHAR = "\U0010ffff"
+# the lines of only this many of the most recently modified memos are suggested
+MAX_SUGGESTED_MEMOS = 500
+# and only the head of each memo is read, so a memo of many megabytes costs as much as a short one
+MAX_SUGGESTED_CHARS = 64 * 1024
+
+
+class _SortedLines:
+    """
+    Lines in sorted order with a max segment tree over their recency, so the most recent line
+    in a range of lines, e.g. all lines with a prefix, is found in O(log n).
+    """
+
+    def __init__(self, ranked: dict[str, int]) -> None:
+        self.lines = sorted(ranked)
+        self.ranks = array("q", map(ranked.__getitem__, self.lines))
+        n = len(self.lines)
+        # the tree holds the index of the most recent line of each node, the leaves start at n
+        tree = array("q", bytes(8 * n)) + array("q", range(n))
+        ranks = self.ranks
+        for node in range(n - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if ranks[left] >= ranks[right] else right
+        self._tree = tree
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __contains__(self, line: str) -> bool:
+        i = bisect_left(self.lines, line)
+        return i < len(self.lines) and self.lines[i] == line
+
+    def most_recent(self, prefix: str) -> Optional[int]:
+        """
+        Returns the index of the most recent line starting with prefix.
+        """
+        lines, ranks, tree = self.lines, self.ranks, self._tree
+        n = len(lines)
+        lo = bisect_left(lines, prefix) + n
+        hi = bisect_left(lines, prefix + MAX_CHAR, lo - n) + n
+        best = -1
+        while lo < hi:
+            if lo & 1:
+                if best < 0 or ranks[tree[lo]] > ranks[best]:
+                    best = tree[lo]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                if best < 0 or ranks[tree[hi]] > ranks[best]:
+                    best = tree[hi]
+            lo >>= 1
+            hi >>= 1
+        return best if best >= 0 else None
+
+
+class PrefixIndex:
+    """
+    Finds the most recently added line that starts with a prefix, in O(log n) for n lines.
+    Lines are kept sorted and searched with bisect. Lines added one by one are kept apart and searched
+    linearly until there are MAX_RECENT of them, which are then merged into the sorted lines,
+    so adding a line stays cheap too.
+    """
+
+    def __init__(self, lines: Iterable[str] = ()) -> None:
+        """
+        Initializes a PrefixIndex instance.
+
+        Args:
+            lines (Iterable[str]): The initial lines, oldest first.
+        """
+        self._ranks = count()
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._sorted = _SortedLines({})
+        self._recent: dict[str, int] = {}
+        self.extend(lines)
+
+    def __len__(self) -> int:
+        with self._lock:
+            sorted_lines, recent = self._sorted, list(self._recent)
+        return len(sorted_lines) + sum(line not in sorted_lines for line in recent)
+
+    def add(self, line: str) -> None:
+        """
+        Adds line as the most recent line.
+        """
+        with self._lock:
+            # re-adding a line moves it to the end
+            self._recent.pop(line, None)
+            self._recent[line] = next(self._ranks)
+            if len(self._recent) < MAX_RECENT:
+                return
+            recent = dict(self._recent)
+        # a merge that is already running, e.g. of extend, picks these lines up next time
+        if self._merge_lock.acquire(blocking=False):
+            try:
+                self._merge(recent)
+            finally:
+                self._merge_lock.release()
+
+    def extend(self, lines: Iterable[str]) -> None:
+        """
+        Adds lines, oldest first, as more recent than the lines added before.
+        This may take a while for many lines, and can run in a background thread while the index is searched.
+        """
+        lines = list(lines)
+        with self._lock:
+            ranked = dict(zip(lines, self._ranks))
+        with self._merge_lock:
+            self._merge(ranked)
+
+    def _merge(self, ranked: dict[str, int]) -> None:
+        if not ranked:
+            return
+        current = self._sorted
+        merged = dict(zip(current.lines, current.ranks))
+        # a line that is added again takes its newer rank
+        for line, rank in ranked.items():
+            if merged.get(line, -1) < rank:
+                merged[line] = rank
+        sorted_lines = _SortedLines(merged)
+        with self._lock:
+            self._sorted = sorted_lines
+            for line, rank in ranked.items():
+                if self._recent.get(line) == rank:
+                    del self._recent[line]
+
+    def find(self, prefix: str) -> Optional[str]:
+        """
+        Returns the most recent line that starts with prefix, if any.
+        """
+        with self._lock:
+            recent = list(self._recent.items())
+            sorted_lines = self._sorted
+        i = sorted_lines.most_recent(prefix)
+        # the lines added one by one are in the order of their ranks
+        for line, rank in reversed(recent):
+            if line.startswith(prefix):
+                if i is None or rank > sorted_lines.ranks[i]:
+                    return line
+                break
+        return sorted_lines.lines[i] if i is not None else None
+
+
+class IndexedHistory(InMemoryHistory):
+    """
+    History that also adds the strings it stores to a PrefixIndex, so suggestions do not copy the history.
+    """
+
+    def __init__(self, index: PrefixIndex) -> None:
+        super().__init__()
+        self.index = index
+
+    def store_string(self, string: str) -> None:
+        super().store_string(string)
+        self.index.add(string)
+
+
+def iter_memo_lines(storage: StorageBase) -> Iterator[str]:
+    """
+    Yields the non-blank lines of the MAX_SUGGESTED_MEMOS most recently modified memos, from the least recent one,
+    so the lines of newer memos are suggested first. Only the first MAX_SUGGESTED_CHARS characters of a memo are read.
+    """
+    titles = [
+        entry.title for entry in islice(storage.iter_entries(), MAX_SUGGESTED_MEMOS)
+    ]
+    for title in reversed(titles):
+        try:
+            content = storage.load_head(title, MAX_SUGGESTED_CHARS, MAX_SUGGESTED_CHARS)
+        except FileNotFoundError:
+            continue
+        lines = content.splitlines()
+        if len(content) >= MAX_SUGGESTED_CHARS:
+            # the last line may be cut off
+            lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line.rstrip()
@@ -1,7 +1,11 @@
 from functools import wraps
 from pathlib import Path
+from typing import Optional, Union
 
-from prompt_toolkit.shortcuts import confirm
+from pmemo.fileio import open_text
+
+# confirmations list at most this many names
+MAX_LISTED_NAMES = 10
 
 
 def error_handler(func):
@@ -15,6 +19,16 @@ def error_handler(func):
     return wrapper
 
 
+def confirm(message: str) -> bool:
+    """
+    Asks a yes/no question. prompt_toolkit is imported only when a question is asked,
+    so the commands that ask none start faster.
+    """
+    from prompt_toolkit.shortcuts import confirm as prompt_confirm
+
+    return prompt_confirm(message)
+
+
 def sort_by_mtime(dir: Path, pattern: str) -> list[Path]:
     """
     Sorts files in a directory by modification time.
@@ -29,23 +43,83 @@ def sort_by_mtime(dir: Path, pattern: str) -> list[Path]:
     return sorted(dir.glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
 
 
-def confirm_overwrite(file_path: Path) -> bool:
+def confirm_overwrite(file_path: Union[Path, str]) -> bool:
+    """
+    Asks whether to overwrite file_path. A path is only asked about when it exists.
+    """
+    if isinstance(file_path, str):
+        return confirm(f"{file_path}: Overwrite?")
     if file_path.exists():
         return confirm(f"{file_path.name}: Overwrite?")
     return True
 
 
-def confirm_remove(file_path: Path) -> bool:
+def confirm_remove(file_path: Union[Path, str]) -> bool:
+    """
+    Asks whether to remove file_path. A path is only asked about when it exists.
+    """
+    if isinstance(file_path, str):
+        return confirm(f"{file_path}: Remove?")
     if file_path.exists():
         return confirm(f"{file_path.name}: Remove?")
     return False
 
 
-def read_head(file_path: Path, n: int = 5) -> list[str]:
-    head = []
-    with file_path.open("r") as f:
-        for i, line in enumerate(f):
-            if i == n:
+def confirm_remove_many(names: list[str]) -> bool:
+    """
+    Asks once whether to remove all of names.
+    """
+    if len(names) == 1:
+        return confirm_remove(names[0])
+    listed = ", ".join(names[:MAX_LISTED_NAMES])
+    if len(names) > MAX_LISTED_NAMES:
+        listed = f"{listed} and {len(names) - MAX_LISTED_NAMES} more"
+    return confirm(f"{listed}: Remove {len(names)} items?")
+
+
+def confirm_restore(name: str) -> bool:
+    """
+    Asks whether to restore the unsaved draft of name.
+    """
+    return confirm(f"{name}: Restore the unsaved draft?")
+
+
+def format_size(size: int) -> str:
+    """
+    Formats a size in bytes with a binary unit, e.g. 1536 -> "1.5 KiB".
+    """
+    value = float(size)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024 or unit == "GiB":
+            break
+        value /= 1024
+    return f"{size} B" if unit == "B" else f"{value:.1f} {unit}"
+
+
+def read_head(
+    file_path: Path, n: int = 5, max_chars: Optional[int] = None
+) -> list[str]:
+    """
+    Reads the first lines of a file, which may be compressed, without reading the rest of it.
+
+    Args:
+        file_path (Path): The file to read.
+        n (int): The number of lines to read. Defaults to 5.
+        max_chars (Optional[int]): The number of characters to read at most, so a file with very long lines
+            is not read whole either. Defaults to None, which does not limit the line lengths.
+
+    Returns:
+        list[str]: The lines, with their line endings.
+    """
+    head: list[str] = []
+    with open_text(file_path) as f:
+        while len(head) < n:
+            line = f.readline(-1 if max_chars is None else max_chars)
+            if not line:
                 break
             head.append(line)
+            if max_chars is not None:
+                max_chars -= len(line)
+                if max_chars <= 0:
+                    break
     return head
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Callable, Iterable, Iterator
+
+from pmemo.highlight import OUTSIDE, LineState, state_after
+
+# texts longer than this are edited in the large memo mode
+LARGE_MEMO_CHARS = 1_000_000
+# the lines of a rope are kept in chunks of at most this many lines
+CHUNK_LINES = 1024
+# the number of lines around the cursor that the editor's buffer holds
+WINDOW_LINES = 2000
+# the window moves when the cursor comes this close to one of its ends
+WINDOW_MARGIN = 200
+
+
+class LineRope:
+    """
+    The lines of a large text in chunks of up to CHUNK_LINES lines, so replacing lines copies the chunks
+    they are in instead of the whole text.
+    Chunks are never changed in place, so a copy of the list of chunks is a cheap snapshot of the text.
+    """
+
+    def __init__(self, lines: Iterable[str] = ()) -> None:
+        self._chunks: list[list[str]] = []
+        self._starts: list[int] = []
+        self._len = 0
+        self._set_chunks(self._split(list(lines)))
+
+    @staticmethod
+    def _split(lines: list[str]) -> list[list[str]]:
+        return [lines[i : i + CHUNK_LINES] for i in range(0, len(lines), CHUNK_LINES)]
+
+    def _set_chunks(self, chunks: list[list[str]]) -> None:
+        self._chunks = chunks
+        self._starts = []
+        start = 0
+        for chunk in chunks:
+            self._starts.append(start)
+            start += len(chunk)
+        self._len = start
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _chunk_index(self, line: int) -> int:
+        return max(0, bisect_right(self._starts, line) - 1)
+
+    def iter_lines(self, start: int, end: int) -> Iterator[str]:
+        """
+        Yields the lines from start to end, excluding end.
+        """
+        i = self._chunk_index(start)
+        while i < len(self._chunks) and self._starts[i] < end:
+            chunk_start = self._starts[i]
+            yield from self._chunks[i][max(0, start - chunk_start) : end - chunk_start]
+            i += 1
+
+    def get(self, start: int, end: int) -> list[str]:
+        """
+        Returns the lines from start to end, excluding end.
+        """
+        return list(self.iter_lines(start, end))
+
+    def replace(self, start: int, end: int, lines: list[str]) -> None:
+        """
+        Replaces the lines from start to end, excluding end, with lines.
+        """
+        if not self._chunks:
+            self._set_chunks(self._split(lines))
+            return
+        first = self._chunk_index(start)
+        last = min(self._chunk_index(max(start, end - 1)), len(self._chunks) - 1)
+        head = self._chunks[first][: start - self._starts[first]]
+        tail = self._chunks[last][end - self._starts[last] :]
+        chunks = self._split(head + lines + tail)
+        self._set_chunks(self._chunks[:first] + chunks + self._chunks[last + 1 :])
+
+    def copy(self) -> LineRope:
+        """
+        Returns a rope with the same lines, sharing the chunks with this one.
+        """
+        rope = LineRope()
+        rope._set_chunks(list(self._chunks))
+        return rope
+
+    def snapshot(self) -> Callable[[], str]:
+        """
+        Returns a function that joins the lines as they are now, e.g. to save them in another thread.
+        """
+        chunks = list(self._chunks)
+        return lambda: "\n".join(line for chunk in chunks for line in chunk)
+
+
+class LineWindow:
+    """
+    The lines of a large memo around the cursor, which is all the editor's buffer holds in the large memo mode,
+    so an edit copies the window rather than the whole memo. The rest of the memo stays in a LineRope,
+    and the window moves with the cursor when it comes near one of its ends.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        window_lines: int = WINDOW_LINES,
+        margin: int = WINDOW_MARGIN,
+    ) -> None:
+        """
+        Initializes a LineWindow instance, with the window at the end of text.
+
+        Args:
+            text (str): The memo.
+            window_lines (int): The number of lines of the window. Defaults to 2000.
+            margin (int): How close to an end of the window the cursor moves it. Defaults to 200.
+        """
+        self._rope = LineRope(text.split("\n"))
+        self._window_lines = window_lines
+        self._margin = margin
+        self.start = max(0, len(self._rope) - window_lines)
+        self.end = len(self._rope)
+        # the lexer states at the start of lines the window started at, which stay valid
+        # as long as no line before them is edited
+        self._states: dict[int, LineState] = {0: OUTSIDE}
+
+    def __len__(self) -> int:
+        """
+        Returns the number of lines of the memo, as of the last move.
+        """
+        return len(self._rope)
+
+    def text(self) -> str:
+        """
+        Returns the text of the window.
+        """
+        return "\n".join(self._rope.get(self.start, self.end))
+
+    def _store(self, window_text: str) -> None:
+        lines = window_text.split("\n")
+        self._rope.replace(self.start, self.end, lines)
+        self.end = self.start + len(lines)
+        self._states = {
+            line: state for line, state in self._states.items() if line <= self.start
+        }
+
+    def needs_move(self, row: int, window_rows: int) -> bool:
+        """
+        Returns whether the window should move for a cursor on row of the window.
+        """
+        return (row < self._margin and self.start > 0) or (
+            row >= window_rows - self._margin and self.end < len(self._rope)
+        )
+
+    def move(self, window_text: str, line: int) -> str:
+        """
+        Stores the edited text of the window, and moves the window around line of the memo.
+
+        Args:
+            window_text (str): The text of the window, as edited.
+            line (int): The line of the memo the window is moved around, from 0.
+
+        Returns:
+            str: The text of the window after the move.
+        """
+        self._store(window_text)
+        line = max(0, min(line, len(self._rope) - 1))
+        self.start = max(
+            0, min(line - self._window_lines // 2, len(self._rope) - self._window_lines)
+        )
+        self.end = min(len(self._rope), self.start + self._window_lines)
+        return self.text()
+
+    def full_text(self, window_text: str) -> Callable[[], str]:
+        """
+        Returns a function that joins the memo with window_text in the window, without joining it right away,
+        so it can be called in another thread while the window is edited further.
+        """
+        rope = self._rope.copy()
+        rope.replace(self.start, self.end, window_text.split("\n"))
+        return rope.snapshot()
+
+    def start_state(self) -> LineState:
+        """
+        Returns the lexer state at the start of the window, lexing the lines from the last known state before it.
+        """
+        line = max(line for line in self._states if line <= self.start)
+        state = state_after(self._rope.iter_lines(line, self.start), self._states[line])
+        self._states[self.start] = state
+        return state
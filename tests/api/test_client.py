@@ -3,8 +3,10 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 import requests
+from cryptography.fernet import Fernet
 
 from pmemo.api.client import APIClient
+from pmemo.preferences import ApiPref
 
 
 @pytest.fixture
@@ -62,3 +64,12 @@ def test_get_memos_failed(api_client):
             headers={"Authorization": f"Bearer {api_client._tokens.token}"},
         )
         assert decrypted_contents == []
+
+
+def test_default_encryption_key():
+    encryption_key = ApiPref().encryption_key
+    assert encryption_key != ApiPref().encryption_key
+    assert Fernet(encryption_key).decrypt(Fernet(encryption_key).encrypt(b"memo")) == (
+        b"memo"
+    )
+    APIClient(MagicMock(), encryption_key)
@@ -0,0 +1,217 @@
+import os
+import stat
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from pmemo.blobstore import BLOB_MODE
+from pmemo.fileio import WriteTransaction, is_compressed
+from pmemo.memo import Memo
+from pmemo.storage.filesystem import FileSystemStorage
+
+CONTENT = "test\n```python:a\nprint('a')\n```\n```python:b\nprint('b')\n```\n"
+
+
+def test_save_and_load():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        storage = FileSystemStorage(out_dir)
+        assert not storage.exists("test")
+
+        report = storage.save("test", CONTENT)
+        memo_file = out_dir / "test" / "test.md"
+        assert storage.memo_file("test") == memo_file
+        assert set(report.written) == {
+            memo_file,
+            memo_file.parent / "a.py",
+            memo_file.parent / "b.py",
+        }
+        assert storage.exists("test")
+        assert storage.load("test") == CONTENT
+        assert storage.is_unchanged("test", CONTENT)
+        assert not storage.is_unchanged("test", CONTENT + "edit")
+        assert [entry.title for entry in storage.entries()] == ["test"]
+        assert storage.get("test").codeblocks == ["a.py", "b.py"]
+        assert [r.title for r in storage.search_index.search("print")] == ["test"]
+
+        report = storage.save("test", CONTENT)
+        assert report.written == report.removed == []
+        assert len(report.skipped) == 3
+
+
+def test_save_in_transaction():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = FileSystemStorage(Path(tmp_outdir))
+        with WriteTransaction() as transaction:
+            storage.save("test", CONTENT, transaction)
+            assert not storage.exists("test")
+            assert storage.get("test") is None
+        assert storage.exists("test")
+        assert storage.get("test") is not None
+
+
+def test_remove_stale_codeblocks_and_memo():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = FileSystemStorage(Path(tmp_outdir))
+        storage.save("test", CONTENT)
+        report = storage.save("test", "test\n```python:a\nprint('a')\n```\n")
+        stale = storage.memo_file("test").parent / "b.py"
+        assert report.removed == [stale]
+        assert not stale.exists()
+        assert storage.export_codeblock("test", "a.py").read_text() == "print('a')"
+
+        storage.remove("test")
+        assert not storage.exists("test")
+        assert storage.entries() == []
+        assert storage.search_index.search("print") == []
+
+
+def test_reindex():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        storage = FileSystemStorage(out_dir)
+        storage.save("test", CONTENT)
+        (out_dir / "external").mkdir()
+        (out_dir / "external" / "external.md").write_text("external\nprint")
+
+        assert storage.reindex() == 2
+        assert {r.title for r in storage.search_index.search("print")} == {
+            "test",
+            "external",
+        }
+
+
+def test_compression():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        storage = FileSystemStorage(out_dir, compress_threshold=100)
+        large = "large\n```python:a\nprint('a')\n```\n" + "log line\n" * 1000
+        storage.save("small", "small")
+        storage.save("large", large)
+
+        memo_file = storage.memo_file("large")
+        assert is_compressed(memo_file.read_bytes())
+        assert memo_file.stat().st_size < len(large)
+        assert (memo_file.parent / "a.py").read_text() == "print('a')"
+        assert storage.load("large") == large
+        assert storage.load_head("large", 2) == "large\n```python:a\n"
+        assert storage.load_head("large", 2, max_chars=3) == "lar"
+        assert Memo.from_file(memo_file).content == large
+        assert storage.save("large", large).written == []
+        assert [r.title for r in storage.search_index.search("log line")] == ["large"]
+
+        stats = storage.stats()
+        assert stats.memos == 2
+        assert stats.size == len(large) + len("small")
+        assert stats.stored_size == memo_file.stat().st_size + len("small")
+        assert stats.saved > 0
+
+        # reading does not depend on the threshold the memo was written with
+        assert FileSystemStorage(out_dir).load("large") == large
+        assert storage.reindex() == 2
+
+
+def test_codeblocks_are_deduplicated():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = FileSystemStorage(Path(tmp_outdir))
+        snippet = "```python:shared\nprint('shared')\n```\n"
+        storage.save("first", "first\n" + snippet)
+        storage.save("second", "second\n" + snippet)
+        first = storage.memo_file("first").parent / "shared.py"
+        second = storage.memo_file("second").parent / "shared.py"
+        assert first.samefile(second)
+        assert second.read_text() == "print('shared')"
+        assert storage.gc() == ([], 0, [])
+
+        storage.save("first", "first\n```python:shared\nprint('changed')\n```\n")
+        assert first.read_text() == "print('changed')"
+        assert second.read_text() == "print('shared')"
+        assert storage.gc() == ([], 0, [])
+
+        storage.remove("second")
+        assert storage.gc() == ([], 1, [])
+        assert first.read_text() == "print('changed')"
+
+
+def test_shared_codeblocks_are_read_only():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = FileSystemStorage(Path(tmp_outdir))
+        snippet = "```python:shared\nprint('shared')\n```\n"
+        storage.save("first", "first\n" + snippet)
+        storage.save("second", "second\n" + snippet)
+        first = storage.memo_file("first").parent / "shared.py"
+        assert stat.S_IMODE(first.stat().st_mode) == BLOB_MODE
+
+        # edited in place anyway, which changes the blob both memos link to
+        first.chmod(0o644)
+        first.write_text("print('edited')")
+        storage.save("second", "second\n" + snippet)
+        second = storage.memo_file("second").parent / "shared.py"
+        assert second.read_text() == "print('shared')"
+        assert stat.S_IMODE(second.stat().st_mode) == BLOB_MODE
+        assert not first.samefile(second)
+
+
+def test_gc_orphans():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = FileSystemStorage(Path(tmp_outdir))
+        storage.save("test", CONTENT)
+        memo_dir = storage.memo_file("test").parent
+        # a codeblock file linked to a blob that the memo does not refer to anymore
+        orphan = memo_dir / "renamed.py"
+        (memo_dir / "b.py").rename(orphan)
+        # written by an older version, which did not record or link the codeblock files
+        legacy = memo_dir / "old.py"
+        legacy.write_text("print('old')")
+        # put there by hand or by another tool
+        unknown = memo_dir / "notes.txt"
+        unknown.write_text("notes")
+
+        report = storage.gc(dry_run=True)
+        assert sorted(report.orphans) == [legacy, orphan]
+        assert report.blobs == 1
+        assert report.unknown == [unknown]
+        assert orphan.exists()
+
+        assert storage.gc() == report
+        assert not orphan.exists() and not legacy.exists()
+        assert sorted(p.name for p in memo_dir.iterdir()) == [
+            "a.py",
+            "notes.txt",
+            "test.md",
+        ]
+        assert storage.gc() == ([], 0, [unknown])
+
+
+def test_gc_memo_changed_outside():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = FileSystemStorage(Path(tmp_outdir))
+        storage.save("test", CONTENT)
+        memo_file = storage.memo_file("test")
+        memo_file.write_text("test\n```python:a\nprint('a')\n```\n")
+        assert storage.gc().orphans == [memo_file.parent / "b.py"]
+
+
+def test_auto_gc():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        storage = FileSystemStorage(out_dir, auto_gc=True)
+        storage.save("test", CONTENT)
+        memo_dir = storage.memo_file("test").parent
+        unknown = memo_dir / "image.png"
+        unknown.write_bytes(b"image")
+        # linked to a blob, e.g. by a save that was interrupted before the catalog was updated
+        orphan = memo_dir / "orphan.py"
+        os.link(memo_dir / "b.py", orphan)
+
+        report = storage.save("test", "test\n```python:a\nprint('A')\n```\n")
+        assert sorted(report.removed) == [memo_dir / "b.py", orphan]
+        assert sorted(p.name for p in memo_dir.iterdir()) == [
+            "a.py",
+            "image.png",
+            "test.md",
+        ]
+        assert len(list(storage._blobs)) == 1
+
+        storage.remove("test")
+        assert list(storage._blobs) == []
+        assert storage.gc() == ([], 0, [])
@@ -0,0 +1,208 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import pytest
+
+from pmemo.fileio import WriteTransaction, is_compressed
+from pmemo.memo import Memo
+from pmemo.storage.sqlite import DB_FILE_NAME, EXPORT_DIR_NAME, SQLiteStorage
+
+CONTENT = "test\n```python:a\nprint('a')\n```\n```python:b\nprint('b')\n```\n"
+
+
+def test_save_and_load():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        storage = SQLiteStorage(out_dir)
+        assert not storage.exists("test")
+        with pytest.raises(FileNotFoundError):
+            storage.load("test")
+
+        report = storage.save("test", CONTENT)
+        assert len(report.written) == 3
+        assert storage.exists("test")
+        assert storage.load("test") == CONTENT
+        assert storage.is_unchanged("test", CONTENT)
+        assert not storage.is_unchanged("test", CONTENT + "edit")
+        assert storage.get("test").codeblocks == ["a.py", "b.py"]
+        assert [r.title for r in storage.search_index.search("print")] == ["test"]
+        # nothing but the database is written
+        assert not (out_dir / "test").exists()
+        assert not (out_dir / EXPORT_DIR_NAME).exists()
+
+        report = storage.save("test", CONTENT)
+        assert report.written == report.removed == []
+        assert len(report.skipped) == 3
+
+        journal_mode = storage.connection.execute("PRAGMA journal_mode").fetchone()
+        assert journal_mode == ("wal",)
+        storage.close()
+
+        reopened = SQLiteStorage(out_dir)
+        assert (out_dir / DB_FILE_NAME).exists()
+        assert reopened.load("test") == CONTENT
+        assert [r.title for r in reopened.search_index.search("print")] == ["test"]
+        reopened.close()
+
+
+def test_save_in_transaction():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = SQLiteStorage(Path(tmp_outdir))
+        with WriteTransaction() as transaction:
+            storage.save("test", CONTENT, transaction)
+            assert not storage.exists("test")
+        assert storage.exists("test")
+
+        with pytest.raises(KeyboardInterrupt):
+            with WriteTransaction() as transaction:
+                storage.save("test", "rolled back", transaction)
+                raise KeyboardInterrupt
+        assert storage.load("test") == CONTENT
+        storage.close()
+
+
+def test_stale_codeblocks_and_remove():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = SQLiteStorage(Path(tmp_outdir))
+        storage.save("test", CONTENT)
+        report = storage.save("test", "test\n```python:a\nprint('A')\n```\n")
+        assert report.removed == [storage.memo_file("test").parent / "b.py"]
+        with pytest.raises(FileNotFoundError):
+            storage.export_codeblock("test", "b.py")
+
+        exported = storage.export_codeblock("test", "a.py")
+        assert exported.read_text() == "print('A')"
+        storage.save("test", "test\n```python:a\nprint('a')\n```\n")
+        assert storage.export_codeblock("test", "a.py").read_text() == "print('a')"
+
+        storage.remove("test")
+        assert not storage.exists("test")
+        assert storage.entries() == []
+        assert storage.search_index.search("print") == []
+        storage.close()
+
+
+def test_memo_on_sqlite():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        storage = SQLiteStorage(out_dir)
+        Memo(out_dir, CONTENT, storage=storage).save()
+
+        memo = Memo.load(storage, "test")
+        assert memo.content == CONTENT
+        with patch("pmemo.utils.confirm", return_value=False):
+            memo.edit_content("test\nedit")
+            assert memo.save().written == []
+            memo.remove()
+        assert storage.load("test") == CONTENT
+
+        with patch("pmemo.utils.confirm", return_value=True):
+            memo.save()
+            assert storage.load("test") == "test\nedit"
+            memo.remove()
+        assert not storage.exists("test")
+        storage.close()
+
+
+def test_entries_and_reindex():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = SQLiteStorage(Path(tmp_outdir))
+        for title in ["old", "new", "newer"]:
+            storage.save(title, title)
+
+        assert [e.title for e in storage.entries()] == ["newer", "new", "old"]
+        assert [e.title for e in storage.entries("new")] == ["newer", "new"]
+        assert storage.titles("new") == ["newer", "new"]
+        assert storage.paths() == [e.path for e in storage.entries()]
+        assert storage.reindex() == 3
+        assert [r.title for r in storage.search_index.search("old")] == ["old"]
+        storage.close()
+
+
+def test_compression():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        storage = SQLiteStorage(out_dir, compress_threshold=100)
+        large = "large\n" + "log line\n" * 1000
+        storage.save("small", "small")
+        storage.save("large", large)
+
+        stored = dict(
+            storage.connection.execute("SELECT title, content FROM memos").fetchall()
+        )
+        assert stored["small"] == "small"
+        assert is_compressed(stored["large"])
+        assert storage.load("large") == large
+        assert storage.load_head("large", 2) == "large\nlog line\n"
+        assert storage.load_head("large", 2, max_chars=3) == "lar"
+        assert storage.save("large", large).written == []
+        assert storage.reindex() == 2
+        assert [r.title for r in storage.search_index.search("log line")] == ["large"]
+
+        stats = storage.stats()
+        assert stats.memos == 2
+        assert stats.size == len(large) + len("small")
+        assert stats.stored_size == len(stored["large"]) + len("small")
+        assert stats.saved > 0
+        storage.close()
+
+
+def test_codeblocks_are_deduplicated():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = SQLiteStorage(Path(tmp_outdir))
+        snippet = "```python:shared\nprint('shared')\n```\n"
+        storage.save("first", "first\n" + snippet)
+        storage.save("second", "second\n" + snippet)
+        count_blobs = "SELECT COUNT(*) FROM blobs"
+        assert storage.connection.execute(count_blobs).fetchone() == (1,)
+        assert storage.gc() == ([], 0, [])
+
+        storage.save("first", "first\n```python:shared\nprint('changed')\n```\n")
+        assert storage.connection.execute(count_blobs).fetchone() == (2,)
+        assert storage.gc() == ([], 0, [])
+        storage.remove("second")
+        assert storage.gc() == ([], 1, [])
+        exported = storage.export_codeblock("first", "shared.py")
+        assert exported.read_text() == "print('changed')"
+        storage.close()
+
+
+def test_gc_orphans():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = SQLiteStorage(Path(tmp_outdir))
+        storage.save("test", CONTENT)
+        exported = storage.export_codeblock("test", "b.py")
+        with storage.connection as conn:
+            conn.execute(
+                "UPDATE memos SET codeblocks = ? WHERE title = ?", ('["a.py"]', "test")
+            )
+
+        report = storage.gc(dry_run=True)
+        assert report == ([exported], 1, [])
+        assert exported.exists()
+        assert storage.gc() == report
+        assert not exported.exists()
+        with pytest.raises(FileNotFoundError):
+            storage.export_codeblock("test", "b.py")
+        assert storage.export_codeblock("test", "a.py").exists()
+        assert storage.gc() == ([], 0, [])
+        storage.close()
+
+
+def test_auto_gc():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = SQLiteStorage(Path(tmp_outdir), auto_gc=True)
+        storage.save("test", CONTENT)
+        storage.save("other", "other\n```python:b\nprint('b')\n```\n")
+        storage.save("test", "test\n```python:a\nprint('A')\n```\n")
+        count_blobs = "SELECT COUNT(*) FROM blobs"
+        # print('b') is still used by the other memo
+        assert storage.connection.execute(count_blobs).fetchone() == (2,)
+
+        storage.export_codeblock("test", "a.py")
+        storage.remove("test")
+        storage.remove("other")
+        assert storage.connection.execute(count_blobs).fetchone() == (0,)
+        assert storage.gc() == ([], 0, [])
+        storage.close()
@@ -0,0 +1,64 @@
+import stat
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from pmemo.blobstore import BLOB_MODE, BLOBS_DIR_NAME, BlobStore
+from pmemo.fileio import WriteTransaction
+
+
+def test_put_and_link():
+    with TemporaryDirectory() as tmp_dir:
+        out_dir = Path(tmp_dir)
+        blobs = BlobStore(out_dir)
+        with WriteTransaction() as transaction:
+            blob_path = blobs.put(b"print('a')", transaction)
+            assert blobs.put(b"print('a')", transaction) == blob_path
+            assert len(transaction) == 1
+            transaction.link(out_dir / "a.py", blob_path)
+            transaction.link(out_dir / "b.py", blob_path)
+        assert blob_path.parent.parent == out_dir / BLOBS_DIR_NAME
+        assert (out_dir / "a.py").read_text() == "print('a')"
+        assert blobs.is_linked(out_dir / "a.py", blob_path)
+        assert blobs.is_linked(out_dir / "b.py", blob_path)
+        assert not blobs.is_linked(out_dir / "c.py", blob_path)
+        assert blob_path.stat().st_nlink == 3
+
+        with WriteTransaction() as transaction:
+            assert blobs.put(b"print('a')", transaction) == blob_path
+            assert len(transaction) == 0
+
+
+def test_put_rewrites_changed_blobs():
+    with TemporaryDirectory() as tmp_dir:
+        out_dir = Path(tmp_dir)
+        blobs = BlobStore(out_dir)
+        with WriteTransaction() as transaction:
+            blob_path = blobs.put(b"print('a')", transaction)
+        assert stat.S_IMODE(blob_path.stat().st_mode) == BLOB_MODE
+
+        blob_path.chmod(0o644)
+        blob_path.write_bytes(b"changed")
+        with WriteTransaction() as transaction:
+            assert blobs.put(b"print('a')", transaction) == blob_path
+            assert len(transaction) == 1
+        assert blob_path.read_bytes() == b"print('a')"
+        assert stat.S_IMODE(blob_path.stat().st_mode) == BLOB_MODE
+
+
+def test_gc():
+    with TemporaryDirectory() as tmp_dir:
+        out_dir = Path(tmp_dir)
+        blobs = BlobStore(out_dir)
+        with WriteTransaction() as transaction:
+            kept = blobs.put(b"kept", transaction)
+            orphan = blobs.put(b"orphan", transaction)
+            transaction.link(out_dir / "kept.py", kept)
+        assert sorted(blobs) == sorted([kept, orphan])
+
+        assert blobs.gc() == [orphan]
+        assert list(blobs) == [kept]
+        assert not orphan.parent.exists() or orphan.parent == kept.parent
+
+        (out_dir / "kept.py").unlink()
+        assert blobs.gc() == [kept]
+        assert list(blobs.root.iterdir()) == []
@@ -0,0 +1,97 @@
+import os
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from pmemo.candidates import Candidate, CandidateStream, scan_files
+
+
+def test_scan_files():
+    with TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        for i, name in enumerate(["old", "new"]):
+            file_path = tmp_dir / f"{name}.txt"
+            file_path.write_text(name)
+            os.utime(file_path, (i, i))
+        (tmp_dir / "other.md").write_text("other")
+
+        assert sorted(scan_files(tmp_dir, "*.txt")) == [
+            Candidate("new", tmp_dir / "new.txt", 1),
+            Candidate("old", tmp_dir / "old.txt", 0),
+        ]
+
+
+def test_stream_merges_candidates_most_recent_first():
+    stream = CandidateStream(
+        [
+            Candidate("b", Path("b"), 2),
+            Candidate("a", Path("a"), 1),
+            Candidate("c", Path("c"), 3),
+            Candidate("a", Path("duplicate"), 4),
+        ]
+    )
+    assert not stream.refresh()
+    assert list(stream) == []
+
+    updates = []
+    stream.start(lambda: updates.append(None))
+    assert stream.wait(timeout=5)
+    assert stream.done
+    assert stream.error is None
+    assert len(updates) == 5
+
+    assert stream.refresh()
+    assert stream.names() == ["c", "b", "a"]
+    assert dict(stream) == {"a": Path("a"), "b": Path("b"), "c": Path("c")}
+    assert stream.candidate("a") == Candidate("a", Path("a"), 1)
+    assert not stream.refresh()
+
+
+def test_stream_before_the_source_is_exhausted():
+    produced = threading.Event()
+    release = threading.Event()
+
+    def source():
+        yield Candidate("first", Path("first"), 1)
+        produced.set()
+        release.wait(timeout=5)
+        yield Candidate("second", Path("second"), 2)
+        yield Candidate("third", Path("third"), 0)
+
+    stream = CandidateStream(source())
+    stream.start()
+    assert produced.wait(timeout=5)
+    assert not stream.done
+    assert stream.refresh()
+    assert stream.names() == ["first"]
+
+    release.set()
+    assert stream.wait(timeout=5)
+    assert stream.refresh()
+    assert stream.names() == ["second", "first", "third"]
+
+
+def test_stream_error_and_close():
+    def failing():
+        yield Candidate("a", Path("a"), 1)
+        raise PermissionError("denied")
+
+    stream = CandidateStream(failing())
+    stream.start()
+    assert stream.wait(timeout=5)
+    assert isinstance(stream.error, PermissionError)
+    assert stream.refresh()
+    assert stream.names() == ["a"]
+
+    release = threading.Event()
+
+    def endless():
+        while True:
+            release.wait(timeout=5)
+            yield Candidate("a", Path("a"), 1)
+
+    stream = CandidateStream(endless())
+    stream.start()
+    stream.close()
+    release.set()
+    assert stream.wait(timeout=5)
@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import pytest
+
+from pmemo.catalog import CATALOG_FILE_NAME, MemoCatalog, content_hash
+from pmemo.memo import Memo
+from pmemo.storage.filesystem import FileSystemStorage
+
+
+def test_catalog_tracks_save_and_remove():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        catalog = MemoCatalog(out_dir)
+        content = "test\n```python:hello\nprint('hello')\n```\n"
+        memo = Memo(
+            out_dir, content, storage=FileSystemStorage(out_dir, catalog=catalog)
+        )
+        memo.save()
+
+        entry = catalog.get("test")
+        assert entry is not None
+        assert entry.path == memo.file_path
+        assert entry.size == len(content)
+        assert entry.sha256 == content_hash(content)
+        assert entry.codeblocks == ["hello.py"]
+        assert (out_dir / CATALOG_FILE_NAME).exists()
+
+        with patch("pmemo.utils.confirm", return_value=True):
+            memo.remove()
+        assert catalog.get("test") is None
+        assert len(catalog) == 0
+
+
+def test_catalog_entries_sorted_by_mtime():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        catalog = MemoCatalog(out_dir)
+        for i, title in enumerate(["old", "new", "newer"]):
+            memo = Memo(
+                out_dir, title, storage=FileSystemStorage(out_dir, catalog=catalog)
+            )
+            memo.save()
+            os.utime(memo.file_path, (i, i))
+            catalog.update(memo.file_path, memo.content, [])
+
+        assert [e.title for e in catalog.entries()] == ["newer", "new", "old"]
+        assert list(catalog.iter_entries()) == catalog.entries()
+        assert catalog.titles("new") == ["newer", "new"]
+        assert [p.stem for p in catalog.paths("new")] == ["newer", "new"]
+
+
+@pytest.mark.parametrize("n", [0, 1, 5])
+def test_catalog_reindex(n):
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        for i in range(n):
+            (out_dir / f"memo{i}").mkdir()
+            (out_dir / f"memo{i}" / f"memo{i}.md").write_text(f"memo{i}")
+
+        # built from the file system on first use
+        catalog = MemoCatalog(out_dir)
+        assert len(catalog) == n
+
+        (out_dir / "external").mkdir()
+        (out_dir / "external" / "external.md").write_text("external")
+        assert catalog.get("external") is None
+        assert catalog.reindex() == n + 1
+        assert catalog.get("external") is not None
@@ -1,3 +1,5 @@
+import os
+import threading
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest.mock import patch
@@ -8,7 +10,20 @@ from prompt_toolkit.input.defaults import create_pipe_input
 from prompt_toolkit.keys import Keys
 from prompt_toolkit.output import DummyOutput
 
-from pmemo.custom_select import custom_select
+from pmemo.candidates import Candidate, CandidateStream
+from pmemo.custom_select import (
+    ITEM_CLASS,
+    MARK,
+    MARKED_CLASS,
+    SELECTED_CLASS,
+    CustomFormattedTextControl,
+    _memo_choices,
+    custom_select,
+    custom_select_many,
+)
+from pmemo.highlight import highlight_markdown
+from pmemo.query_worker import QueryWorker
+from pmemo.storage.filesystem import FileSystemStorage
 
 
 def test_custom_select():
@@ -167,3 +182,228 @@ def test_custom_select_using_filter():
             ["a", "b", "c", "aa"], input=pipe_input, output=DummyOutput()
         )
         assert selected == ""
+
+
+def test_custom_select_paging():
+    choices = [f"memo{i}" for i in range(1000)]
+
+    def select(*keys: Keys) -> str:
+        with create_pipe_input() as pipe_input:
+            pipe_input.send_text(
+                "".join(REVERSE_ANSI_SEQUENCES[key] for key in (*keys, Keys.Enter))
+            )
+            return custom_select(choices, input=pipe_input, output=DummyOutput())
+
+    assert select(Keys.End) == "memo999"
+    assert select(Keys.End, Keys.Home) == "memo0"
+    assert select(Keys.PageUp) == "memo0"
+    paged = select(Keys.PageDown)
+    assert paged != "memo0"
+    assert select(Keys.PageDown, Keys.PageUp) == "memo0"
+    assert select(Keys.End, Keys.PageDown) == "memo999"
+    assert select(Keys.End, Keys.Down) == "memo0"
+
+
+def test_control_renders_visible_rows_only():
+    choices = [f"memo{i}" for i in range(1_000_000)]
+    control = CustomFormattedTextControl(lambda: choices)
+    assert control.preferred_height(80, 20, False, None) == 20
+
+    content = control.create_content(80, 20)
+    assert content.line_count == 20
+    assert (SELECTED_CLASS, "memo0") in content.get_line(0)
+    assert control.preferred_width(80) == len("memo19")
+
+    control.move_page_down()
+    control.move_page_down()
+    content = control.create_content(80, 20)
+    assert control.get_pointed_at() == "memo40"
+    assert (SELECTED_CLASS, "memo40") in content.get_line(content.cursor_position.y)
+    assert (ITEM_CLASS, "memo21") in content.get_line(0)
+
+    control.move_to_last()
+    content = control.create_content(80, 20)
+    assert content.line_count == 20
+    assert (SELECTED_CLASS, "memo999999") in content.get_line(19)
+
+    control.move_to_first()
+    content = control.create_content(80, 20)
+    assert (SELECTED_CLASS, "memo0") in content.get_line(0)
+
+
+def test_custom_select_caches_previews():
+    loaded = []
+
+    def preview(choice: str) -> str:
+        loaded.append(choice)
+        return choice.upper()
+
+    with create_pipe_input() as pipe_input:
+        pipe_input.send_text(
+            "".join(
+                REVERSE_ANSI_SEQUENCES[key]
+                for key in (Keys.Down, Keys.Up, Keys.Down, Keys.Up, Keys.Enter)
+            )
+        )
+        selected = custom_select(
+            ["a", "b", "c"], preview=preview, input=pipe_input, output=DummyOutput()
+        )
+    assert selected == "a"
+    assert loaded.count("a") == 1
+    assert set(loaded) <= {"a", "b", "c"}
+
+
+def test_custom_select_while_streaming():
+    release = threading.Event()
+    with create_pipe_input() as pipe_input, TemporaryDirectory() as tmp_dir:
+        first = Path(tmp_dir) / "first.txt"
+        first.write_text("first")
+
+        def source():
+            yield Candidate("first", first, 1)
+            # the choice is picked before the source is exhausted
+            pipe_input.send_text(REVERSE_ANSI_SEQUENCES[Keys.Enter])
+            release.wait(timeout=5)
+            yield Candidate("second", first, 2)
+
+        stream = CandidateStream(source())
+        selected = custom_select(stream, input=pipe_input, output=DummyOutput())
+        release.set()
+        assert selected == "first"
+        assert stream[selected] == first
+        assert stream.wait(timeout=5)
+        assert not stream.refresh()
+
+
+def test_custom_select_matches_large_lists_in_background():
+    choices = [f"memo{i}" for i in range(100)]
+    with create_pipe_input() as pipe_input, patch(
+        "pmemo.custom_select.MAX_SYNC_CHOICES", 10
+    ), patch("prompt_toolkit.widgets.TextArea.text", "memo42"):
+
+        def create_worker(compute, on_result):
+            def select_when_matched():
+                on_result()
+                pipe_input.send_text(REVERSE_ANSI_SEQUENCES[Keys.Enter])
+
+            return QueryWorker(compute, select_when_matched)
+
+        with patch("pmemo.custom_select.QueryWorker", create_worker):
+            selected = custom_select(choices, input=pipe_input, output=DummyOutput())
+    assert selected == "memo42"
+
+
+def test_custom_select_searches_contents_in_background():
+    threads = []
+
+    def search(query: str) -> list[str]:
+        threads.append(threading.current_thread())
+        return ["missing", "c", "a"]
+
+    with create_pipe_input() as pipe_input, patch(
+        "prompt_toolkit.widgets.TextArea.text", "query"
+    ):
+
+        def create_worker(compute, on_result):
+            def select_when_matched():
+                on_result()
+                pipe_input.send_text(REVERSE_ANSI_SEQUENCES[Keys.Enter])
+
+            return QueryWorker(compute, select_when_matched)
+
+        pipe_input.send_text(REVERSE_ANSI_SEQUENCES[Keys.ControlF])
+        with patch("pmemo.custom_select.QueryWorker", create_worker):
+            selected = custom_select(
+                ["a", "b", "c"], search=search, input=pipe_input, output=DummyOutput()
+            )
+    # the results that are not choices are dropped
+    assert selected == "c"
+    assert threads and threading.main_thread() not in threads
+
+
+def test_custom_select_many():
+    def select_many(*keys: Keys) -> list[str]:
+        with create_pipe_input() as pipe_input:
+            pipe_input.send_text(
+                "".join(REVERSE_ANSI_SEQUENCES[key] for key in (*keys, Keys.Enter))
+            )
+            return custom_select_many(
+                ["a", "b", "c"], input=pipe_input, output=DummyOutput()
+            )
+
+    assert select_many() == ["a"]
+    assert select_many(Keys.Down) == ["b"]
+    assert select_many(Keys.Tab, Keys.Down, Keys.Tab) == ["a", "c"]
+    assert select_many(Keys.End, Keys.Tab, Keys.Home, Keys.Tab) == ["c", "a"]
+    # tab unmarks a marked choice, and without marks the pointed choice is selected
+    assert select_many(Keys.Tab, Keys.Up, Keys.Tab) == ["b"]
+    assert select_many(Keys.ControlA) == ["a", "b", "c"]
+    assert select_many(Keys.Down, Keys.Tab, Keys.ControlA) == ["b", "a", "c"]
+    assert select_many(Keys.ControlA, Keys.ControlA) == ["a"]
+
+    with create_pipe_input() as pipe_input, patch(
+        "prompt_toolkit.widgets.TextArea.text", "z"
+    ):
+        pipe_input.send_text(REVERSE_ANSI_SEQUENCES[Keys.Enter])
+        assert (
+            custom_select_many(["a", "b"], input=pipe_input, output=DummyOutput()) == []
+        )
+
+
+def test_control_renders_marks():
+    choices = ["a", "b"]
+    control = CustomFormattedTextControl(lambda: choices, multiple=True)
+    control.toggle_mark()
+    assert control.marked == {"a": None}
+    assert control.pointed_at == 1
+    content = control.create_content(80, 2)
+    assert (MARKED_CLASS, MARK) in content.get_line(0)
+    assert (SELECTED_CLASS, "b") in content.get_line(1)
+    assert (MARKED_CLASS, MARK) not in content.get_line(1)
+    assert control.get_selection() == ["a"]
+
+
+def test_custom_select_highlights_previews():
+    shown = []
+
+    def preview(choice: str) -> str:
+        return f"# {choice}\n```python\nimport {choice}\n```\n"
+
+    with create_pipe_input() as pipe_input, patch(
+        "pmemo.custom_select.highlight_markdown",
+        side_effect=lambda text: shown.append(text) or highlight_markdown(text),
+    ):
+        pipe_input.send_text(REVERSE_ANSI_SEQUENCES[Keys.Enter])
+        selected = custom_select(
+            ["os"],
+            preview=preview,
+            highlight_style="github-dark",
+            input=pipe_input,
+            output=DummyOutput(),
+        )
+    assert selected == "os"
+    assert shown == [preview("os")]
+
+
+def test_select_memo_streams_the_memos():
+    with create_pipe_input() as pipe_input, TemporaryDirectory() as tmp_dir:
+        out_dir = Path(tmp_dir)
+        storage = FileSystemStorage(out_dir)
+        for i, title in enumerate(["old", "new"]):
+            storage.save(title, f"{title}\ncontent")
+            os.utime(storage.memo_file(title), (i, i))
+            storage.catalog.update(storage.memo_file(title), f"{title}\ncontent", [])
+        iter_entries = storage.iter_entries
+
+        def iter_entries_then_select():
+            yield from iter_entries()
+            pipe_input.send_text(REVERSE_ANSI_SEQUENCES[Keys.Enter])
+
+        # the memos are listed by the selector rather than before it opens
+        with patch.object(
+            storage, "iter_entries", iter_entries_then_select
+        ), patch.object(FileSystemStorage, "entries", side_effect=AssertionError):
+            selected = custom_select(
+                **_memo_choices(storage, None), input=pipe_input, output=DummyOutput()
+            )
+        assert selected == "new"
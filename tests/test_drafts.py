@@ -0,0 +1,52 @@
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from pmemo.drafts import DRAFTS_DIR_NAME, Autosave, DraftJournal, edit_draft_name
+from pmemo.layout import iter_memo_files
+
+
+def test_journal():
+    with TemporaryDirectory() as tmp_dir:
+        out_dir = Path(tmp_dir)
+        journal = DraftJournal(out_dir)
+        name = edit_draft_name("dir/title")
+        assert journal.load(name) is None
+        journal.save(name, "draft\n")
+        assert journal.load(name) == "draft\n"
+        assert journal.draft_file(name).parent == out_dir / DRAFTS_DIR_NAME
+        # drafts are not memos
+        assert list(iter_memo_files(out_dir)) == []
+        journal.discard(name)
+        assert journal.load(name) is None
+        journal.discard(name)
+
+
+def test_autosave_is_debounced():
+    with TemporaryDirectory() as tmp_dir:
+        journal = DraftJournal(Path(tmp_dir))
+        with patch.object(journal, "save", wraps=journal.save) as save:
+            autosave = Autosave(journal, "new", debounce=0.2)
+            for end in range(1, 5):
+                autosave.update("memo"[:end])
+            for _ in range(100):
+                if journal.load("new") is not None:
+                    break
+                time.sleep(0.05)
+            assert journal.load("new") == "memo"
+            save.assert_called_once_with("new", "memo")
+
+            autosave.update("memo!")
+            # flush saves right away and drops the pending save
+            autosave.flush("memo!!")
+            time.sleep(0.3)
+            assert save.call_count == 2
+            assert journal.load("new") == "memo!!"
+
+
+def test_autosave_saves_only_changes():
+    with TemporaryDirectory() as tmp_dir:
+        journal = DraftJournal(Path(tmp_dir))
+        Autosave(journal, "new", debounce=0).flush("unchanged")
+        assert journal.load("new") is None
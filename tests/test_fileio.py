@@ -0,0 +1,95 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from pmemo.fileio import (
+    TMP_SUFFIX,
+    WriteTransaction,
+    atomic_write_text,
+    decode_text,
+    encode_text,
+    is_compressed,
+    open_text,
+    read_text,
+    uncompressed_size,
+)
+
+
+def test_atomic_write_text():
+    with TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / "test.txt"
+        atomic_write_text(file_path, "first")
+        assert file_path.read_text() == "first"
+        atomic_write_text(file_path, "second")
+        assert file_path.read_text() == "second"
+        assert list(Path(tmp_dir).iterdir()) == [file_path]
+
+
+def test_transaction_commit():
+    with TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        stale = tmp_dir / "stale.txt"
+        stale.write_text("stale")
+        committed = []
+        with WriteTransaction() as transaction:
+            transaction.write_text(tmp_dir / "a.txt", "a")
+            transaction.write_text(tmp_dir / "b.txt", "b")
+            transaction.write_text(tmp_dir / "b.txt", "b2")
+            transaction.unlink(stale)
+            transaction.on_commit(lambda: committed.append(True))
+            assert len(transaction) == 3
+            # nothing is visible before commit
+            assert not (tmp_dir / "a.txt").exists()
+            assert stale.exists()
+            assert committed == []
+
+        assert (tmp_dir / "a.txt").read_text() == "a"
+        assert (tmp_dir / "b.txt").read_text() == "b2"
+        assert not stale.exists()
+        assert committed == [True]
+        assert not list(tmp_dir.glob(f"*{TMP_SUFFIX}"))
+
+
+@pytest.mark.parametrize("exception", [RuntimeError, KeyboardInterrupt])
+def test_transaction_rollback(exception):
+    with TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        file_path = tmp_dir / "a.txt"
+        file_path.write_text("original")
+        committed = []
+        with pytest.raises(exception):
+            with WriteTransaction() as transaction:
+                transaction.write_text(file_path, "partial")
+                transaction.on_commit(lambda: committed.append(True))
+                raise exception
+
+        assert file_path.read_text() == "original"
+        assert committed == []
+        assert list(tmp_dir.iterdir()) == [file_path]
+
+
+@pytest.mark.parametrize(
+    "text,threshold,compressed",
+    [
+        ("", None, False),
+        ("a" * 100, None, False),
+        ("a" * 100, 100, False),
+        ("a" * 101, 100, True),
+        ("日本語" * 100, 10, True),
+    ],
+)
+def test_encode_text(text, threshold, compressed):
+    data = encode_text(text, threshold)
+    assert is_compressed(data) == compressed
+    assert decode_text(data) == text
+    # unchanged text encodes to the same bytes
+    assert encode_text(text, threshold) == data
+
+    with TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / "test.md"
+        file_path.write_bytes(data)
+        assert read_text(file_path) == text
+        assert uncompressed_size(file_path) == len(text.encode())
+        with open_text(file_path) as f:
+            assert f.read() == text
@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+import pytest
+
+from pmemo.fuzzy import FuzzyMatcher, fuzzy_score
+
+
+@pytest.mark.parametrize(
+    "query,choice,matches",
+    [
+        ("abc", "abc", True),
+        ("abc", "a_b_c", True),
+        ("abc", "acb", False),
+        ("ABC", "abc", False),
+        ("abc", "ABC", True),
+        ("a.c", "a.c", True),
+        ("a.c", "abc", False),
+    ],
+)
+def test_fuzzy_score_matches(query, choice, matches):
+    assert (fuzzy_score(query, choice) is not None) == matches
+
+
+def test_fuzzy_score_bonuses():
+    # consecutive characters
+    assert fuzzy_score("memo", "memo_list") > fuzzy_score("memo", "m_e_m_o")
+    # start of words
+    assert fuzzy_score("ml", "memo_list") > fuzzy_score("ml", "email")
+    assert fuzzy_score("ml", "memoList") > fuzzy_score("ml", "memolist")
+    # start of the choice
+    assert fuzzy_score("memo", "memo_x") > fuzzy_score("memo", "x_memo")
+    # the best alignment is found, not the leftmost one
+    assert fuzzy_score("ab", "a_x_ab") == fuzzy_score("ab", "x_ab")
+
+
+def test_fuzzy_score_lowercasing_changes_the_length():
+    # "İ".lower() is two code points
+    assert fuzzy_score("trip", "İstanbul_trip") == fuzzy_score("trip", "istanbul_trip")
+    assert FuzzyMatcher(["İstanbul_trip", "notes"]).match("trip") == ["İstanbul_trip"]
+
+
+def test_match_ranked():
+    matcher = FuzzyMatcher(["m_e_m_o", "email", "memo", "notes", "memo_list"])
+    assert matcher.match("") == ["m_e_m_o", "email", "memo", "notes", "memo_list"]
+    assert matcher.match("memo") == ["memo", "memo_list", "m_e_m_o"]
+    assert matcher.match("ml") == ["memo_list", "email"]
+    assert matcher.match("zz") == []
+
+
+def test_match_recency_breaks_ties():
+    assert FuzzyMatcher(["new_memo", "old_memo"]).match("memo") == [
+        "new_memo",
+        "old_memo",
+    ]
+    assert FuzzyMatcher(["old_memo", "new_memo"]).match("memo") == [
+        "old_memo",
+        "new_memo",
+    ]
+
+
+def test_match_narrows_incrementally():
+    choices = [f"memo{i}" for i in range(100)] + ["other"]
+    matcher = FuzzyMatcher(choices)
+    assert len(matcher.match("m")) == 100
+
+    with patch("pmemo.fuzzy._subsequence_pattern", wraps=None) as pattern:
+        pattern.return_value.search.side_effect = lambda key: "me" in key
+        assert len(matcher.match("me")) == 100
+    searched = [call.args[0] for call in pattern.return_value.search.call_args_list]
+    assert "other" not in searched
+    assert len(searched) == 100
+
+    # results are cached, e.g. for backspace
+    with patch("pmemo.fuzzy._subsequence_pattern") as pattern:
+        assert matcher.match("m") == matcher.match("m")
+    pattern.assert_not_called()
+
+
+@pytest.mark.parametrize("n", [1_500, 20_000])
+def test_match_large(n):
+    choices = [f"note_{i}" for i in range(n)] + ["memo"]
+    matcher = FuzzyMatcher(choices)
+    assert matcher.match("n")[:2] == ["note_0", "note_1"]
+    assert matcher.match("memo") == ["memo"]
+    assert matcher.match("no")[0] == "note_0"
+    assert len(matcher.match("n")) == n
+    assert len(matcher.match("e")) == n + 1
@@ -0,0 +1,197 @@
+import random
+from unittest.mock import patch
+
+import pytest
+from prompt_toolkit.document import Document
+from prompt_toolkit.formatted_text.utils import fragment_list_to_text
+
+from pmemo.highlight import (
+    DEFAULT_LANG,
+    FENCE_CLASS,
+    OUTSIDE,
+    LineState,
+    MarkdownCodeLexer,
+    Segment,
+    _next_state,
+    highlight_markdown,
+    iter_segments,
+    match_fence,
+    state_after,
+)
+
+MEMO = "# title\ntext\n```python:a\nimport os\n```\n```\nprint(1)\n```\nend\n"
+
+
+def test_iter_segments():
+    assert list(iter_segments(MEMO)) == [
+        Segment(None, "# title\ntext\n"),
+        Segment(None, "```python:a\n", fence=True),
+        Segment("python", "import os\n"),
+        Segment(None, "```\n", fence=True),
+        Segment(None, "```\n", fence=True),
+        Segment(DEFAULT_LANG, "print(1)\n"),
+        Segment(None, "```\n", fence=True),
+        Segment(None, "end\n"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        MEMO,
+        "",
+        "no codeblocks",
+        # inline code is not a fence
+        "```inline```\ntext",
+        # a longer fence contains shorter ones
+        "````markdown\n```python\nx = 1\n```\n````\n",
+        # cut off inside a codeblock
+        "```bash\nls\nc",
+        "```unknown-lang\ncode\n```",
+    ],
+)
+def test_segments_and_fragments_keep_the_text(text):
+    assert "".join(segment.text for segment in iter_segments(text)) == text
+    assert fragment_list_to_text(highlight_markdown(text)) == text
+
+
+def test_nested_and_unterminated_codeblocks():
+    segments = list(iter_segments("````markdown\n```python\nx = 1\n```\n````\n"))
+    assert segments[1] == Segment("markdown", "```python\nx = 1\n```\n")
+
+    segments = list(iter_segments("text\n```bash\nls\n"))
+    assert segments[-1] == Segment("bash", "ls\n")
+
+
+def test_highlight_markdown():
+    fragments = highlight_markdown(MEMO)
+    assert (FENCE_CLASS, "```python:a\n") in fragments
+    assert ("class:pygments.keyword.namespace", "import") in fragments
+    assert ("class:pygments.name.builtin", "print") in fragments
+    assert any("heading" in style for style, _ in fragments)
+
+
+def lex_all(lexer: MarkdownCodeLexer, text: str) -> list:
+    get_line = lexer.lex_document(Document(text))
+    return [get_line(i) for i in range(len(text.split("\n")))]
+
+
+def test_code_lexer():
+    lines = lex_all(MarkdownCodeLexer(), MEMO)
+    assert [fragment_list_to_text(line) for line in lines] == MEMO.split("\n")
+    assert lines[2] == [(FENCE_CLASS, "```python:a")]
+    assert ("class:pygments.keyword.namespace", "import") in lines[3]
+    assert ("class:pygments.name.builtin", "print") in lines[6]
+    assert ("class:pygments.name.namespace", "os") not in lines[1]
+
+
+def test_code_lexer_multiline_tokens():
+    text = '```python\ns = """\nimport os\n"""\n```\nimport os'
+    lines = lex_all(MarkdownCodeLexer(), text)
+    assert all(
+        style.startswith("class:pygments.literal.string") for style, _ in lines[2]
+    )
+    assert ("class:pygments.keyword.namespace", "import") not in lines[5]
+
+
+@pytest.mark.parametrize("chunk_lines", [1, 3, 100])
+def test_code_lexer_is_incremental(chunk_lines):
+    rand = random.Random(chunk_lines)
+    pieces = ["```", "```python", "````", "text", '"""', "x = 1", "# title", ""]
+    lines = [rand.choice(pieces) for _ in range(40)]
+    with patch.object(MarkdownCodeLexer, "CHUNK_LINES", chunk_lines):
+        lexer = MarkdownCodeLexer()
+        for _ in range(300):
+            start = rand.randrange(len(lines) + 1)
+            end = min(len(lines), start + rand.choice([0, 0, 1, 1, 2, 5]))
+            lines[start:end] = rand.choices(pieces, k=rand.choice([0, 1, 1, 2, 4]))
+            text = "\n".join(lines)
+            # only some lines are shown after every edit
+            get_line = lexer.lex_document(Document(text))
+            for i in rand.sample(range(len(lines) + 1), min(5, len(lines) + 1)):
+                get_line(i)
+            assert lex_all(lexer, text) == lex_all(MarkdownCodeLexer(), text)
+
+
+def test_code_lexer_removes_the_last_lines_of_a_codeblock():
+    lexer = MarkdownCodeLexer()
+    lex_all(lexer, '```python\n"""doc\n"""doc')
+    text = '```python\n"""doc'
+    assert lex_all(lexer, text) == lex_all(MarkdownCodeLexer(), text)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_code_lexer_matches_a_fresh_lexer(seed):
+    rand = random.Random(seed)
+    pieces = [
+        "```",
+        "```python",
+        "````",
+        "x ```js",
+        "y = 2```",
+        '"""doc',
+        "'''",
+        "x = 1",
+    ]
+    lines: list[str] = []
+    lexer = MarkdownCodeLexer()
+    with patch.object(MarkdownCodeLexer, "CHUNK_LINES", rand.choice([1, 2, 3, 100])):
+        for _ in range(500):
+            # edits at the end of the text are as frequent as edits anywhere else
+            start = rand.choice(
+                [rand.randrange(len(lines) + 1), max(0, len(lines) - rand.randrange(3))]
+            )
+            end = min(len(lines), start + rand.choice([0, 1, 1, 2, 5]))
+            lines[start:end] = rand.choices(pieces, k=rand.choice([0, 0, 1, 2, 4]))
+            text = "\n".join(lines)
+            get_line = lexer.lex_document(Document(text))
+            for i in rand.sample(range(len(lines) + 1), min(3, len(lines) + 1)):
+                get_line(i)
+            assert lex_all(lexer, text) == lex_all(MarkdownCodeLexer(), text)
+
+
+def test_code_lexer_lexes_only_the_edit():
+    text = "\n".join(["text"] * 10_000 + ["```python", "x = 1"] * 5)
+    lexer = MarkdownCodeLexer()
+    lex_all(lexer, text)
+    edited = text.replace("text", "edited", 1)
+    with patch("pmemo.highlight._next_state", wraps=_next_state) as next_state:
+        get_line = lexer.lex_document(Document(edited))
+    assert next_state.call_count == 1
+    assert fragment_list_to_text(get_line(0)) == "edited"
+
+
+def test_code_lexer_start_state():
+    text = '"""\nimport os\n"""\n```\nimport os'
+    memo = "".join(("```python\n", "x = 1\n" * 150, text))
+    lexer = MarkdownCodeLexer()
+    # the text is a window into the codeblock of memo
+    lexer.start_at(state_after(memo.split("\n")[:151]))
+    # the chunks of the codeblock start elsewhere, which may split off empty fragments
+    assert [
+        [fragment for fragment in line if fragment[1]] for line in lex_all(lexer, text)
+    ] == [
+        [fragment for fragment in line if fragment[1]]
+        for line in lex_all(MarkdownCodeLexer(), memo)[151:]
+    ]
+    lexer.start_at(OUTSIDE)
+    assert lex_all(lexer, text) == lex_all(MarkdownCodeLexer(), text)
+
+
+def test_state_after():
+    rand = random.Random(0)
+    pieces = ["```", "```python", " ````", "text", "x = 1", "", "\t```js", "a```"]
+    for _ in range(200):
+        lines = rand.choices(pieces, k=rand.randrange(20))
+        state = rand.choice([OUTSIDE, LineState(3, "python", 7)])
+        expected = state
+        for line in lines:
+            expected = _next_state(expected, line)
+        assert state_after(lines, state) == expected
+
+
+def test_match_fence_within_lines():
+    assert match_fence(0, "x ```python:b\n") == (3, "python")
+    assert match_fence(3, "print(1)```\n") == (0, None)
+    assert match_fence(4, "print(1)```\n") is None
+    assert match_fence(0, "inline ```code``` only") is None
@@ -0,0 +1,72 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from prompt_toolkit.history import FileHistory
+
+from pmemo.history import (
+    HISTORY_FILE_NAME,
+    MAX_ENTRY_BYTES,
+    PersistentHistory,
+    parse_history,
+)
+from pmemo.suggest import PrefixIndex
+
+STRINGS = ["memo", "", "+plus # not a comment", "line\u2028separator", "# title"]
+# memo bodies, which are not written to the file
+MEMOS = ["multi\nline\n", "+plus\n# not a comment", "x" * (MAX_ENTRY_BYTES + 1)]
+
+
+def test_store_and_load():
+    with TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / "out" / HISTORY_FILE_NAME
+        history = PersistentHistory(file_path, PrefixIndex())
+        assert list(history.load_history_strings()) == []
+        for string in STRINGS + MEMOS:
+            history.store_string(string)
+        # memo bodies are suggested in this session only
+        assert history.index.find("mu") == "multi\nline\n"
+
+        index = PrefixIndex()
+        reloaded = PersistentHistory(file_path, index)
+        assert list(reloaded.load_history_strings()) == STRINGS[::-1]
+        assert index.find("m") == "memo"
+        assert index.find("+") == "+plus # not a comment"
+
+        # the file is compatible with prompt_toolkit's FileHistory
+        assert list(FileHistory(str(file_path)).load_history_strings()) == STRINGS[::-1]
+
+
+def test_parse_history():
+    assert parse_history("") == []
+    assert parse_history("\n# 2024\n+a\n+b\n\n# 2024\n+c\n") == ["a\nb", "c"]
+    # entries without a header, e.g. written by hand
+    assert parse_history("+a\n+b\n") == ["a\nb"]
+
+
+def test_compaction():
+    with TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / HISTORY_FILE_NAME
+        history = PersistentHistory(file_path, PrefixIndex(), max_bytes=1000)
+        for i in range(100):
+            history.store_string(f"entry {i:03d}")
+            assert file_path.stat().st_size <= 1000
+        strings = parse_history(file_path.read_text())
+        assert 10 < len(strings) < 100
+        assert strings == [f"entry {i:03d}" for i in range(100 - len(strings), 100)]
+        # the suggestions of this session keep the compacted entries
+        assert history.index.find("entry 000") == "entry 000"
+
+
+def test_compaction_keeps_large_entries():
+    with TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / HISTORY_FILE_NAME
+        history = PersistentHistory(file_path, PrefixIndex(), max_bytes=1000)
+        for i in range(5):
+            history.store_string(f"entry {i}")
+        history.store_string("x" * 900)
+        assert parse_history(file_path.read_text()) == [f"entry {i}" for i in range(5)]
+
+        file_path.unlink()
+        history.store_string("x" * 900)
+        history.store_string("y" * 900)
+        assert parse_history(file_path.read_text()) == ["y" * 900]
@@ -0,0 +1,115 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import pytest
+
+from pmemo.catalog import MemoCatalog
+from pmemo.layout import (
+    SHARDS_DIR_NAME,
+    LayoutState,
+    MemoLayout,
+    iter_memo_files,
+    memo_dir,
+    migrate_layout,
+    read_layout_state,
+    shard_of,
+    write_layout_state,
+)
+from pmemo.memo import Memo
+from pmemo.storage.filesystem import FileSystemStorage
+
+
+def test_default_layout_is_flat():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        assert read_layout_state(out_dir) == LayoutState()
+        assert memo_dir(out_dir, "test") == out_dir / "test"
+
+
+def test_sharded_memo():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        write_layout_state(out_dir, LayoutState(layout=MemoLayout.sharded))
+        memo = Memo(out_dir, "test\n```python:a\npass\n```\n")
+        memo.save()
+        expected_dir = out_dir / SHARDS_DIR_NAME / shard_of("test") / "test"
+        assert memo.file_path == expected_dir / "test.md"
+        assert (expected_dir / "a.py").exists()
+        assert list(iter_memo_files(out_dir)) == [memo.file_path]
+
+        loaded = Memo.from_file(memo.file_path)
+        assert loaded.file_path == memo.file_path
+        assert loaded.content == memo.content
+
+
+@pytest.mark.parametrize("n", [0, 1, 10])
+def test_migrate_layout(n):
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        catalog = MemoCatalog(out_dir)
+        for i in range(n):
+            Memo(
+                out_dir, f"memo{i}", storage=FileSystemStorage(out_dir, catalog=catalog)
+            ).save()
+
+        moved = migrate_layout(out_dir, MemoLayout.sharded, catalog.relocate)
+        assert moved == n
+        assert read_layout_state(out_dir).layout == MemoLayout.sharded
+        assert not list(out_dir.glob("memo*"))
+        assert all(p.exists() for p in catalog.paths())
+        assert sorted(p.stem for p in iter_memo_files(out_dir)) == sorted(
+            f"memo{i}" for i in range(n)
+        )
+        assert migrate_layout(out_dir, MemoLayout.sharded) == 0
+
+        assert migrate_layout(out_dir, MemoLayout.flat, catalog.relocate) == n
+        assert not (out_dir / SHARDS_DIR_NAME).exists()
+        assert all(p.parent.parent == out_dir for p in catalog.paths())
+
+
+def test_migrate_layout_resumes():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        catalog = MemoCatalog(out_dir)
+        for i in range(5):
+            Memo(
+                out_dir, f"memo{i}", storage=FileSystemStorage(out_dir, catalog=catalog)
+            ).save()
+
+        def interrupt(title, file_path):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            migrate_layout(out_dir, MemoLayout.sharded, interrupt)
+        state = read_layout_state(out_dir)
+        assert state.migrating_to == MemoLayout.sharded
+        # memos are readable in the middle of a migration
+        assert all(memo_dir(out_dir, f"memo{i}").exists() for i in range(5))
+        assert len(list(iter_memo_files(out_dir))) == 5
+
+        with pytest.raises(ValueError):
+            migrate_layout(out_dir, MemoLayout.flat)
+
+        assert migrate_layout(out_dir, MemoLayout.sharded, catalog.relocate) == 4
+        assert read_layout_state(out_dir) == LayoutState(layout=MemoLayout.sharded)
+        assert all(p.exists() for p in catalog.paths())
+
+
+def test_migrate_layout_with_markdown_codeblocks():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        storage = FileSystemStorage(out_dir)
+        storage.save("readme", "readme\n```markdown:doc\n# doc\n```\n")
+        memo_file = storage.memo_file("readme")
+        # the codeblock is saved next to the memo, as another *.md file
+        assert (memo_file.parent / "doc.md").exists()
+        assert list(iter_memo_files(out_dir)) == [memo_file]
+
+        assert (
+            migrate_layout(out_dir, MemoLayout.sharded, storage.catalog.relocate) == 1
+        )
+        assert storage.exists("readme")
+        assert (storage.memo_file("readme").parent / "doc.md").exists()
+        assert not (out_dir / SHARDS_DIR_NAME / shard_of("doc")).exists()
+        assert storage.reindex() == 1
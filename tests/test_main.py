@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import time
+
+# the packages that only some commands need, and which pmemo.main must not import itself
+LAZY_PACKAGES = (
+    "openai",
+    "requests",
+    "cryptography",
+    "rich",
+    "logzero",
+    "prompt_toolkit",
+    "pygments",
+)
+# importing pmemo.main may take at most this many times as long as starting the interpreter,
+# i.e. about 100 ms where python starts in 20 ms
+IMPORT_BUDGET = 5
+N_RUNS = 5
+
+
+def startup_time(code: str) -> float:
+    times = []
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def test_main_imports_only_what_commands_share():
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, pmemo.main; print(' '.join(sorted(sys.modules)))",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    imported = {name.split(".")[0] for name in completed.stdout.split()}
+    assert imported.isdisjoint(LAZY_PACKAGES)
+
+
+def test_main_import_time():
+    interpreter = startup_time("pass")
+    assert startup_time("import pmemo.main") - interpreter < IMPORT_BUDGET * interpreter
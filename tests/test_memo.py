@@ -1,10 +1,11 @@
+import hashlib
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 import pytest
 
-from pmemo.memo import LANG_EXT, Memo, extract_codeblocks
+from pmemo.memo import LANG_EXT, Memo, extract_codeblocks, iter_codeblocks
 
 
 @pytest.mark.parametrize(
@@ -87,6 +88,76 @@ def test_extract_multi_codeblock(lang_blockname, code):
         assert extracted_code == code.strip()
 
 
+def test_iter_codeblocks_line_offsets():
+    content = "title\n```python:a\nprint(1)\n```\ntext\n```go\nfmt.Println(2)\n```\n"
+    codeblocks = list(iter_codeblocks(content))
+    assert [(c.blockname, c.start_line, c.end_line) for c in codeblocks] == [
+        ("a.py", 1, 3),
+        (codeblocks[1].blockname, 5, 7),
+    ]
+    assert codeblocks[1].lang == "go"
+    assert codeblocks[1].code == "fmt.Println(2)"
+
+
+def test_iter_codeblocks_nested_fence():
+    content = "````markdown:doc\n```python\nprint(1)\n```\n````\n"
+    (codeblock,) = iter_codeblocks(content)
+    assert codeblock.blockname == "doc.md"
+    assert codeblock.code == "```python\nprint(1)\n```"
+
+
+@pytest.mark.parametrize(
+    "content,expect",
+    [
+        # the closing fence ends the last code line
+        ("```python:a\nprint(1)```", [("a.py", "print(1)", 0, 1)]),
+        (
+            "```python:a\nx = 1\nprint(1)```  \ntext\n",
+            [("a.py", "x = 1\nprint(1)", 0, 2)],
+        ),
+        # the opening fence follows text
+        ("x ```python:b\nprint(2)\n```\n", [("b.py", "print(2)", 0, 2)]),
+        ("see ```python:b\nprint(2)```", [("b.py", "print(2)", 0, 1)]),
+    ],
+)
+def test_iter_codeblocks_fences_within_lines(content, expect):
+    assert [
+        (c.blockname, c.code, c.start_line, c.end_line)
+        for c in iter_codeblocks(content)
+    ] == expect
+
+
+def test_iter_codeblocks_names_unnamed_blocks_as_before():
+    # unnamed blocks are named by the hash of their code, as the regex that used to find codeblocks did
+    (codeblock,) = iter_codeblocks("```python\nprint(1)```")
+    assert codeblock.blockname == "".join(
+        (hashlib.sha256(b"print(1)").hexdigest()[:30], ".py")
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "```python\nprint(1)\n",
+        "```python\nprint(1)\n````python\n",
+        "inline ```code``` only\n",
+        "```" * 1000,
+    ],
+)
+def test_iter_codeblocks_unterminated(content):
+    assert list(iter_codeblocks(content)) == []
+
+
+def test_iter_codeblocks_from_file():
+    with TemporaryDirectory() as tmp_dir:
+        memo_file = Path(tmp_dir) / "memo.md"
+        memo_file.write_text("title\n```python:a\nprint(1)\n```\n")
+        with memo_file.open() as f:
+            (codeblock,) = iter_codeblocks(f)
+        assert codeblock.blockname == "a.py"
+        assert codeblock.code == "print(1)"
+
+
 @pytest.mark.parametrize(
     "content",
     ["", "test", "test\nnewline", "# has space", "tooooooooooooo loooooooooooooong"],
@@ -184,3 +255,43 @@ def test_memo_nosave(content):
             assert memo.file_path.exists()
             assert memo.file_path.read_text() == content
             assert memo.file_path.read_text() != edited_content
+
+
+def test_memo_save_skips_unchanged_files():
+    with TemporaryDirectory() as tmp_outdir:
+        content = "test\n```python:a\nprint('a')\n```\n```python:b\nprint('b')\n```\n"
+        memo = Memo(Path(tmp_outdir), content)
+        report = memo.save()
+        memo_dir = memo.file_path.parent
+        assert set(report.written) == {
+            memo.file_path,
+            memo_dir / "a.py",
+            memo_dir / "b.py",
+        }
+        assert report.skipped == report.removed == []
+
+        report = memo.save()
+        assert report.written == report.removed == []
+        assert len(report.skipped) == 3
+
+        with patch("pmemo.utils.confirm", return_value=True):
+            memo.edit_content(content.replace("print('b')", "print('B')"))
+            report = memo.save()
+        assert set(report.written) == {memo.file_path, memo_dir / "b.py"}
+        assert report.skipped == [memo_dir / "a.py"]
+        assert (memo_dir / "b.py").read_text() == "print('B')"
+
+
+def test_memo_save_removes_stale_codeblocks():
+    with TemporaryDirectory() as tmp_outdir:
+        memo = Memo(Path(tmp_outdir), "test\n```python:old\npass\n```\n")
+        memo.save()
+        memo_dir = memo.file_path.parent
+        assert (memo_dir / "old.py").exists()
+
+        with patch("pmemo.utils.confirm", return_value=True):
+            memo.edit_content("test\n```python:new\npass\n```\n")
+            report = memo.save()
+        assert report.written == [memo.file_path, memo_dir / "new.py"]
+        assert report.removed == [memo_dir / "old.py"]
+        assert not (memo_dir / "old.py").exists()
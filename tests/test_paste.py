@@ -0,0 +1,55 @@
+import random
+
+import pytest
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.document import Document
+from prompt_toolkit.input.defaults import create_pipe_input
+from prompt_toolkit.input.vt100_parser import Vt100Parser
+from prompt_toolkit.key_binding.key_processor import KeyPress
+from prompt_toolkit.keys import Keys
+from prompt_toolkit.selection import SelectionState
+
+from pmemo.paste import PASTE_END, PasteParser, paste_text, use_paste_parser
+
+PASTE_START = "\x1b[200~"
+
+
+def parse(parser_class, chunks: list[str]) -> list:
+    keys: list[KeyPress] = []
+    parser = parser_class(keys.append)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.flush()
+    return [(key.key, key.data) for key in keys]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 6, 7, 1024])
+def test_paste_parser(chunk_size):
+    pasted = "".join(random.Random(0).choices("ab(\n\r\x1b[201", k=3000))
+    data = f"x{PASTE_START}{pasted}{PASTE_END}y{PASTE_START}{PASTE_END}z"
+    chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+    keys = parse(PasteParser, chunks)
+    assert keys == parse(Vt100Parser, chunks)
+    assert (Keys.BracketedPaste, pasted.split(PASTE_END)[0]) in keys
+
+
+def test_use_paste_parser():
+    with create_pipe_input() as pipe_input:
+        callback = pipe_input.vt100_parser.feed_key_callback
+        use_paste_parser(pipe_input)
+        parser = pipe_input.vt100_parser
+        assert isinstance(parser, PasteParser)
+        assert parser.feed_key_callback is callback
+        use_paste_parser(pipe_input)
+        assert pipe_input.vt100_parser is parser
+
+
+def test_paste_text():
+    buffer = Buffer(document=Document("memo", 2))
+    paste_text(buffer, "a\r\nb\rc(")
+    assert buffer.text == "mea\nb\nc(mo"
+
+    buffer = Buffer(document=Document("memo", 1))
+    buffer.selection_state = SelectionState(3)
+    paste_text(buffer, "x")
+    assert buffer.text == "mxo"
@@ -1,4 +1,8 @@
-from unittest.mock import Mock
+import threading
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock, patch
 
 import pytest
 from prompt_toolkit.input.ansi_escape_sequences import REVERSE_ANSI_SEQUENCES
@@ -6,11 +10,14 @@ from prompt_toolkit.input.defaults import create_pipe_input
 from prompt_toolkit.keys import Keys
 from prompt_toolkit.output import DummyOutput
 
+from pmemo.drafts import DraftJournal
+from pmemo.history import HISTORY_FILE_NAME
 from pmemo.pmemo_editor import (
     AutoSuggestFromHistoryForMultiline,
     PmemoEditor,
     Suggestion,
 )
+from pmemo.suggest import IndexedHistory, PrefixIndex
 
 
 @pytest.mark.parametrize(
@@ -125,3 +132,244 @@ def test_completion():
             )
             content = editor.text("Test", input=pipe_input, output=DummyOutput())
             assert content == "".join((bracket_start, bracket_end))
+
+
+def test_autosuggest_from_index():
+    auto_suggest = AutoSuggestFromHistoryForMultiline(
+        PrefixIndex(["import os", "print(1)"])
+    )
+    buffer_mock = Mock()
+    buffer_mock.history.get_strings = lambda: ["imported"]
+    document_mock = Mock()
+    document_mock.text = "memo\nimport"
+    assert auto_suggest.get_suggestion(buffer_mock, document_mock).text == "ed"
+    document_mock.text = "memo\npr"
+    assert auto_suggest.get_suggestion(buffer_mock, document_mock).text == "int(1)"
+
+    # an indexed history adds its strings itself
+    history = IndexedHistory(auto_suggest.index)
+    history.get_strings = Mock(side_effect=AssertionError)
+    buffer_mock.history = history
+    history.store_string("print(2)")
+    assert auto_suggest.get_suggestion(buffer_mock, document_mock).text == "int(2)"
+
+
+def test_editor_suggests_memo_lines():
+    indexed = threading.Event()
+
+    def lines():
+        yield "from memo"
+        indexed.set()
+
+    editor = PmemoEditor(suggestion_lines=lines)
+    with create_pipe_input() as pipe_input:
+        pipe_input.send_text(
+            "".join(
+                (
+                    REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                    REVERSE_ANSI_SEQUENCES[Keys.Enter],
+                )
+            )
+        )
+        editor.text("Test", input=pipe_input, output=DummyOutput())
+    assert indexed.wait(timeout=5)
+    for _ in range(100):
+        if editor._index.find("from") is not None:
+            break
+        time.sleep(0.01)
+    assert editor._index.find("from") == "from memo"
+
+    # the history of one prompt is suggested in the next
+    with create_pipe_input() as pipe_input:
+        pipe_input.send_text(
+            "".join(
+                (
+                    "fr",
+                    REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                    REVERSE_ANSI_SEQUENCES[Keys.Enter],
+                )
+            )
+        )
+        assert editor.text("Test", input=pipe_input, output=DummyOutput()) == "fr"
+    assert editor._index.find("f") == "fr"
+
+
+def test_editor_history_is_persistent():
+    with TemporaryDirectory() as tmp_dir:
+        history_path = Path(tmp_dir) / HISTORY_FILE_NAME
+        with create_pipe_input() as pipe_input:
+            pipe_input.send_text(
+                "".join(
+                    (
+                        "persistent",
+                        REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                        REVERSE_ANSI_SEQUENCES[Keys.Enter],
+                    )
+                )
+            )
+            PmemoEditor(history_path=history_path).text(
+                "Test", input=pipe_input, output=DummyOutput()
+            )
+
+        editor = PmemoEditor(history_path=history_path)
+        with create_pipe_input() as pipe_input:
+            # accepts the suggestion, once the history is loaded in the background
+            pipe_input.send_text("per")
+            threading.Timer(
+                0.5,
+                pipe_input.send_text,
+                (
+                    "".join(
+                        (
+                            REVERSE_ANSI_SEQUENCES[Keys.ControlE],
+                            REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                            REVERSE_ANSI_SEQUENCES[Keys.Enter],
+                        )
+                    ),
+                ),
+            ).start()
+            content = editor.text("Test", input=pipe_input, output=DummyOutput())
+        assert content == "persistent"
+
+
+def test_editor_session_is_reused():
+    editor = PmemoEditor()
+    escape_enter = "".join(
+        (REVERSE_ANSI_SEQUENCES[Keys.Escape], REVERSE_ANSI_SEQUENCES[Keys.Enter])
+    )
+    output = DummyOutput()
+    with create_pipe_input() as pipe_input, patch.object(
+        editor, "get_key_bindings", wraps=editor.get_key_bindings
+    ) as get_key_bindings:
+        pipe_input.send_text("memo" + escape_enter)
+        assert editor.text("Memo", input=pipe_input, output=output) == "memo"
+        session = editor._session
+
+        pipe_input.send_text("title" + REVERSE_ANSI_SEQUENCES[Keys.Enter])
+        assert (
+            editor.text("Title:", multiline=False, input=pipe_input, output=output)
+            == "title"
+        )
+        assert editor._session is session
+        assert session.message() == "Title:"
+        assert get_key_bindings.call_count == 1
+
+        # the default replaces the text of the previous prompt
+        pipe_input.send_text("!" + escape_enter)
+        assert (
+            editor.text("Edit", default="default", input=pipe_input, output=output)
+            == "default!"
+        )
+        assert editor._session is session
+
+    # other arguments for PromptSession build another session
+    with create_pipe_input() as pipe_input:
+        pipe_input.send_text(escape_enter)
+        editor.text("Memo", input=pipe_input, output=DummyOutput())
+    assert editor._session is not session
+
+
+def test_editor_autosaves_draft():
+    with TemporaryDirectory() as tmp_dir:
+        drafts = DraftJournal(Path(tmp_dir))
+        editor = PmemoEditor(drafts=drafts)
+        with create_pipe_input() as pipe_input:
+            pipe_input.send_text("draft" + REVERSE_ANSI_SEQUENCES[Keys.ControlC])
+            with pytest.raises(SystemExit):
+                editor.text("Memo", input=pipe_input, output=DummyOutput(), draft="new")
+        assert drafts.load("new") == "draft"
+
+        with create_pipe_input() as pipe_input:
+            pipe_input.send_text(
+                "".join(
+                    (
+                        "!",
+                        REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                        REVERSE_ANSI_SEQUENCES[Keys.Enter],
+                    )
+                )
+            )
+            content = editor.text(
+                "Memo",
+                default="draft",
+                input=pipe_input,
+                output=DummyOutput(),
+                draft="new",
+            )
+        assert content == "draft!"
+        # the caller discards the draft once the memo is saved
+        assert drafts.load("new") == "draft!"
+
+        # prompts without a draft name are not saved
+        with create_pipe_input() as pipe_input:
+            pipe_input.send_text("title" + REVERSE_ANSI_SEQUENCES[Keys.ControlC])
+            with pytest.raises(SystemExit):
+                editor.text(
+                    "Title", multiline=False, input=pipe_input, output=DummyOutput()
+                )
+        assert list(drafts.draft_file("new").parent.iterdir()) == [
+            drafts.draft_file("new")
+        ]
+
+
+def test_editor_bracketed_paste():
+    pasted = "(log\r\n" * 100_000
+    editor = PmemoEditor()
+    with create_pipe_input() as pipe_input:
+        # the pipe holds less than the paste until the editor reads it
+        threading.Thread(
+            target=pipe_input.send_text,
+            args=(
+                "".join(
+                    (
+                        "\x1b[200~",
+                        pasted,
+                        "\x1b[201~",
+                        "(",
+                        REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                        REVERSE_ANSI_SEQUENCES[Keys.Enter],
+                    )
+                ),
+            ),
+            daemon=True,
+        ).start()
+        content = editor.text("Memo", input=pipe_input, output=DummyOutput())
+    # brackets are paired when typed, not when pasted
+    assert content == "(log\n" * 100_000 + "()"
+
+
+def test_editor_large_memo():
+    lines = [f"line {i}" for i in range(10_000)]
+    editor = PmemoEditor(large_memo_chars=1000)
+    with create_pipe_input() as pipe_input:
+        pipe_input.send_text(
+            "".join(
+                (
+                    "!",
+                    # goes to line 1, out of the window at the end of the memo
+                    REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                    "1",
+                    REVERSE_ANSI_SEQUENCES[Keys.ControlG],
+                    "top ",
+                    REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                    "5001",
+                    REVERSE_ANSI_SEQUENCES[Keys.ControlG],
+                    "middle ",
+                    # the window moves with the cursor
+                    REVERSE_ANSI_SEQUENCES[Keys.Up] * 2000,
+                    "up ",
+                    REVERSE_ANSI_SEQUENCES[Keys.Escape],
+                    REVERSE_ANSI_SEQUENCES[Keys.Enter],
+                )
+            )
+        )
+        content = editor.text(
+            "Memo", default="\n".join(lines), input=pipe_input, output=DummyOutput()
+        )
+        assert editor._window is None
+    lines[0] = "top " + lines[0]
+    lines[5000] = "middle " + lines[5000]
+    # the cursor keeps its column, after "middle "
+    lines[3000] = "line 30up 00"
+    lines[-1] += "!"
+    assert content == "\n".join(lines)
@@ -0,0 +1,82 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from pmemo.preview import PreviewCache, text_size
+
+
+def test_get_caches_previews():
+    load = Mock(side_effect=lambda choice: choice * 2)
+    previews = PreviewCache(load)
+    assert previews.get("a") == "aa"
+    assert previews.get("a") == "aa"
+    assert previews.get("b") == "bb"
+    assert load.call_count == 2
+    assert len(previews) == 2
+    assert previews.size == 4
+
+
+def test_changed_key_loads_again():
+    mtimes = {"a": 1}
+    load = Mock(side_effect=lambda choice: f"{choice}{mtimes[choice]}")
+    previews = PreviewCache(load, key=lambda choice: (choice, mtimes[choice]))
+    assert previews.get("a") == "a1"
+    mtimes["a"] = 2
+    assert previews.get("a") == "a2"
+    assert load.call_count == 2
+
+
+def test_byte_budget_evicts_least_recently_used():
+    load = Mock(side_effect=lambda choice: choice * 4)
+    previews = PreviewCache(load, max_bytes=10)
+    previews.get("a")
+    previews.get("b")
+    # "a" is used more recently than "b", so "b" is evicted for "c"
+    previews.get("a")
+    previews.get("c")
+    assert previews.size == 8
+    assert len(previews) == 2
+
+    load.reset_mock()
+    previews.get("a")
+    previews.get("c")
+    assert load.call_count == 0
+    previews.get("b")
+    assert load.call_count == 1
+
+    # a preview larger than the budget is not cached
+    previews.get("long choice")
+    assert len(previews) == 2
+    assert previews.size <= 10
+
+
+def test_prefetch():
+    loaded = threading.Event()
+
+    def load(choice: str) -> str:
+        loaded.set()
+        return choice.upper()
+
+    previews = PreviewCache(load)
+    previews.prefetch(["a"])
+    assert loaded.wait(timeout=5)
+    previews.close()
+    assert previews.get("a") == "A"
+    assert len(previews) == 1
+
+
+def test_failed_prefetch_fails_when_shown():
+    load = Mock(side_effect=FileNotFoundError)
+    previews = PreviewCache(load)
+    previews.prefetch(["a"])
+    previews.close()
+    with pytest.raises(FileNotFoundError):
+        previews.get("a")
+    assert len(previews) == 0
+
+
+def test_formatted_text_previews():
+    previews = PreviewCache(lambda choice: [("class:a", choice), ("class:b", "日本")])
+    assert previews.get("ab") == [("class:a", "ab"), ("class:b", "日本")]
+    assert previews.size == text_size("ab日本")
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from pmemo.query_worker import QueryWorker
+
+
+def test_result_is_published():
+    published = threading.Event()
+    worker = QueryWorker(str.upper, published.set, debounce=0)
+    assert worker.result() is None
+    worker.submit("query")
+    assert published.wait(timeout=5)
+    assert worker.result() == ("query", "QUERY")
+    worker.close()
+
+
+def test_queries_are_debounced():
+    computed = []
+    published = threading.Event()
+
+    def compute(query: str) -> str:
+        computed.append(query)
+        return query
+
+    worker = QueryWorker(compute, published.set, debounce=0.2)
+    for end in range(1, 5):
+        worker.submit("memo"[:end])
+    assert published.wait(timeout=5)
+    assert computed == ["memo"]
+    assert worker.result() == ("memo", "memo")
+    worker.close()
+
+
+def test_superseded_result_is_dropped():
+    started = threading.Event()
+    release = threading.Event()
+    published = []
+
+    def compute(query: str) -> str:
+        if query == "slow":
+            started.set()
+            release.wait(timeout=5)
+        return query
+
+    done = threading.Event()
+
+    def on_result():
+        published.append(worker.result())
+        done.set()
+
+    worker = QueryWorker(compute, on_result, debounce=0)
+    worker.submit("slow")
+    assert started.wait(timeout=5)
+    worker.submit("fast")
+    release.set()
+    assert done.wait(timeout=5)
+    assert published == [("fast", "fast")]
+    worker.close()
+
+
+def test_error_is_raised_by_result():
+    published = threading.Event()
+    worker = QueryWorker(lambda query: 1 // 0, published.set, debounce=0)
+    worker.submit("query")
+    assert published.wait(timeout=5)
+    with pytest.raises(ZeroDivisionError):
+        worker.result()
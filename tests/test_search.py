@@ -0,0 +1,135 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import pytest
+
+from pmemo.memo import Memo
+from pmemo.search import SearchIndex, tokenize
+from pmemo.storage.filesystem import FileSystemStorage
+
+
+@pytest.mark.parametrize(
+    "text,expect",
+    [
+        ("", []),
+        ("Hello, World!", ["hello", "world"]),
+        ("snake_case and 42", ["snake_case", "and", "42"]),
+    ],
+)
+def test_tokenize(text, expect):
+    assert tokenize(text) == expect
+
+
+def save_memos(out_dir: Path, index: SearchIndex, contents: list[str]) -> list[Memo]:
+    storage = FileSystemStorage(out_dir, search_index=index)
+    memos = [Memo(out_dir, content, storage=storage) for content in contents]
+    for memo in memos:
+        memo.save()
+    return memos
+
+
+def test_search_ranked():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        index = SearchIndex(out_dir)
+        save_memos(
+            out_dir,
+            index,
+            [
+                "python\nasyncio event loop",
+                "rust\nownership and borrowing, a python comparison",
+                "shell\npython python python",
+            ],
+        )
+        assert [r.title for r in index.search("python")][0] == "shell"
+        assert {r.title for r in index.search("python")} == {
+            "python",
+            "rust",
+            "shell",
+        }
+        # every term has to match
+        assert [r.title for r in index.search("python borrowing")] == ["rust"]
+        # the last term matches as a prefix
+        assert [r.title for r in index.search("asyn")] == ["python"]
+        assert index.search("missing") == []
+        assert index.search("") == []
+        assert len(index.search("python", limit=1)) == 1
+
+
+def test_search_phrase():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        index = SearchIndex(out_dir)
+        save_memos(out_dir, index, ["first\nevent loop", "second\nloop event"])
+        assert [r.title for r in index.search('"event loop"')] == ["first"]
+        assert [r.title for r in index.search('"loop event"')] == ["second"]
+
+
+def test_search_incremental_update():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        index = SearchIndex(out_dir)
+        (memo,) = save_memos(out_dir, index, ["memo\nbefore"])
+        assert [r.title for r in index.search("before")] == ["memo"]
+
+        with patch("pmemo.utils.confirm", return_value=True):
+            memo.edit_content("memo\nafter")
+            memo.save()
+            assert index.search("before") == []
+            assert [r.path for r in index.search("after")] == [memo.file_path]
+
+            memo.remove()
+            assert index.search("after") == []
+
+
+def test_search_index_built_on_first_use():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        (out_dir / "external").mkdir()
+        (out_dir / "external" / "external.md").write_text("external\ncontent")
+        index = SearchIndex(out_dir)
+        assert [r.title for r in index.search("content")] == ["external"]
+
+
+def test_search_scores_the_candidates_of_the_rarest_term():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        index = SearchIndex(out_dir)
+        save_memos(
+            out_dir,
+            index,
+            ["one\ncommon", "two\ncommon common", "three\ncommon rare"],
+        )
+        with patch("pmemo.search.MAX_CANDIDATES", 1):
+            assert [r.title for r in index.search("common rare")] == ["three"]
+            assert [r.title for r in index.search('"common rare"')] == ["three"]
+            # the memo with the most occurrences of the term
+            assert [r.title for r in index.search("common")] == ["two"]
+
+
+def test_search_finds_matches_past_the_candidates_cap():
+    with TemporaryDirectory() as tmp_outdir:
+        out_dir = Path(tmp_outdir)
+        index = SearchIndex(out_dir, documents=lambda: [])
+        contents = (
+            [f"alpha{i}\nalpha alpha" for i in range(30)]
+            + [f"beta{i}\nbeta beta" for i in range(40)]
+            + [f"both{i}\nalpha beta" for i in range(5)]
+        )
+        index.reindex(
+            (out_dir / f"{content.split()[0]}.md", content) for content in contents
+        )
+        with patch("pmemo.search.MAX_CANDIDATES", 10):
+            expected = {f"both{i}" for i in range(5)}
+            assert {r.title for r in index.search("alpha beta")} == expected
+            assert {r.title for r in index.search('"alpha beta"')} == expected
+            assert {r.title for r in index.search("beta alph")} == expected
+
+            # memos with both terms, but not as the phrase, fill the cap
+            index.reindex(
+                (out_dir / f"{content.split()[0]}.md", content)
+                for content in contents
+                + [f"reversed{i}\nbeta beta alpha alpha" for i in range(20)]
+            )
+            assert {r.title for r in index.search('"alpha beta"')} == expected
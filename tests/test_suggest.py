@@ -0,0 +1,101 @@
+import random
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from pmemo.storage.filesystem import FileSystemStorage
+from pmemo.suggest import IndexedHistory, PrefixIndex, iter_memo_lines
+
+
+def brute_force(lines: list[str], prefix: str):
+    return next((line for line in reversed(lines) if line.startswith(prefix)), None)
+
+
+def test_find_most_recent():
+    index = PrefixIndex(["import os", "import sys", "print(1)"])
+    assert len(index) == 3
+    assert index.find("imp") == "import sys"
+    assert index.find("import o") == "import os"
+    assert index.find("p") == "print(1)"
+    assert index.find("import os") == "import os"
+    assert index.find("x") is None
+    assert index.find("import osx") is None
+    assert PrefixIndex().find("a") is None
+
+
+def test_readded_line_is_more_recent():
+    index = PrefixIndex(["import os", "import sys"])
+    index.add("import os")
+    assert index.find("import") == "import os"
+    index.extend(["import re"])
+    assert index.find("import") == "import re"
+    index.add("import sys")
+    assert index.find("import") == "import sys"
+    assert len(index) == 3
+
+
+@pytest.mark.parametrize("max_recent", [1, 3, 1024])
+def test_matches_brute_force(max_recent):
+    rand = random.Random(0)
+    lines = ["".join(rand.choices("abあ", k=rand.randint(1, 5))) for _ in range(300)]
+    with patch("pmemo.suggest.MAX_RECENT", max_recent):
+        index = PrefixIndex(lines[:100])
+        for line in lines[100:200]:
+            index.add(line)
+        index.extend(lines[200:])
+    prefixes = {line[:end] for line in lines for end in range(1, len(line) + 1)}
+    for prefix in sorted(prefixes) + ["bあbあbあ", "\U0010ffff"]:
+        assert index.find(prefix) == brute_force(lines, prefix), prefix
+
+
+def test_find_while_extending():
+    index = PrefixIndex(["print(1)"])
+    lines = [f"line {i}" for i in range(100_000)]
+    thread = threading.Thread(target=index.extend, args=(lines,))
+    thread.start()
+    while thread.is_alive():
+        assert index.find("print") == "print(1)"
+    thread.join()
+    assert index.find("line") == "line 99999"
+    assert index.find("print") == "print(1)"
+
+
+def test_indexed_history():
+    index = PrefixIndex(["memo line"])
+    history = IndexedHistory(index)
+    history.append_string("memo\nmultiline")
+    assert list(history.get_strings()) == ["memo\nmultiline"]
+    assert index.find("memo") == "memo\nmultiline"
+
+
+def test_iter_memo_lines():
+    contents = {"new": "new line\n\n  \n    indented  \n", "old": "old line"}
+    storage = Mock()
+    storage.iter_entries.return_value = iter(
+        SimpleNamespace(title=title) for title in ["new", "removed", "old"]
+    )
+
+    def load_head(title: str, n: int, max_chars: int) -> str:
+        if title not in contents:
+            raise FileNotFoundError(title)
+        return contents[title][:max_chars]
+
+    storage.load_head.side_effect = load_head
+    assert list(iter_memo_lines(storage)) == ["old line", "new line", "    indented"]
+
+
+def test_iter_memo_lines_reads_recent_memo_heads():
+    with TemporaryDirectory() as tmp_outdir:
+        storage = FileSystemStorage(Path(tmp_outdir))
+        for i in range(5):
+            storage.save(f"memo{i}", f"memo{i}\nline {i}")
+        storage.save("large", "large\n" + "x" * 100 + "\ncut off")
+        with patch("pmemo.suggest.MAX_SUGGESTED_MEMOS", 3), patch(
+            "pmemo.suggest.MAX_SUGGESTED_CHARS", 50
+        ):
+            lines = list(iter_memo_lines(storage))
+        assert lines == ["memo3", "line 3", "memo4", "line 4", "large"]
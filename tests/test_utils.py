@@ -0,0 +1,52 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import pytest
+
+from pmemo.fileio import encode_text
+from pmemo.utils import confirm_remove_many, format_size, read_head
+
+TEXT = "".join(f"line {i}\n" for i in range(100))
+
+
+@pytest.mark.parametrize("threshold", [None, 10])
+def test_read_head(threshold):
+    with TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / "test.md"
+        file_path.write_bytes(encode_text(TEXT, threshold))
+        assert read_head(file_path) == [f"line {i}\n" for i in range(5)]
+        assert read_head(file_path, 200) == TEXT.splitlines(keepends=True)
+        assert read_head(file_path, 3, max_chars=10) == ["line 0\n", "lin"]
+        assert read_head(file_path, 2, max_chars=100) == ["line 0\n", "line 1\n"]
+
+
+def test_read_head_of_long_line():
+    with TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / "test.md"
+        file_path.write_text("a" * 10_000)
+        assert read_head(file_path, 5, max_chars=80) == ["a" * 80]
+
+
+@pytest.mark.parametrize(
+    "size,formatted",
+    [(0, "0 B"), (1023, "1023 B"), (1536, "1.5 KiB"), (3 * 1024**2, "3.0 MiB")],
+)
+def test_format_size(size, formatted):
+    assert format_size(size) == formatted
+
+
+def test_confirm_remove_many():
+    with patch("pmemo.utils.confirm", return_value=True) as confirm:
+        assert confirm_remove_many(["a"])
+        confirm.assert_called_once_with("a: Remove?")
+
+        confirm.reset_mock()
+        assert confirm_remove_many(["a", "b"])
+        confirm.assert_called_once_with("a, b: Remove 2 items?")
+
+        confirm.reset_mock()
+        assert confirm_remove_many([str(i) for i in range(12)])
+        confirm.assert_called_once_with(
+            "0, 1, 2, 3, 4, 5, 6, 7, 8, 9 and 2 more: Remove 12 items?"
+        )
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from pmemo.highlight import OUTSIDE, state_after
+from pmemo.windowed import CHUNK_LINES, LineRope, LineWindow
+
+
+def test_line_rope_get():
+    lines = [str(i) for i in range(3 * CHUNK_LINES + 5)]
+    rope = LineRope(lines)
+    assert len(rope) == len(lines)
+    for start, end in [
+        (0, 0),
+        (0, len(lines)),
+        (CHUNK_LINES - 1, CHUNK_LINES + 1),
+        (5, 2 * CHUNK_LINES + 7),
+        (len(lines) - 1, len(lines) + 10),
+    ]:
+        assert rope.get(start, end) == lines[start:end]
+    assert rope.snapshot()() == "\n".join(lines)
+
+
+def test_line_rope_replace():
+    rng = random.Random(0)
+    lines = [str(i) for i in range(2 * CHUNK_LINES)]
+    rope = LineRope(lines)
+    for _ in range(200):
+        start = rng.randrange(len(lines) + 1)
+        end = rng.randrange(start, min(len(lines), start + 2 * CHUNK_LINES) + 1)
+        new = [f"new{rng.random()}" for _ in range(rng.randrange(3 * CHUNK_LINES))]
+        lines[start:end] = new
+        rope.replace(start, end, new)
+        assert len(rope) == len(lines)
+        assert rope.get(0, len(lines)) == lines
+
+
+def test_line_rope_snapshot():
+    rope = LineRope(["a", "b", "c"])
+    snapshot = rope.snapshot()
+    copy = rope.copy()
+    copy.replace(1, 2, ["B", "B"])
+    rope.replace(0, 1, [])
+    assert snapshot() == "a\nb\nc"
+    assert copy.snapshot()() == "a\nB\nB\nc"
+    assert rope.snapshot()() == "b\nc"
+
+
+def test_line_window():
+    lines = [str(i) for i in range(100)]
+    window = LineWindow("\n".join(lines), window_lines=20, margin=5)
+    assert (window.start, window.end) == (80, 100)
+    assert window.text() == "\n".join(lines[80:])
+    assert len(window) == 100
+
+    assert not window.needs_move(10, 20)
+    assert window.needs_move(4, 20)
+    # there is nothing after the window to move to
+    assert not window.needs_move(19, 20)
+
+    edited = "\n".join(["edited"] * 3 + lines[80:])
+    full_text = window.full_text(edited)
+    text = window.move(edited, 50)
+    assert (window.start, window.end) == (40, 60)
+    assert text == "\n".join(lines[40:60])
+    assert len(window) == 103
+    assert full_text() == "\n".join(lines[:80] + ["edited"] * 3 + lines[80:])
+    assert window.full_text(text)() == full_text()
+
+    # the window stays within the memo
+    window.move(text, 0)
+    assert (window.start, window.end) == (0, 20)
+    window.move(window.text(), 1000)
+    assert (window.start, window.end) == (83, 103)
+
+
+@pytest.mark.parametrize("line", [0, 3, 50, 99])
+def test_line_window_start_state(line):
+    lines = ["memo", "```python", *[f"x = {i}" for i in range(50)], "```"] * 2
+    window = LineWindow("\n".join(lines), window_lines=10, margin=2)
+    assert window.start_state() == state_after(lines[: window.start])
+    window.move(window.text(), line)
+    assert window.start_state() == state_after(lines[: window.start])
+    # an edit before the start of the window is lexed again
+    text = "\n".join(["```"] + window.text().split("\n"))
+    window.move(text, line + 5)
+    assert window.start_state() == state_after(
+        window.full_text(window.text())().split("\n")[: window.start], OUTSIDE
+    )